@@ -2,38 +2,92 @@ extends Node
 ## AssetLoader - Loads and caches game assets from the extracted SWF files
 ## Provides hash-based lookup compatible with original game
 
-var asset_lookup: Dictionary = {}
+const SHARD_DIR = "res://assets/sprites/asset_lookup/"
+const LEGACY_LOOKUP_FILE = "res://assets/sprites/asset_lookup.json"
+const ITEM_HASH_INDEX_FILE = "res://assets/sprites/item_hash_index.bin"
+
+# Item hash index layout (see tools/item_hash_index.py)
+const ITEM_HASH_MAGIC = "PSIH"
+const ITEM_HASH_VERSION = 1
+const ITEM_HASH_HEADER_SIZE = 12
+
+var asset_lookup: Dictionary = {}  # filename -> asset info (entries of loaded shards)
 var texture_cache: Dictionary = {}  # path -> Texture2D cache
+var sprite_frames_cache: Dictionary = {}  # filename -> SpriteFrames cache
 var loading_queue: Array = []
 
+# Sharded lookup: only the index is read at startup, shards on first use
+var shard_counts: Dictionary = {}  # shard id -> entry count
+var loaded_shards: Dictionary = {}  # shard id -> true
+var shard_prefix_length: int = 1
+var total_assets: int = 0
+
+# Item hash -> filename table, read on first use and binary-searched in place
+var item_hash_table: PackedByteArray = PackedByteArray()
+var item_hash_count: int = -1  # -1 until the table is read
+var item_hash_name_width: int = 0
+
 func _ready() -> void:
 	_load_asset_lookup()
-	print("[AssetLoader] Initialized with ", asset_lookup.size(), " assets")
+	print("[AssetLoader] Initialized with ", total_assets, " assets")
 
-## Load asset lookup JSON file
+## Load the shard index (falls back to the monolithic asset_lookup.json)
 func _load_asset_lookup() -> void:
-	var lookup_file = "res://assets/sprites/asset_lookup.json"
-	
-	if not ResourceLoader.exists(lookup_file):
-		print("[AssetLoader] Warning: asset_lookup.json not found at ", lookup_file)
+	var index = _read_json(SHARD_DIR + "index.json")
+	if index is Dictionary:
+		shard_counts = index.get("shards", {})
+		shard_prefix_length = int(index.get("prefix_length", 1))
+		total_assets = int(index.get("count", 0))
+		print("[AssetLoader] Loaded shard index (", shard_counts.size(), " shards)")
 		return
 	
-	var file = FileAccess.open(lookup_file, FileAccess.READ)
-	if file == null:
-		print("[AssetLoader] Error: Could not open asset_lookup.json")
-		return
+	# Older lookups: one file with every entry
+	var lookup = _read_json(LEGACY_LOOKUP_FILE)
+	if lookup is Dictionary:
+		asset_lookup = lookup
+		total_assets = asset_lookup.size()
+		print("[AssetLoader] Loaded ", asset_lookup.size(), " asset entries")
+	else:
+		print("[AssetLoader] Warning: no asset lookup found in ", SHARD_DIR)
+
+## Read and parse a JSON file, returns null on failure
+func _read_json(path: String) -> Variant:
+	if not FileAccess.file_exists(path):
+		return null
 	
-	var json_string = file.get_as_text()
-	file.close()
+	var file = FileAccess.open(path, FileAccess.READ)
+	if file == null:
+		print("[AssetLoader] Error: Could not open ", path)
+		return null
 	
 	var json = JSON.new()
-	var error = json.parse(json_string)
+	var error = json.parse(file.get_as_text())
+	file.close()
 	if error != OK:
 		print("[AssetLoader] Error parsing JSON: ", json.get_error_message())
+		return null
+	
+	return json.data
+
+## Shard id for a filename (hex of its prefix bytes, see tools/asset_lookup.py)
+func _shard_id(base_name: String) -> String:
+	return base_name.substr(0, shard_prefix_length).to_utf8_buffer().hex_encode()
+
+## Load the shard a filename belongs to (no-op if already loaded)
+func _ensure_shard(shard_id: String) -> void:
+	if loaded_shards.has(shard_id) or not shard_counts.has(shard_id):
 		return
+	loaded_shards[shard_id] = true
 	
-	asset_lookup = json.data
-	print("[AssetLoader] Loaded ", asset_lookup.size(), " asset entries")
+	var entries = _read_json(SHARD_DIR + shard_id + ".json")
+	if entries is Dictionary:
+		asset_lookup.merge(entries)
+
+## Get the lookup entry for a filename, loading its shard on first access
+func _get_entry(base_name: String) -> Dictionary:
+	if not asset_lookup.has(base_name):
+		_ensure_shard(_shard_id(base_name))
+	return asset_lookup.get(base_name, {})
 
 ## Load texture by SWF filename (original asset ID)
 func load_texture_by_filename(filename: String) -> Texture2D:
@@ -44,7 +98,8 @@ func load_texture_by_filename(filename: String) -> Texture2D:
 	var base_name = filename.get_basename()
 	
 	# Check lookup
-	if not asset_lookup.has(base_name):
+	var asset_data = _get_entry(base_name)
+	if asset_data.is_empty():
 		# Try direct path lookup as fallback
 		var direct_path = "res://assets/sprites/lookup/" + base_name + ".png"
 		if ResourceLoader.exists(direct_path):
@@ -52,7 +107,6 @@ func load_texture_by_filename(filename: String) -> Texture2D:
 		print("[AssetLoader] Asset not found: ", base_name)
 		return null
 	
-	var asset_data = asset_lookup[base_name]
 	var asset_path = asset_data.get("path", "")
 	
 	if asset_path.is_empty():
@@ -62,6 +116,13 @@ func load_texture_by_filename(filename: String) -> Texture2D:
 	if texture_cache.has(asset_path):
 		return texture_cache[asset_path]
 	
+	# Sprites packed by tools/build_atlases.py come from a shared atlas page
+	if asset_data.has("atlas"):
+		var atlas_texture = _load_atlas_texture(asset_data["atlas"])
+		if atlas_texture != null:
+			texture_cache[asset_path] = atlas_texture
+			return atlas_texture
+	
 	# Load texture
 	var texture = load(asset_path) as Texture2D
 	if texture == null:
@@ -78,13 +139,157 @@ func load_texture_by_filename(filename: String) -> Texture2D:
 	texture_cache[asset_path] = texture
 	return texture
 
+## Load a downscaled variant for icons (see tools/build_thumbnails.py)
+## Picks the smallest thumbnail whose longest edge is at least min_size,
+## falling back to the full texture
+func load_thumbnail_by_filename(filename: String, min_size: int) -> Texture2D:
+	if filename.is_empty():
+		return null
+	
+	var thumbnails: Dictionary = _get_entry(filename.get_basename()).get("thumbnails", {})
+	var best_size = 0
+	for size_key in thumbnails:
+		var size = int(size_key)
+		if size >= min_size and (best_size == 0 or size < best_size):
+			best_size = size
+	
+	if best_size > 0:
+		var texture = load_texture(thumbnails[str(best_size)])
+		if texture != null:
+			return texture
+	return load_texture_by_filename(filename)
+
+## Build an AtlasTexture from a lookup entry's "atlas" field
+## (page, rect on the page, offset of the rect in the original, original size)
+func _load_atlas_texture(atlas: Dictionary) -> Texture2D:
+	var page = load_texture(atlas.get("page", ""))
+	if page == null:
+		return null
+	
+	var rect: Array = atlas.get("rect", [0, 0, 0, 0])
+	var offset: Array = atlas.get("offset", [0, 0])
+	var size: Array = atlas.get("size", [rect[2], rect[3]])
+	
+	var texture = AtlasTexture.new()
+	texture.atlas = page
+	texture.region = Rect2(rect[0], rect[1], rect[2], rect[3])
+	# Margin restores the transparent border trimmed before packing
+	texture.margin = Rect2(offset[0], offset[1], size[0] - rect[2], size[1] - rect[3])
+	return texture
+
+## Read the item hash index (no-op after the first call)
+func _load_item_hash_index() -> void:
+	if item_hash_count >= 0:
+		return
+	item_hash_count = 0
+	if not FileAccess.file_exists(ITEM_HASH_INDEX_FILE):
+		print("[AssetLoader] Warning: no item hash index at ", ITEM_HASH_INDEX_FILE)
+		return
+	
+	var table = FileAccess.get_file_as_bytes(ITEM_HASH_INDEX_FILE)
+	if table.size() < ITEM_HASH_HEADER_SIZE or table.slice(0, 4).get_string_from_ascii() != ITEM_HASH_MAGIC \
+			or table.decode_u16(4) != ITEM_HASH_VERSION:
+		print("[AssetLoader] Error: unsupported item hash index ", ITEM_HASH_INDEX_FILE)
+		return
+	
+	item_hash_name_width = table.decode_u16(6)
+	item_hash_count = table.decode_u32(8)
+	item_hash_table = table
+	print("[AssetLoader] Loaded item hash index (", item_hash_count, " items)")
+
+## SWF filename of an item hash, "" if the index has no asset for it
+## (binary search over the sorted fixed-width records)
+func get_filename_by_hash(item_hash: int) -> String:
+	_load_item_hash_index()
+	
+	var record_size = 8 + item_hash_name_width
+	var low = 0
+	var high = item_hash_count - 1
+	while low <= high:
+		var mid = (low + high) >> 1
+		var offset = ITEM_HASH_HEADER_SIZE + mid * record_size
+		var key = item_hash_table.decode_s64(offset)
+		if key < item_hash:
+			low = mid + 1
+		elif key > item_hash:
+			high = mid - 1
+		else:
+			var name_bytes = item_hash_table.slice(offset + 8, offset + record_size)
+			var end = name_bytes.find(0)
+			if end >= 0:
+				name_bytes = name_bytes.slice(0, end)
+			return name_bytes.get_string_from_utf8()
+	return ""
+
+## Build SpriteFrames from an asset's spritesheets (see tools/build_spritesheets.py)
+## One animation per exported timeline ("frames" for the main timeline,
+## "DefineSprite_<id>" for sprites); null if the asset has none
+func load_sprite_frames(filename: String) -> SpriteFrames:
+	var base_name = filename.get_basename()
+	if sprite_frames_cache.has(base_name):
+		return sprite_frames_cache[base_name]
+	
+	var animations: Dictionary = _get_entry(base_name).get("animations", {})
+	if animations.is_empty():
+		return null
+	
+	var sprite_frames = SpriteFrames.new()
+	sprite_frames.remove_animation("default")
+	for animation in animations:
+		var sheet = _read_json(animations[animation])
+		if sheet is Dictionary:
+			_add_sheet_animation(sprite_frames, animation, sheet)
+	
+	sprite_frames_cache[base_name] = sprite_frames
+	return sprite_frames
+
+## Add one spritesheet's frames as an animation (cells become AtlasTextures,
+## margins restore the trimmed canvas, durations are in SWF frames)
+func _add_sheet_animation(sprite_frames: SpriteFrames, animation: String, sheet: Dictionary) -> void:
+	var pages: Array = []
+	for page_path in sheet.get("pages", []):
+		pages.append(load_texture(page_path))
+	var size: Array = sheet.get("size", [0, 0])
+	
+	var cell_textures: Dictionary = {}  # "cell,left,top" -> AtlasTexture
+	sprite_frames.add_animation(animation)
+	sprite_frames.set_animation_speed(animation, float(sheet.get("fps", 24.0)))
+	for frame in sheet.get("frames", []):
+		var key = "%d,%d,%d" % [frame[0], frame[1], frame[2]]
+		if not cell_textures.has(key):
+			var cell: Array = sheet["cells"][int(frame[0])]
+			var texture = AtlasTexture.new()
+			texture.atlas = pages[int(cell[0])]
+			texture.region = Rect2(cell[1], cell[2], cell[3], cell[4])
+			texture.margin = Rect2(frame[1], frame[2], size[0] - cell[3], size[1] - cell[4])
+			cell_textures[key] = texture
+		sprite_frames.add_frame(animation, cell_textures[key], float(frame[3]))
+
 ## Load texture by item hash (for compatibility with original game)
-## Note: We don't have hash->filename mapping, so this is a placeholder
-## You'll need to create a mapping file if you have item hash data
+## Uses the item hash index built by tools/item_hash_index.py
 func load_texture_by_hash(item_hash: int) -> Texture2D:
-	# TODO: Implement hash->filename mapping if available
-	# For now, return null
-	print("[AssetLoader] load_texture_by_hash not yet implemented")
+	var filename = get_filename_by_hash(item_hash)
+	if filename.is_empty():
+		return null
+	return load_texture_by_filename(filename)
+
+## Icon-sized variant of load_texture_by_hash (see load_thumbnail_by_filename)
+func load_thumbnail_by_hash(item_hash: int, min_size: int) -> Texture2D:
+	var filename = get_filename_by_hash(item_hash)
+	if filename.is_empty():
+		return null
+	return load_thumbnail_by_filename(filename, min_size)
+
+## Icon texture for an item: the smallest thumbnail covering min_size px
+## (item hash first, like home screen furniture, then the item's sprite_path)
+func load_item_icon(item: ItemData, min_size: int) -> Texture2D:
+	if item.item_hash != 0:
+		var texture = load_thumbnail_by_hash(item.item_hash, min_size)
+		if texture != null:
+			return texture
+	
+	if not item.sprite_path.is_empty():
+		return load_texture(item.sprite_path)
 	return null
 
 ## Load texture from asset path directly
@@ -113,6 +318,10 @@ func load_texture(asset_path: String) -> Texture2D:
 
 ## Get random asset for testing
 func get_random_asset() -> String:
+	if not shard_counts.is_empty():
+		var shard_ids = shard_counts.keys()
+		_ensure_shard(shard_ids[randi() % shard_ids.size()])
+	
 	if asset_lookup.is_empty():
 		return ""
 	
@@ -122,12 +331,16 @@ func get_random_asset() -> String:
 ## Clear texture cache to free memory
 func clear_cache() -> void:
 	texture_cache.clear()
+	sprite_frames_cache.clear()
 	print("[AssetLoader] Texture cache cleared")
 
 ## Get asset info by filename
 func get_asset_info(filename: String) -> Dictionary:
-	var base_name = filename.get_basename()
-	if asset_lookup.has(base_name):
-		return asset_lookup[base_name]
-	return {}
+	return _get_entry(filename.get_basename())
+
+## Pixel size of an asset without loading its texture (see tools/image_metadata.py)
+## Returns Vector2i.ZERO when the lookup has no dimensions for it
+func get_asset_size(filename: String) -> Vector2i:
+	var asset_data = _get_entry(filename.get_basename())
+	return Vector2i(int(asset_data.get("width", 0)), int(asset_data.get("height", 0)))
 
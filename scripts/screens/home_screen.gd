@@ -151,12 +151,9 @@ func _create_furniture_node(furniture: Dictionary, item: ItemData) -> Node2D:
 	# Try to load real asset texture
 	var texture: Texture2D = null
 	
-	# Try loading by item hash if available (convert to string for lookup)
+	# Try loading by item hash if available (one lookup in the item hash index)
 	if item.item_hash != 0:
-		# Convert hash to hex string (same format as SWF filenames might be)
-		var hash_str = "%X" % item.item_hash
-		# Try loading texture by hash string (might need adjustment based on actual mapping)
-		texture = AssetLoader.load_texture_by_filename(hash_str)
+		texture = AssetLoader.load_texture_by_hash(item.item_hash)
 	
 	# Try loading by sprite_path if set
 	if texture == null and not item.sprite_path.is_empty():
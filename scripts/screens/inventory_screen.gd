@@ -110,7 +110,7 @@ func _create_item_card(item: ItemData, count: int) -> Control:
 	vbox.add_theme_constant_override("separation", 3)
 	card.add_child(vbox)
 	
-	# Item icon placeholder
+	# Item icon (placeholder background until a texture is found)
 	var icon = Panel.new()
 	icon.custom_minimum_size = Vector2(60, 50)
 	icon.size_flags_horizontal = Control.SIZE_SHRINK_CENTER
@@ -123,6 +123,15 @@ func _create_item_card(item: ItemData, count: int) -> Control:
 	icon.add_theme_stylebox_override("panel", icon_style)
 	vbox.add_child(icon)
 	
+	var icon_texture = AssetLoader.load_item_icon(item, 64)
+	if icon_texture != null:
+		var icon_rect = TextureRect.new()
+		icon_rect.texture = icon_texture
+		icon_rect.set_anchors_preset(Control.PRESET_FULL_RECT)
+		icon_rect.expand_mode = TextureRect.EXPAND_IGNORE_SIZE
+		icon_rect.stretch_mode = TextureRect.STRETCH_KEEP_ASPECT_CENTERED
+		icon.add_child(icon_rect)
+	
 	# Item name
 	var name_label = Label.new()
 	name_label.text = item.name
@@ -92,7 +92,7 @@ func _create_item_card(item: ItemData) -> Control:
 	vbox.add_theme_constant_override("separation", 5)
 	card.add_child(vbox)
 	
-	# Item icon placeholder
+	# Item icon (placeholder background until a texture is found)
 	var icon_container = Panel.new()
 	icon_container.custom_minimum_size = Vector2(80, 60)
 	icon_container.size_flags_horizontal = Control.SIZE_SHRINK_CENTER
@@ -105,6 +105,15 @@ func _create_item_card(item: ItemData) -> Control:
 	icon_container.add_theme_stylebox_override("panel", icon_style)
 	vbox.add_child(icon_container)
 	
+	var icon_texture = AssetLoader.load_item_icon(item, 128)
+	if icon_texture != null:
+		var icon_rect = TextureRect.new()
+		icon_rect.texture = icon_texture
+		icon_rect.set_anchors_preset(Control.PRESET_FULL_RECT)
+		icon_rect.expand_mode = TextureRect.EXPAND_IGNORE_SIZE
+		icon_rect.stretch_mode = TextureRect.STRETCH_KEEP_ASPECT_CENTERED
+		icon_container.add_child(icon_rect)
+	
 	# Item name
 	var name_label = Label.new()
 	name_label.text = item.name
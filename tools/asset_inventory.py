@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Extracted asset inventory
+=========================
+Records what each SWF's extraction produced - every file's relative path,
+type subdirectory (images/, shapes/, sprites/, buttons/, frames/),
+extension and size - so later stages never have to walk the 839k-file
+extracted tree again.
+
+extract_assets.py scans each output subdirectory once with os.scandir and
+appends one JSON line per SWF to asset_inventory.jsonl (next to the output
+dir). Later lines for the same SWF replace earlier ones. The organize
+scripts build their lookups from this file.
+
+USAGE:
+   python3 asset_inventory.py                   # Rebuild the inventory from an existing extracted tree
+   python3 asset_inventory.py --output DIR      # ... for a different extracted directory
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+INVENTORY_FILENAME = "asset_inventory.jsonl"
+
+# Extensions counted as extracted visual assets
+VISUAL_EXTENSIONS = {"png", "jpg", "jpeg", "svg"}
+
+# Entry fields: [relative path, type subdir, extension, size in bytes]
+PATH, SUBDIR, EXT, SIZE = range(4)
+
+EXTRACTED_DIR = "/Users/pa/PetSocietyMobile/assets/sprites/extracted"
+
+
+def default_inventory_path(output_dir):
+    """The inventory lives next to (not inside) the extraction output dir"""
+    return os.path.join(os.path.dirname(os.path.abspath(output_dir)), INVENTORY_FILENAME)
+
+def scan_output(output_subdir):
+    """Single os.scandir pass over one SWF's output directory"""
+    entries = []
+    stack = [("", output_subdir)]
+    while stack:
+        rel_dir, abs_dir = stack.pop()
+        try:
+            iterator = os.scandir(abs_dir)
+        except FileNotFoundError:
+            continue
+        with iterator:
+            for entry in iterator:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((rel_path, entry.path))
+                    continue
+                subdir = rel_path.split("/", 1)[0] if rel_dir else ""
+                ext = os.path.splitext(entry.name)[1][1:].lower()
+                entries.append([rel_path, subdir, ext, entry.stat(follow_symlinks=False).st_size])
+    entries.sort()
+    return entries
+
+def count_visual(entries):
+    """Number of PNG/JPEG/SVG files in an inventory"""
+    return sum(1 for entry in entries if entry[EXT] in VISUAL_EXTENSIONS)
+
+def load_inventory(path):
+    """SWF name -> inventory entries (latest record wins)"""
+    inventory = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                inventory[record["name"]] = record["files"]
+    return inventory
+
+
+def load_or_scan_inventory(output_dir, workers=8):
+    """The inventory of an extracted tree, scanning it if no inventory file exists"""
+    path = default_inventory_path(output_dir)
+    if os.path.exists(path):
+        return load_inventory(path)
+    names = [e.name for e in os.scandir(output_dir) if e.is_dir() and not e.name.startswith(".")]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(names, executor.map(lambda n: scan_output(os.path.join(output_dir, n)), names)))
+
+
+class InventoryWriter:
+    """Appends one JSON line per SWF to the inventory file"""
+
+    def __init__(self, path, mode='a'):
+        self.file = open(path, mode)
+
+    def write(self, name, entries):
+        self.file.write(json.dumps({"name": name, "files": entries}, separators=(',', ':')) + "\n")
+
+    def close(self):
+        self.file.close()
+
+def rebuild_inventory(output_dir, path):
+    """Scan an existing extracted tree once and write a fresh inventory"""
+    names = sorted(entry.name for entry in os.scandir(output_dir)
+                   if entry.is_dir() and not entry.name.startswith("."))
+    writer = InventoryWriter(path, mode='w')
+    total_files = 0
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for name, entries in zip(names, executor.map(lambda n: scan_output(os.path.join(output_dir, n)), names)):
+            writer.write(name, entries)
+            total_files += len(entries)
+    writer.close()
+    return len(names), total_files
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Rebuild the extracted asset inventory')
+    parser.add_argument('--output', type=str, default=EXTRACTED_DIR, help='Extracted asset directory')
+    parser.add_argument('--inventory', type=str, default=None,
+                        help='Inventory path (default: asset_inventory.jsonl next to the extracted dir)')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.output):
+        print(f"Error: Extracted directory not found: {args.output}")
+        sys.exit(1)
+    inventory_path = args.inventory or default_inventory_path(args.output)
+    print(f"Scanning {args.output}...")
+    dir_count, file_count = rebuild_inventory(args.output, inventory_path)
+    print(f"✓ Inventory of {dir_count:,} directories ({file_count:,} files) written to {inventory_path}")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Asset lookup files
+==================
+Reads and writes the asset lookup produced by organize_assets_v2.py:
+
+- asset_lookup.json        full lookup (compact JSON) for the Python tools
+- asset_lookup/index.json  tiny shard index read by AssetLoader at startup
+- asset_lookup/<id>.json   one shard per SWF basename prefix; AssetLoader
+                           loads a shard the first time a name in it is used
+
+Shard ids are the hex-encoded UTF-8 bytes of the name prefix, so shards for
+"a" and "A" stay distinct on case-insensitive filesystems.
+
+LookupWriter streams entries to disk as they are produced, so the organize
+step never has to hold the whole lookup before writing it.
+"""
+
+import json
+import os
+
+LOOKUP_JSON = "asset_lookup.json"
+SHARD_DIR = "asset_lookup"
+SHARD_INDEX = "index.json"
+SHARD_FORMAT_VERSION = 1
+
+# Characters of the SWF basename that select a shard (~62 shards of ~400 entries)
+SHARD_PREFIX_LENGTH = 1
+
+# Fields only the Python tools need; left out of the runtime shards
+TOOL_ONLY_FIELDS = {"original_path"}
+
+
+def shard_id(asset_name):
+    """Shard a lookup entry belongs to"""
+    return asset_name[:SHARD_PREFIX_LENGTH].encode("utf-8").hex()
+
+def runtime_entry(entry):
+    return {key: value for key, value in entry.items() if key not in TOOL_ONLY_FIELDS}
+
+def _write_json(path, data):
+    """Write compact JSON atomically"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'), sort_keys=True)
+    os.replace(tmp_path, path)
+
+class LookupWriter:
+    """
+    Streams a lookup to disk entry by entry, in ascending name order
+    asset_lookup.json is written as entries arrive (byte-identical to
+    write_lookup's output); the runtime shards, which are small, are
+    written by close(). Returns the same tuple as write_lookup.
+    """
+
+    def __init__(self, godot_assets_dir):
+        self.godot_assets_dir = godot_assets_dir
+        self.lookup_json = os.path.join(godot_assets_dir, LOOKUP_JSON)
+        self.tmp_path = self.lookup_json + ".tmp"
+        self.file = open(self.tmp_path, 'w')
+        self.file.write("{")
+        self.shards = {}
+        self.last_name = None
+        self.count = 0
+
+    def add(self, asset_name, entry):
+        if self.last_name is not None and asset_name <= self.last_name:
+            raise ValueError(f"lookup entries out of order: {asset_name!r} after {self.last_name!r}")
+        self.last_name = asset_name
+        if self.count:
+            self.file.write(",")
+        self.file.write(json.dumps(asset_name) + ":" + json.dumps(entry, separators=(',', ':'), sort_keys=True))
+        self.shards.setdefault(shard_id(asset_name), {})[asset_name] = runtime_entry(entry)
+        self.count += 1
+
+    def close(self):
+        self.file.write("}")
+        self.file.close()
+        os.replace(self.tmp_path, self.lookup_json)
+        shard_dir, shard_count = write_shards(self.shards, self.count, self.godot_assets_dir)
+        return self.lookup_json, shard_dir, shard_count
+
+def write_shards(shards, count, godot_assets_dir):
+    """Write runtime shards ({shard id: {name: entry}}) and their index"""
+    shard_dir = os.path.join(godot_assets_dir, SHARD_DIR)
+    os.makedirs(shard_dir, exist_ok=True)
+    for sid, entries in shards.items():
+        _write_json(os.path.join(shard_dir, f"{sid}.json"), entries)
+
+    # Drop shards left over from an earlier lookup
+    for filename in os.listdir(shard_dir):
+        if filename.endswith(".json") and filename != SHARD_INDEX and filename[:-5] not in shards:
+            os.remove(os.path.join(shard_dir, filename))
+
+    _write_json(os.path.join(shard_dir, SHARD_INDEX), {
+        "version": SHARD_FORMAT_VERSION,
+        "prefix_length": SHARD_PREFIX_LENGTH,
+        "count": count,
+        "shards": {sid: len(entries) for sid, entries in shards.items()},
+    })
+    return shard_dir, len(shards)
+
+def write_lookup(asset_lookup, godot_assets_dir):
+    """
+    Write the full lookup plus the runtime shards and shard index
+    Returns (lookup_json_path, shard_dir, shard_count).
+    """
+    writer = LookupWriter(godot_assets_dir)
+    for asset_name in sorted(asset_lookup):
+        writer.add(asset_name, asset_lookup[asset_name])
+    return writer.close()
+
+def load_lookup(godot_assets_dir):
+    """Read the full lookup written by write_lookup"""
+    with open(os.path.join(godot_assets_dir, LOOKUP_JSON)) as f:
+        return json.load(f)
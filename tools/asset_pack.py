@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Single-file indexed asset pack
+==============================
+The extracted tree is ~25k directories and ~839k files (17 GB). Every
+stage that reads it pays for directory walks and one open() per file. This
+packs the tree into a few large files next to the extracted dir:
+
+    asset_pack/segment_00000.blob   file contents, appended back to back
+    asset_pack/segment_00001.blob   (a new segment starts past SEGMENT_SIZE)
+    asset_pack/index.bin            sorted index
+
+index.bin is little-endian:
+
+   header   magic "PSAP", u16 version, u16 segment count, u32 record
+            count, u32 string table size
+   records  u32 key offset, u16 key length, u16 segment, u64 offset,
+            u64 length, u64 source mtime_ns, 16-byte BLAKE2b content hash,
+            u16 width, u16 height, u8 channels, 3 pad bytes
+   strings  keys, "<SWF name>\\0<type subdir>\\0<file name>" in UTF-8
+
+Records are sorted by key bytes, i.e. by (SWF name, subdir, file name).
+Width, height and channels come from the PNG/JPEG header (image_metadata.py's
+parsers; 0 for other files).
+
+Segments are append-only: an update appends new or changed files and
+writes a new index (atomically), keeping the records of files whose size
+and mtime have not changed. Identical contents are stored once (the index
+points duplicates at the same bytes). Bytes of replaced files stay in their
+segment until --rebuild.
+
+AssetPack reads the index and segments through mmap: lookups are binary
+searches over the mapped index and AssetPack.read returns a memoryview of
+the mapped segment (no copy). organize_assets_v2.py --pack builds the
+lookup from a pack instead of the extracted tree.
+
+USAGE:
+   python3 asset_pack.py                        # Pack (or update the pack of) the extracted dir
+   python3 asset_pack.py --rebuild              # Start a fresh pack (drops replaced bytes)
+   python3 asset_pack.py --stats                # Summarize an existing pack
+   python3 asset_pack.py --cat NAME/PATH > f    # Write one packed file to stdout
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import shutil
+import struct
+import sys
+import time
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from asset_inventory import PATH, load_or_scan_inventory
+from image_metadata import PNG_SIGNATURE, jpeg_header, png_header
+
+EXTRACTED_DIR = "/Users/pa/PetSocietyMobile/assets/sprites/extracted"
+
+PACK_DIRNAME = "asset_pack"
+INDEX_FILENAME = "index.bin"
+SEGMENT_FORMAT = "segment_{:05d}.blob"
+PACK_MAGIC = b"PSAP"
+PACK_VERSION = 1
+
+HEADER = struct.Struct('<4sHHII')
+RECORD = struct.Struct('<IHHQQQ16sHHB3x')
+
+# A segment stops taking new files once it is this large
+SEGMENT_SIZE = 1 << 30
+
+# Files read and hashed ahead of the writer, per reader thread
+MAX_IN_FLIGHT_PER_WORKER = 16
+
+PackEntry = namedtuple("PackEntry", "segment offset length mtime_ns hash width height channels")
+
+
+def default_pack_dir(extracted_dir):
+    """The pack lives next to (not inside) the extracted dir"""
+    return os.path.join(os.path.dirname(os.path.abspath(extracted_dir)), PACK_DIRNAME)
+
+def pack_key(asset_name, rel_path):
+    """Index key of a file: "images/1.png" in SWF "abc" -> b"abc\\0images\\01.png" """
+    subdir, _, filename = rel_path.partition("/") if "/" in rel_path else ("", "", rel_path)
+    return f"{asset_name}\0{subdir}\0{filename}".encode("utf-8")
+
+def split_key(key):
+    """(SWF name, relative path) of an index key"""
+    asset_name, subdir, filename = bytes(key).decode("utf-8").split("\0")
+    return asset_name, f"{subdir}/{filename}" if subdir else filename
+
+def image_header(data):
+    """(width, height, channels) of PNG/JPEG bytes, (0, 0, 0) for anything else"""
+    try:
+        if data[:8] == PNG_SIGNATURE and data[12:16] == b"IHDR":
+            header = png_header(data)
+        elif data[:2] == b"\xff\xd8":
+            header = jpeg_header(data)
+        else:
+            header = None
+    except (struct.error, KeyError):
+        header = None
+    if header is None or max(header[0], header[1]) > 0xFFFF:
+        return 0, 0, 0
+    return header
+
+def file_matches(path, entry):
+    """True if the file at path has exactly the content of a PackEntry"""
+    try:
+        if entry is None or os.path.getsize(path) != entry.length:
+            return False
+        return read_file(path)[1] == entry.hash
+    except OSError:
+        return False
+
+
+# ============================================
+# READER
+# ============================================
+
+class AssetPack:
+    """
+    Memory-mapped reader over a pack directory
+    read() returns memoryviews into the mapped segments; release them
+    before close().
+    """
+
+    def __init__(self, pack_dir):
+        self.pack_dir = pack_dir
+        self._index_file = open(os.path.join(pack_dir, INDEX_FILENAME), 'rb')
+        self._index = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, segments, count, strings_size = HEADER.unpack_from(self._index)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            self.close()
+            raise ValueError(f"{pack_dir} is not a version {PACK_VERSION} asset pack")
+        self.count = count
+        self.segment_count = segments
+        self._strings = HEADER.size + count * RECORD.size
+        self._segments = [None] * segments
+        self._segment_files = [None] * segments
+
+    def close(self):
+        for segment in self._segments:
+            if isinstance(segment, mmap.mmap):
+                segment.close()
+        for f in self._segment_files:
+            if f is not None:
+                f.close()
+        self._index.close()
+        self._index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        return self.find(*key) is not None
+
+    def _record(self, i):
+        return RECORD.unpack_from(self._index, HEADER.size + i * RECORD.size)
+
+    def _key(self, i):
+        key_offset, key_length = struct.unpack_from('<IH', self._index, HEADER.size + i * RECORD.size)
+        start = self._strings + key_offset
+        return self._index[start:start + key_length]
+
+    def _lower_bound(self, key):
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self._key(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def _segment(self, number):
+        if self._segments[number] is None:
+            path = os.path.join(self.pack_dir, SEGMENT_FORMAT.format(number))
+            self._segment_files[number] = open(path, 'rb')
+            if os.fstat(self._segment_files[number].fileno()).st_size == 0:
+                self._segments[number] = b""
+            else:
+                self._segments[number] = mmap.mmap(self._segment_files[number].fileno(), 0, access=mmap.ACCESS_READ)
+        return self._segments[number]
+
+    def find(self, asset_name, rel_path):
+        """PackEntry of a file, or None if it is not packed"""
+        key = pack_key(asset_name, rel_path)
+        i = self._lower_bound(key)
+        if i == self.count or self._key(i) != key:
+            return None
+        return PackEntry(*self._record(i)[2:])
+
+    def read(self, asset_name, rel_path):
+        """Contents of a file as a memoryview of the mapped segment, or None"""
+        entry = self.find(asset_name, rel_path)
+        if entry is None:
+            return None
+        return memoryview(self._segment(entry.segment))[entry.offset:entry.offset + entry.length]
+
+    def read_entry(self, entry):
+        return memoryview(self._segment(entry.segment))[entry.offset:entry.offset + entry.length]
+
+    def records(self, asset_name=None):
+        """Yield (SWF name, relative path, PackEntry) in key order, optionally for one SWF"""
+        if asset_name is None:
+            start, prefix = 0, b""
+        else:
+            prefix = asset_name.encode("utf-8") + b"\0"
+            start = self._lower_bound(prefix)
+        for i in range(start, self.count):
+            key = self._key(i)
+            if not key.startswith(prefix):
+                return
+            yield (*split_key(key), PackEntry(*self._record(i)[2:]))
+
+    def inventory(self):
+        """SWF name -> inventory entries ([rel path, subdir, ext, size]), like asset_inventory.jsonl"""
+        inventory = {}
+        for asset_name, rel_path, entry in self.records():
+            subdir = rel_path.split("/", 1)[0] if "/" in rel_path else ""
+            ext = os.path.splitext(rel_path)[1][1:].lower()
+            inventory.setdefault(asset_name, []).append([rel_path, subdir, ext, entry.length])
+        return inventory
+
+    def extract(self, asset_name, rel_path, dest):
+        """Write one packed file to dest (atomically); returns False if it is not packed"""
+        data = self.read(asset_name, rel_path)
+        if data is None:
+            return False
+        tmp_path = f"{dest}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        data.release()
+        os.replace(tmp_path, dest)
+        return True
+
+
+# ============================================
+# WRITER
+# ============================================
+
+class PackWriter:
+    """
+    Appends files to a pack and writes its index on close()
+    Records of the previous index are only kept when passed to keep().
+    """
+
+    def __init__(self, pack_dir):
+        self.pack_dir = pack_dir
+        os.makedirs(pack_dir, exist_ok=True)
+        self.previous = {}
+        self.by_hash = {}
+        segments = 0
+        if os.path.exists(os.path.join(pack_dir, INDEX_FILENAME)):
+            with AssetPack(pack_dir) as pack:
+                segments = pack.segment_count
+                for i in range(pack.count):
+                    record = pack._record(i)
+                    entry = PackEntry(*record[2:])
+                    self.previous[bytes(pack._key(i))] = entry
+                    self.by_hash.setdefault(entry.hash, entry)
+        self.records = {}
+        self.segment = max(segments - 1, 0)
+        self.file = open(os.path.join(pack_dir, SEGMENT_FORMAT.format(self.segment)), 'ab')
+        self.stats = Counter()
+
+    def unchanged(self, key, size, mtime_ns):
+        """Previous entry of key if its file still has this size and mtime"""
+        entry = self.previous.get(key)
+        if entry is not None and entry.length == size and entry.mtime_ns == mtime_ns:
+            return entry
+        return None
+
+    def keep(self, key, entry):
+        self.records[key] = entry
+        self.stats["unchanged"] += 1
+
+    def add(self, key, data, content_hash, mtime_ns):
+        """Store a file (or point at identical bytes already in the pack)"""
+        width, height, channels = image_header(data)
+        stored = self.by_hash.get(content_hash)
+        if stored is not None and stored.length == len(data):
+            segment, offset = stored.segment, stored.offset
+            self.stats["deduplicated"] += 1
+        else:
+            if self.file.tell() >= SEGMENT_SIZE:
+                self.file.close()
+                self.segment += 1
+                self.file = open(os.path.join(self.pack_dir, SEGMENT_FORMAT.format(self.segment)), 'ab')
+            segment, offset = self.segment, self.file.tell()
+            self.file.write(data)
+            self.stats["appended_bytes"] += len(data)
+            self.stats["packed"] += 1
+        entry = PackEntry(segment, offset, len(data), mtime_ns, content_hash, width, height, channels)
+        self.by_hash.setdefault(content_hash, entry)
+        self.records[key] = entry
+
+    def close(self):
+        """Flush the segments, then swap in the new index"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+        keys = sorted(self.records)
+        strings = b"".join(keys)
+        tmp_path = os.path.join(self.pack_dir, INDEX_FILENAME + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(PACK_MAGIC, PACK_VERSION, self.segment + 1, len(keys), len(strings)))
+            key_offset = 0
+            for key in keys:
+                f.write(RECORD.pack(key_offset, len(key), *self.records[key]))
+                key_offset += len(key)
+            f.write(strings)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.pack_dir, INDEX_FILENAME))
+        self.stats["files"] = len(keys)
+        return self.stats
+
+def read_file(path):
+    """Reader thread: (contents, BLAKE2b-128 hash)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return data, hashlib.blake2b(data, digest_size=16).digest()
+
+def build_pack(extracted_dir, pack_dir, workers=None):
+    """Pack or update the pack of an extracted tree; returns a stats Counter"""
+    inventory = load_or_scan_inventory(extracted_dir)
+    writer = PackWriter(pack_dir)
+    workers = workers or min(32, (os.cpu_count() or 4) * 2)
+    pending = deque()
+
+    def drain(limit):
+        while len(pending) > limit:
+            key, mtime_ns, future = pending.popleft()
+            try:
+                data, content_hash = future.result()
+            except OSError as e:
+                writer.stats["unreadable"] += 1
+                print(f"  Error reading {split_key(key)}: {e}")
+                continue
+            writer.add(key, data, content_hash, mtime_ns)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for idx, asset_name in enumerate(sorted(inventory), 1):
+            for entry in inventory[asset_name]:
+                path = os.path.join(extracted_dir, asset_name, entry[PATH])
+                key = pack_key(asset_name, entry[PATH])
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    writer.stats["missing"] += 1
+                    continue
+                previous = writer.unchanged(key, stat.st_size, stat.st_mtime_ns)
+                if previous is not None:
+                    writer.keep(key, previous)
+                    continue
+                pending.append((key, stat.st_mtime_ns, executor.submit(read_file, path)))
+                drain(workers * MAX_IN_FLIGHT_PER_WORKER)
+            if idx % 1000 == 0:
+                print(f"  Packed {idx}/{len(inventory)} asset directories...")
+        drain(0)
+    return writer.close()
+
+def pack_stats(pack_dir):
+    """Totals of an existing pack"""
+    stats = Counter()
+    live = set()
+    with AssetPack(pack_dir) as pack:
+        for _, _, entry in pack.records():
+            stats["files"] += 1
+            stats["file_bytes"] += entry.length
+            stats["images"] += entry.width > 0
+            if (entry.segment, entry.offset) not in live:
+                live.add((entry.segment, entry.offset))
+                stats["live_bytes"] += entry.length
+        stats["segments"] = pack.segment_count
+    stats["segment_bytes"] = sum(os.path.getsize(os.path.join(pack_dir, SEGMENT_FORMAT.format(n)))
+                                 for n in range(stats["segments"]))
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Pack the extracted tree into indexed blob segments')
+    parser.add_argument('--extracted', type=str, default=EXTRACTED_DIR, help='Extracted assets directory')
+    parser.add_argument('--pack', type=str, default=None, help='Pack directory (default: asset_pack next to it)')
+    parser.add_argument('--rebuild', action='store_true', help='Delete the existing pack and start over')
+    parser.add_argument('--stats', action='store_true', help='Summarize the pack without updating it')
+    parser.add_argument('--cat', type=str, default=None, metavar='NAME/PATH', help='Write one packed file to stdout')
+    parser.add_argument('--workers', type=int, default=None, help='Reader threads (default: 2x CPU count, at most 32)')
+    args = parser.parse_args()
+
+    pack_dir = args.pack or default_pack_dir(args.extracted)
+    if args.cat is not None:
+        asset_name, _, rel_path = args.cat.partition("/")
+        with AssetPack(pack_dir) as pack:
+            data = pack.read(asset_name, rel_path)
+            if data is None:
+                print(f"Error: {args.cat} is not in {pack_dir}", file=sys.stderr)
+                sys.exit(1)
+            sys.stdout.buffer.write(data)
+            data.release()
+        sys.exit(0)
+
+    if not args.stats:
+        if not os.path.isdir(args.extracted):
+            print(f"Error: Extracted directory not found: {args.extracted}")
+            sys.exit(1)
+        print("=" * 60)
+        print("Packing Extracted Assets")
+        print("=" * 60)
+        start_time = time.time()
+        if args.rebuild and os.path.isdir(pack_dir):
+            shutil.rmtree(pack_dir)
+        stats = build_pack(args.extracted, pack_dir, args.workers)
+        print(f"\nFiles:                {stats['files']:,}")
+        print(f"  unchanged:          {stats['unchanged']:,}")
+        print(f"  packed:             {stats['packed']:,} ({stats['appended_bytes'] / 1e6:,.1f} MB appended)")
+        print(f"  deduplicated:       {stats['deduplicated']:,}")
+        print(f"  missing/unreadable: {stats['missing'] + stats['unreadable']:,}")
+        print(f"Time elapsed:         {time.time() - start_time:.1f}s")
+
+    if not os.path.exists(os.path.join(pack_dir, INDEX_FILENAME)):
+        print(f"Error: No asset pack in {pack_dir}")
+        sys.exit(1)
+    stats = pack_stats(pack_dir)
+    print(f"\nPack:                 {pack_dir}")
+    print(f"  files:              {stats['files']:,} ({stats['images']:,} images)")
+    print(f"  file bytes:         {stats['file_bytes'] / 1e6:,.1f} MB ({stats['live_bytes'] / 1e6:,.1f} MB stored once)")
+    print(f"  segments:           {stats['segments']:,} ({stats['segment_bytes'] / 1e6:,.1f} MB, "
+          f"{(stats['segment_bytes'] - stats['live_bytes']) / 1e6:,.1f} MB replaced)")
@@ -0,0 +1,648 @@
+#!/usr/bin/env python3
+"""
+Asset pipeline benchmark
+========================
+Measures the extraction and organize stages without the original 25k-file
+corpus. A deterministic synthetic corpus is generated from a seed:
+
+- FWS and CWS (zlib) containers
+- DefineBitsLossless (RGB24 and colormapped) and DefineBitsLossless2 (ARGB)
+- DefineBitsJPEG2 and DefineBitsJPEG3 with an alpha plane (needs Pillow)
+- DefineShape polygons and multi-frame DefineSprite timelines
+
+About a third of the files are bitmap-only (the native fast path), the rest
+mix bitmaps with vector content or are vector-only (JPEXS). Each stage then
+runs in its own process against a scratch tree, and wall time, throughput,
+peak RSS (the stage and all its children together, sampled every 0.2 s
+with psutil if installed, otherwise ps) and the files it created are
+appended to benchmark_results.jsonl, tagged with the current commit, so
+regressions show up across commits. The summary compares every stage with
+the previous result for the same corpus.
+
+Extraction uses the real JPEXS when --extractor real is given; by default a
+stub stands in for the JVM: it decodes bitmaps with swf_reader.py, writes
+placeholder SVGs for shapes, sprite frames and timeline frames in the JPEXS
+layout, and sleeps --stub-startup seconds per invocation to model JVM start.
+
+Stages whose optional dependencies are missing are reported as skipped.
+
+USAGE:
+   python3 benchmark_pipeline.py                        # 500 SWFs, all stages, stub extractor
+   python3 benchmark_pipeline.py --count 5000 --seed 7  # Bigger corpus
+   python3 benchmark_pipeline.py --stages extract,organize
+   python3 benchmark_pipeline.py --extractor real       # Use JPEXS (auto-detected or --jpexs)
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import swf_reader
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE = os.path.join(TOOLS_DIR, "benchmark_results.jsonl")
+
+DEFAULT_COUNT = 500
+DEFAULT_SEED = 1
+DEFAULT_MAX_BITMAP = 256
+DEFAULT_STUB_STARTUP = 0.3
+
+# How often a running stage's process tree is sampled for its peak RSS
+RSS_SAMPLE_SECONDS = 0.2
+
+SWF_VERSION = 10
+TWIPS = 20
+
+# SWF tag codes the generator writes (see swf_reader.py for the bitmap ones)
+TAG_SET_BACKGROUND_COLOR = 9
+TAG_DEFINE_SHAPE = 2
+TAG_PLACE_OBJECT2 = 26
+TAG_DEFINE_SPRITE = 39
+SHAPE_TAGS = {2, 22, 32, 83}
+
+# JPEXS output folder -> export type
+EXPORT_SUBDIRS = {"images": "image", "shapes": "shape", "sprites": "sprite", "buttons": "button", "frames": "frame"}
+
+# Corpus mix: (kind, weight)
+SWF_KINDS = [("bitmaps", 35), ("mixed", 45), ("vector", 20)]
+
+# Stages in pipeline order: (name, optional module it needs)
+STAGES = [
+    ("extract", None),
+    ("inventory", None),
+    ("dedup", None),
+    ("phash", "numpy"),
+    ("metadata", None),
+    ("rasterize", "resvg_py"),
+    ("organize", None),
+    ("organize_v1", None),
+    ("optimize", "numpy"),
+    ("thumbnails", "numpy"),
+    ("atlases", "PIL"),
+]
+
+
+# ============================================
+# SWF WRITER
+# ============================================
+
+class BitWriter:
+    """MSB-first bit packing for RECT, MATRIX and shape records"""
+
+    def __init__(self):
+        self.bits = []
+
+    def unsigned(self, value, count):
+        self.bits.extend((value >> (count - 1 - i)) & 1 for i in range(count))
+
+    def signed(self, value, count):
+        self.unsigned(value & ((1 << count) - 1), count)
+
+    def to_bytes(self):
+        bits = self.bits + [0] * (-len(self.bits) % 8)
+        return bytes(int("".join(map(str, bits[i:i + 8])), 2) for i in range(0, len(bits), 8))
+
+def signed_bits(*values):
+    """Bits needed to store every value as a signed field"""
+    return max(max(abs(v) for v in values).bit_length() + 1, 2)
+
+def encode_rect(width, height):
+    nbits = signed_bits(width * TWIPS, height * TWIPS)
+    writer = BitWriter()
+    writer.unsigned(nbits, 5)
+    for value in (0, width * TWIPS, 0, height * TWIPS):
+        writer.signed(value, nbits)
+    return writer.to_bytes()
+
+def encode_matrix(x, y):
+    writer = BitWriter()
+    writer.unsigned(0, 2)  # HasScale, HasRotate
+    nbits = signed_bits(x * TWIPS, y * TWIPS)
+    writer.unsigned(nbits, 5)
+    writer.signed(x * TWIPS, nbits)
+    writer.signed(y * TWIPS, nbits)
+    return writer.to_bytes()
+
+def encode_tag(code, body):
+    if len(body) < 0x3f:
+        return struct.pack('<H', (code << 6) | len(body)) + body
+    return struct.pack('<HI', (code << 6) | 0x3f, len(body)) + body
+
+def encode_swf(tags, width, height, frame_count, compressed):
+    body = encode_rect(width, height) + struct.pack('<HH', 24 << 8, frame_count) + b"".join(tags)
+    body += encode_tag(0, b"")
+    header = struct.pack('<I', 8 + len(body))
+    if compressed:
+        return b"CWS" + bytes([SWF_VERSION]) + header + zlib.compress(body, 6)
+    return b"FWS" + bytes([SWF_VERSION]) + header + body
+
+
+# ============================================
+# CONTENT
+# ============================================
+
+def tiled_pixels(rng, width, height, alpha):
+    """
+    ARGB rows tiled from a random 16x16 block (compresses like real art,
+    generated without per-pixel Python loops); alpha blocks get transparent
+    holes, stored premultiplied as SWF expects
+    """
+    block = bytearray(rng.randbytes(16 * 16 * 4))
+    for i in range(0, len(block), 4):
+        if alpha and block[i] < 64:
+            block[i:i + 4] = b"\0\0\0\0"
+        else:
+            block[i] = 255
+    rows = [bytes(block[r * 64:(r + 1) * 64]) for r in range(16)]
+    repeat = width // 16 + 1
+    return b"".join((rows[y % 16] * repeat)[:width * 4] for y in range(height))
+
+def lossless_tag(rng, character_id, width, height):
+    kind = rng.random()
+    if kind < 0.4:
+        pixels = tiled_pixels(rng, width, height, alpha=True)
+        return encode_tag(swf_reader.TAG_DEFINE_BITS_LOSSLESS2, struct.pack(
+            '<HBHH', character_id, swf_reader.BITMAP_FORMAT_RGB24, width, height) + zlib.compress(pixels))
+    if kind < 0.8:
+        pixels = tiled_pixels(rng, width, height, alpha=False)
+        return encode_tag(swf_reader.TAG_DEFINE_BITS_LOSSLESS, struct.pack(
+            '<HBHH', character_id, swf_reader.BITMAP_FORMAT_RGB24, width, height) + zlib.compress(pixels))
+    # Colormapped: palette then indices, rows padded to 4 bytes
+    colors = rng.randint(2, 64)
+    stride = (width + 3) & ~3
+    indices = bytes(rng.randrange(colors) for _ in range(16 * stride))
+    data = rng.randbytes(colors * 3) + (indices * (height // 16 + 1))[:stride * height]
+    return encode_tag(swf_reader.TAG_DEFINE_BITS_LOSSLESS, struct.pack(
+        '<HBHHB', character_id, swf_reader.BITMAP_FORMAT_COLORMAPPED, width, height, colors - 1)
+        + zlib.compress(data))
+
+def jpeg_tag(rng, character_id, width, height):
+    """DefineBitsJPEG2, or DefineBitsJPEG3 with a zlib alpha plane"""
+    pixels = tiled_pixels(rng, width, height, alpha=False)
+    img = Image.frombytes("RGBX", (width, height), pixels[1:] + b"\xff").convert("RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=rng.randint(60, 95))
+    jpeg = buffer.getvalue()
+    if rng.random() < 0.5:
+        return encode_tag(swf_reader.TAG_DEFINE_BITS_JPEG2, struct.pack('<H', character_id) + jpeg)
+    alpha = pixels[1:64:4] * (width * height // 16 + 1)
+    return encode_tag(swf_reader.TAG_DEFINE_BITS_JPEG3, struct.pack('<HI', character_id, len(jpeg))
+                      + jpeg + zlib.compress(alpha[:width * height]))
+
+def shape_tag(rng, character_id, size):
+    """DefineShape: one solid-filled polygon"""
+    points = [(rng.randint(0, size), rng.randint(0, size)) for _ in range(rng.randint(3, 12))]
+    writer = BitWriter()
+    writer.unsigned(1, 4)  # NumFillBits
+    writer.unsigned(0, 4)  # NumLineBits
+    # StyleChangeRecord: move to the first point, select fill style 1
+    x0, y0 = points[0][0] * TWIPS, points[0][1] * TWIPS
+    writer.unsigned(0b000101, 6)  # TypeFlag, NewStyles, LineStyle, FillStyle1, FillStyle0, MoveTo
+    move_bits = signed_bits(x0, y0)
+    writer.unsigned(move_bits, 5)
+    writer.signed(x0, move_bits)
+    writer.signed(y0, move_bits)
+    writer.unsigned(1, 1)  # FillStyle1
+    for (ax, ay), (bx, by) in zip(points, points[1:] + points[:1]):
+        dx, dy = (bx - ax) * TWIPS, (by - ay) * TWIPS
+        nbits = signed_bits(dx, dy)
+        writer.unsigned(0b11, 2)  # TypeFlag (edge), StraightFlag
+        writer.unsigned(nbits - 2, 4)
+        writer.unsigned(1, 1)  # GeneralLineFlag
+        writer.signed(dx, nbits)
+        writer.signed(dy, nbits)
+    writer.unsigned(0, 6)  # EndShapeRecord
+    fill = b"\x01\x00" + rng.randbytes(3)  # one solid fill style
+    return encode_tag(TAG_DEFINE_SHAPE, struct.pack('<H', character_id) + encode_rect(size, size)
+                      + fill + b"\x00" + writer.to_bytes())
+
+def place_tag(character_id, depth, x, y, move=False):
+    flags = 0x04 | (0x01 if move else 0x02)  # HasMatrix, then Move or HasCharacter
+    body = struct.pack('<BH', flags, depth)
+    if not move:
+        body += struct.pack('<H', character_id)
+    return encode_tag(TAG_PLACE_OBJECT2, body + encode_matrix(x, y))
+
+def sprite_tag(rng, character_id, child_ids):
+    """DefineSprite animating its children over several frames"""
+    frames = rng.randint(2, 12)
+    control = []
+    for frame in range(frames):
+        for depth, child in enumerate(child_ids, 1):
+            control.append(place_tag(child, depth, rng.randint(0, 50), rng.randint(0, 50), move=frame > 0))
+        control.append(encode_tag(swf_reader.TAG_SHOW_FRAME, b""))
+    control.append(encode_tag(0, b""))
+    return encode_tag(TAG_DEFINE_SPRITE, struct.pack('<HH', character_id, frames) + b"".join(control))
+
+def generate_swf(rng, max_bitmap, with_jpeg):
+    """(SWF bytes, kind) for one synthetic file"""
+    kind = rng.choices([k for k, _ in SWF_KINDS], weights=[w for _, w in SWF_KINDS])[0]
+    tags = [encode_tag(TAG_SET_BACKGROUND_COLOR, rng.randbytes(3))]
+    next_id = 1
+    if kind in ("bitmaps", "mixed"):
+        for _ in range(rng.randint(1, 4)):
+            width, height = rng.randint(8, max_bitmap), rng.randint(8, max_bitmap)
+            if with_jpeg and rng.random() < 0.3:
+                tags.append(jpeg_tag(rng, next_id, width, height))
+            else:
+                tags.append(lossless_tag(rng, next_id, width, height))
+            next_id += 1
+    frame_count = 1
+    if kind in ("mixed", "vector"):
+        shape_ids = []
+        for _ in range(rng.randint(1, 6)):
+            tags.append(shape_tag(rng, next_id, rng.randint(10, max_bitmap)))
+            shape_ids.append(next_id)
+            next_id += 1
+        tags.append(sprite_tag(rng, next_id, shape_ids[:3]))
+        tags.append(place_tag(next_id, 1, 0, 0))
+        frame_count = rng.randint(1, 3)
+        tags.extend([encode_tag(swf_reader.TAG_SHOW_FRAME, b"")] * frame_count)
+    return encode_swf(tags, max_bitmap, max_bitmap, frame_count, compressed=rng.random() < 0.7), kind
+
+def generate_corpus(corpus_dir, count, seed, max_bitmap):
+    """Write count SWFs named like the originals (random IDs, no extension); returns stats"""
+    os.makedirs(corpus_dir, exist_ok=True)
+    rng = random.Random(seed)
+    with_jpeg = Image is not None
+    stats = {"files": count, "bytes": 0, "kinds": {kind: 0 for kind, _ in SWF_KINDS}, "jpeg": with_jpeg}
+    for _ in range(count):
+        name = "".join(rng.choices("0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ", k=10))
+        data, kind = generate_swf(random.Random(rng.getrandbits(64)), max_bitmap, with_jpeg)
+        with open(os.path.join(corpus_dir, name), 'wb') as f:
+            f.write(data)
+        stats["bytes"] += len(data)
+        stats["kinds"][kind] += 1
+    return stats
+
+
+# ============================================
+# STUB EXTRACTOR (stands in for java -jar ffdec.jar)
+# ============================================
+
+def placeholder_svg(content):
+    """An SVG derived from the tag bytes, so identical tags export identical files"""
+    digest = hashlib.blake2b(content, digest_size=8).digest()
+    width, height = 16 + digest[0], 16 + digest[1]
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}px" height="{height}px">'
+            f'<rect width="{width}" height="{height}" fill="#{digest[2:5].hex()}"/></svg>').encode()
+
+def stub_export(swf_path, output_dir, asset_types):
+    """Write what JPEXS would export for one SWF (bitmaps decoded, vectors as placeholders)"""
+    jpeg_tables = None
+    frames = 0
+    outputs = []
+    with swf_reader.SwfStream(swf_path) as stream:
+        stream.read_header_fields()
+        want = swf_reader.BITMAP_TAGS | SHAPE_TAGS | {swf_reader.TAG_JPEG_TABLES, TAG_DEFINE_SPRITE}
+        for code, _, body in stream.iter_tags(want=want):
+            if code == swf_reader.TAG_JPEG_TABLES:
+                jpeg_tables = body
+            elif code in swf_reader.BITMAP_TAGS:
+                character_id, extension, data = swf_reader.decode_bitmap_tag(code, body, jpeg_tables)
+                outputs.append((f"images/{character_id}.{extension}", data))
+            elif code in SHAPE_TAGS:
+                character_id = struct.unpack('<H', body[:2])[0]
+                outputs.append((f"shapes/{character_id}.svg", placeholder_svg(body)))
+            elif code == TAG_DEFINE_SPRITE:
+                character_id, frame_count = struct.unpack('<HH', body[:4])
+                for frame in range(1, frame_count + 1):
+                    outputs.append((f"sprites/DefineSprite_{character_id}/{frame}.svg",
+                                    placeholder_svg(body + bytes([frame & 0xff]))))
+            elif code == swf_reader.TAG_SHOW_FRAME:
+                frames += 1
+                frame_key = f"{os.path.basename(swf_path)}/{frames}".encode()
+                outputs.append((f"frames/{frames}.svg", placeholder_svg(frame_key)))
+    for rel_path, data in outputs:
+        if EXPORT_SUBDIRS[rel_path.split("/")[0]] not in asset_types:
+            continue
+        path = os.path.join(output_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+def stub_ffdec(argv, startup):
+    """Handle a java command line the way JPEXS would: -version or -export TYPES OUT IN"""
+    time.sleep(startup)
+    if "-version" in argv and "-export" not in argv:
+        print("stub-ffdec 1.0")
+        return 0
+    position = argv.index("-export")
+    asset_types = argv[position + 1].split(",")
+    output_dir, input_path = argv[position + 2], argv[position + 3]
+    ignore_errors = "-onerror" in argv
+    if os.path.isdir(input_path):
+        jobs = [(os.path.join(input_path, name), os.path.join(output_dir, name))
+                for name in sorted(os.listdir(input_path)) if name.endswith(".swf")]
+    else:
+        jobs = [(input_path, output_dir)]
+    for swf_path, swf_output in jobs:
+        try:
+            stub_export(swf_path, swf_output, asset_types)
+        except (swf_reader.UnsupportedSwf, struct.error, zlib.error, ValueError, OSError):
+            if not ignore_errors:
+                return 1
+    return 0
+
+def write_stub_java(work_dir, startup):
+    """An executable that runs stub_ffdec in place of java"""
+    path = os.path.join(work_dir, "stub-java")
+    with open(path, 'w') as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.abspath(__file__)}" '
+                f'--stub-ffdec --stub-startup {startup} "$@"\n')
+    os.chmod(path, 0o755)
+    jar = os.path.join(work_dir, "stub-ffdec.jar")
+    open(jar, 'w').close()
+    return path, jar
+
+
+# ============================================
+# STAGES
+# ============================================
+
+def module_available(name):
+    if name is None:
+        return True
+    try:
+        __import__(name)
+        return True
+    except ImportError:
+        return False
+
+def python_snippet(code):
+    return [sys.executable, "-c", f"import sys; sys.path.insert(0, {TOOLS_DIR!r})\n{code}"]
+
+def stage_command(stage, paths, args):
+    """argv for one stage run against the scratch tree"""
+    extracted, sprites = paths["extracted"], paths["sprites"]
+    tool = lambda name: [sys.executable, os.path.join(TOOLS_DIR, name)]
+    if stage == "extract":
+        cmd = tool("extract_assets.py") + ["--source", paths["corpus"], "--output", extracted, "--yes"]
+        if args.parallel:
+            cmd += ["--parallel", str(args.parallel)]
+        if args.extractor == "stub":
+            cmd += ["--java", paths["java"], "--jpexs", paths["jar"]]
+        elif args.jpexs:
+            cmd += ["--jpexs", args.jpexs]
+        return cmd
+    if stage == "inventory":
+        return tool("asset_inventory.py") + ["--output", extracted]
+    if stage == "dedup":
+        return tool("dedup_assets.py") + ["--output", extracted]
+    if stage == "phash":
+        return tool("perceptual_hash.py") + ["--output", extracted]
+    if stage == "metadata":
+        return tool("image_metadata.py") + ["--output", extracted]
+    if stage == "rasterize":
+        return tool("rasterize_shapes.py") + ["--output", extracted]
+    if stage == "organize":
+        return python_snippet(f"import organize_assets_v2 as m\nm.EXTRACTED_DIR = {extracted!r}\n"
+                              f"m.GODOT_ASSETS_DIR = {sprites!r}\nm.create_asset_lookup()")
+    if stage == "organize_v1":
+        return python_snippet(f"import organize_assets as m\nm.EXTRACTED_DIR = {extracted!r}\n"
+                              f"m.ORGANIZED_DIR = {os.path.join(sprites, 'organized')!r}\nm.organize_assets()")
+    if stage == "optimize":
+        return tool("optimize_pngs.py") + ["--assets", sprites]
+    if stage == "thumbnails":
+        return tool("build_thumbnails.py") + ["--assets", sprites]
+    if stage == "atlases":
+        return tool("build_atlases.py") + ["--assets", sprites]
+    raise ValueError(stage)
+
+def tree_rss_kb(root_pid):
+    """Summed RSS in kB of a process and all its descendants (0 once it has exited)"""
+    if psutil is not None:
+        try:
+            root = psutil.Process(root_pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return 0
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss // 1024
+            except psutil.Error:
+                pass
+        return total
+    try:
+        result = subprocess.run(["ps", "-A", "-o", "pid=,ppid=,rss="], capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.TimeoutExpired):
+        return 0
+    children, rss = {}, {}
+    for line in result.stdout.splitlines():
+        fields = line.split()
+        if len(fields) == 3 and all(field.isdigit() for field in fields):
+            pid, ppid, kb = map(int, fields)
+            children.setdefault(ppid, []).append(pid)
+            rss[pid] = kb  # kB on Linux and macOS
+    total, stack = 0, [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total
+
+def measure(cmd, log_path):
+    """
+    Run cmd, sampling the summed RSS of its whole process tree every
+    RSS_SAMPLE_SECONDS (processes living shorter than that can be missed)
+    Returns (exit code, seconds, peak RSS in MB).
+    """
+    started = time.time()
+    peak_kb = 0
+    with open(log_path, 'w') as log:
+        process = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+        while True:
+            peak_kb = max(peak_kb, tree_rss_kb(process.pid))
+            try:
+                code = process.wait(timeout=RSS_SAMPLE_SECONDS)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+    return code, time.time() - started, peak_kb / 1024
+
+def tree_stats(path):
+    """(files, bytes) under path, symlinks counted but not followed"""
+    files = size = 0
+    stack = [path]
+    while stack:
+        try:
+            iterator = os.scandir(stack.pop())
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with iterator:
+            for entry in iterator:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    files += 1
+                    size += entry.stat(follow_symlinks=False).st_size
+    return files, size
+
+
+# ============================================
+# RESULTS
+# ============================================
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=TOOLS_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no", "--", "."],
+                               cwd=TOOLS_DIR, capture_output=True, text=True, timeout=60).stdout.strip()
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return f"{commit}+dirty" if commit and dirty else commit or None
+
+def corpus_key(args):
+    """Results are comparable when the corpus and extractor match"""
+    return f"count={args.count},seed={args.seed},max_bitmap={args.max_bitmap},extractor={args.extractor}"
+
+def load_previous(results_path, key):
+    """stage -> latest earlier result for the same corpus"""
+    previous = {}
+    if os.path.exists(results_path):
+        with open(results_path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    if record.get("corpus") == key and record.get("status") == "ok":
+                        previous[record["stage"]] = record
+    return previous
+
+def change(current, before):
+    if not before:
+        return ""
+    return f"{(current - before) / before * 100:+.0f}%"
+
+def run_benchmark(args):
+    work_dir = args.workdir or tempfile.mkdtemp(prefix="asset_bench_")
+    paths = {
+        "corpus": os.path.join(work_dir, "corpus"),
+        "sprites": os.path.join(work_dir, "sprites"),
+        "extracted": os.path.join(work_dir, "sprites", "extracted"),
+        "logs": os.path.join(work_dir, "logs"),
+    }
+    for key in ("sprites", "logs"):
+        shutil.rmtree(paths[key], ignore_errors=True)
+        os.makedirs(paths[key])
+    paths["java"], paths["jar"] = write_stub_java(work_dir, args.stub_startup)
+
+    print(f"Generating {args.count:,} SWFs (seed {args.seed}) in {paths['corpus']}...")
+    shutil.rmtree(paths["corpus"], ignore_errors=True)
+    corpus = generate_corpus(paths["corpus"], args.count, args.seed, args.max_bitmap)
+    print(f"  {corpus['bytes'] / 2**20:.1f} MB: " + ", ".join(f"{n} {k}" for k, n in corpus["kinds"].items())
+          + ("" if corpus["jpeg"] else " (no JPEG tags: Pillow not installed)"))
+
+    stages = [name for name, _ in STAGES] if args.stages == "all" else args.stages.split(",")
+    requirements = dict(STAGES)
+    key = corpus_key(args)
+    previous = load_previous(args.results, key)
+    commit = git_commit()
+    records = []
+    for stage in stages:
+        if stage not in requirements:
+            print(f"Error: Unknown stage {stage} (choose from {', '.join(requirements)})")
+            sys.exit(1)
+        record = {"time": round(time.time(), 3), "commit": commit, "host": platform.node(),
+                  "cpus": os.cpu_count(), "corpus": key, "stage": stage}
+        if not module_available(requirements[stage]):
+            record["status"] = f"skipped ({requirements[stage]} not installed)"
+            records.append(record)
+            continue
+        before_files, before_bytes = tree_stats(paths["sprites"])
+        print(f"Running {stage}...")
+        code, seconds, rss_mb = measure(stage_command(stage, paths, args), os.path.join(paths["logs"], f"{stage}.log"))
+        after_files, after_bytes = tree_stats(paths["sprites"])
+        record.update({
+            "status": "ok" if code == 0 else f"exit {code}",
+            "seconds": round(seconds, 3),
+            "swfs_per_second": round(args.count / seconds, 2) if seconds > 0 else None,
+            "peak_rss_mb": round(rss_mb, 1),
+            "files_created": after_files - before_files,
+            "bytes_created": after_bytes - before_bytes,
+            "files_total": after_files,
+        })
+        records.append(record)
+
+    with open(args.results, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(',', ':')) + "\n")
+
+    print(f"\n{'Stage':<13}{'Status':<12}{'Seconds':>9}{'SWF/s':>9}{'Peak RSS':>10}{'Files':>9}  vs previous")
+    print("-" * 80)
+    for record in records:
+        if record["status"] != "ok":
+            print(f"{record['stage']:<13}{record['status']}")
+            continue
+        before = previous.get(record["stage"])
+        versus = "(first run)"
+        if before:
+            versus = (f"{change(record['seconds'], before['seconds'])} time, "
+                      f"{change(record['peak_rss_mb'], before['peak_rss_mb'])} RSS")
+        print(f"{record['stage']:<13}{'ok':<12}{record['seconds']:>9.2f}{record['swfs_per_second']:>9.1f}"
+              f"{record['peak_rss_mb']:>8.0f}MB{record['files_created']:>9,}  {versus}")
+    print(f"\nResults appended to {args.results}")
+    print(f"Stage logs in {paths['logs']}")
+    if not args.keep and not args.workdir:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return records
+
+if __name__ == "__main__":
+    if "--stub-ffdec" in sys.argv:
+        argv = sys.argv[1:]
+        argv.remove("--stub-ffdec")
+        startup = DEFAULT_STUB_STARTUP
+        if "--stub-startup" in argv:
+            position = argv.index("--stub-startup")
+            startup = float(argv[position + 1])
+            del argv[position:position + 2]
+        sys.exit(stub_ffdec(argv, startup))
+
+    parser = argparse.ArgumentParser(description='Benchmark the asset pipeline on a synthetic SWF corpus')
+    parser.add_argument('--count', type=int, default=DEFAULT_COUNT, help=f'SWFs to generate (default: {DEFAULT_COUNT})')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='Corpus seed (same seed, same corpus)')
+    parser.add_argument('--max-bitmap', type=int, default=DEFAULT_MAX_BITMAP,
+                        help=f'Largest bitmap/shape edge in pixels (default: {DEFAULT_MAX_BITMAP})')
+    parser.add_argument('--stages', type=str, default="all",
+                        help='Comma-separated stages: ' + ",".join(name for name, _ in STAGES) + ' (default: all)')
+    parser.add_argument('--extractor', choices=['stub', 'real'], default='stub',
+                        help='JPEXS stand-in or the real JPEXS (default: stub)')
+    parser.add_argument('--stub-startup', type=float, default=DEFAULT_STUB_STARTUP,
+                        help=f'Seconds each stub invocation sleeps to model JVM start (default: {DEFAULT_STUB_STARTUP})')
+    parser.add_argument('--jpexs', type=str, default=None, help='ffdec.jar for --extractor real')
+    parser.add_argument('--parallel', type=int, default=0, help='--parallel for extract_assets.py')
+    parser.add_argument('--results', type=str, default=RESULTS_FILE, help='Results file (JSON lines)')
+    parser.add_argument('--workdir', type=str, default=None, help='Scratch directory (default: temporary, removed)')
+    parser.add_argument('--keep', action='store_true', help='Keep the temporary scratch directory')
+    args = parser.parse_args()
+
+    if args.count < 1:
+        print("Error: --count must be at least 1")
+        sys.exit(1)
+    print("=" * 60)
+    print("Asset Pipeline Benchmark")
+    print("=" * 60)
+    run_benchmark(args)
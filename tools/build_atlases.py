@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Texture atlas builder
+=====================
+Packs the PNG sprites of the asset lookup (assets/sprites/lookup/) into
+power-of-two atlas pages so Godot imports and binds a few hundred textures
+instead of ~25k.
+
+- every sprite is trimmed to its alpha bounding box
+- sprites are grouped (by organize_assets.py category, or by lookup shard)
+  and packed per group with MaxRects (best short side fit, no rotation)
+- pages are at most MAX_PAGE_SIZE square and shrunk to the smallest
+  power-of-two size that holds what was placed
+- sprites larger than MAX_SPRITE_SIZE stay separate textures
+
+Each packed lookup entry gets an "atlas" field:
+
+    {"page": "res://assets/sprites/atlases/ui_0.png",
+     "rect": [x, y, w, h],      # trimmed sprite on the page
+     "offset": [left, top],     # where the trimmed rect sits in the original
+     "size": [width, height]}   # original sprite size
+
+which AssetLoader turns into an AtlasTexture (region = rect, margin restores
+the trimmed border). The full manifest is also written to
+atlases/atlas_manifest.json. Run after organize_assets_v2.py (which rewrites
+the lookup without atlas fields).
+
+Requires Pillow (pip3 install pillow).
+
+USAGE:
+   python3 build_atlases.py                   # Pack lookup sprites by category
+   python3 build_atlases.py --group shard     # Group by lookup shard instead
+   python3 build_atlases.py --remove-packed   # Also delete packed sprites from lookup/
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from asset_lookup import load_lookup, shard_id, write_lookup
+from organize_assets import categorize_asset
+from swf_symbols import load_symbol_index
+
+GODOT_ASSETS_DIR = "/Users/pa/PetSocietyMobile/assets/sprites"
+EXTRACTED_DIR = "/Users/pa/PetSocietyMobile/assets/sprites/extracted"
+
+ATLAS_DIR = "atlases"
+ATLAS_RES_PREFIX = "res://assets/sprites/atlases/"
+ATLAS_MANIFEST = "atlas_manifest.json"
+ATLAS_MANIFEST_VERSION = 1
+
+# Largest page edge (Godot/mobile GPUs handle 2048 everywhere)
+MAX_PAGE_SIZE = 2048
+
+# Sprites with a larger trimmed edge are left as separate textures
+MAX_SPRITE_SIZE = 512
+
+# Transparent pixels between packed sprites (avoids bleeding when filtered)
+PADDING = 2
+
+
+# ============================================
+# MAXRECTS PACKER
+# ============================================
+
+class MaxRectsPage:
+    """
+    One atlas page packed with MaxRects (best short side fit, no rotation)
+    Free space is kept as a list of maximal, possibly overlapping rectangles.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.free = [(0, 0, size, size)]
+        self.used_width = 0
+        self.used_height = 0
+
+    def _find_position(self, width, height):
+        best = None
+        best_score = None
+        for fx, fy, fw, fh in self.free:
+            if width <= fw and height <= fh:
+                score = (min(fw - width, fh - height), max(fw - width, fh - height))
+                if best_score is None or score < best_score:
+                    best, best_score = (fx, fy), score
+        return best
+
+    def insert(self, width, height):
+        """Place a width x height rectangle; returns (x, y) or None if it does not fit"""
+        position = self._find_position(width, height)
+        if position is None:
+            return None
+        x, y = position
+        self._split(x, y, width, height)
+        self.used_width = max(self.used_width, x + width)
+        self.used_height = max(self.used_height, y + height)
+        return position
+
+    def _split(self, x, y, width, height):
+        kept, created = [], []
+        for fx, fy, fw, fh in self.free:
+            if x >= fx + fw or x + width <= fx or y >= fy + fh or y + height <= fy:
+                kept.append((fx, fy, fw, fh))
+                continue
+            # Up to four maximal rectangles around the placed one
+            if x > fx:
+                created.append((fx, fy, x - fx, fh))
+            if x + width < fx + fw:
+                created.append((x + width, fy, fx + fw - x - width, fh))
+            if y > fy:
+                created.append((fx, fy, fw, y - fy))
+            if y + height < fy + fh:
+                created.append((fx, y + height, fw, fy + fh - y - height))
+        # Prune non-maximal rectangles; the untouched ones were already maximal
+        unique = list(dict.fromkeys(created))
+        created = [r for r in unique
+                   if not any(o != r and _contains(o, r) for o in unique)
+                   and not any(_contains(o, r) for o in kept)]
+        kept = [r for r in kept if not any(_contains(n, r) for n in created)]
+        self.free = kept + created
+
+    def page_size(self):
+        """Smallest power-of-two (width, height) holding everything placed"""
+        return _next_power_of_two(self.used_width), _next_power_of_two(self.used_height)
+
+def _contains(outer, inner):
+    return (inner[0] >= outer[0] and inner[1] >= outer[1]
+            and inner[0] + inner[2] <= outer[0] + outer[2]
+            and inner[1] + inner[3] <= outer[1] + outer[3])
+
+def _next_power_of_two(value):
+    size = 1
+    while size < value:
+        size *= 2
+    return size
+
+def pack_group(sprites, page_size=MAX_PAGE_SIZE, padding=PADDING):
+    """
+    Pack (name, width, height) sprites into as few pages as needed
+    Returns a list of pages, each ((page_width, page_height), {name: (x, y)}).
+    """
+    # Tallest / widest first packs tightest
+    remaining = sorted(sprites, key=lambda s: (max(s[1], s[2]), s[1] * s[2], s[0]), reverse=True)
+    pages = []
+    while remaining:
+        page = MaxRectsPage(page_size)
+        placed, deferred = {}, []
+        for name, width, height in remaining:
+            position = page.insert(width + padding, height + padding)
+            if position is None:
+                deferred.append((name, width, height))
+            else:
+                placed[name] = position
+        pages.append((page.page_size(), placed))
+        remaining = deferred
+    return pages
+
+
+# ============================================
+# IMAGE WORK (worker processes)
+# ============================================
+
+def measure_sprite(item):
+    """(name, original size, alpha bounding box) or None if unreadable"""
+    name, path = item
+    try:
+        with Image.open(path) as img:
+            img = img.convert("RGBA")
+            bbox = img.getchannel("A").getbbox()
+            return name, img.size, bbox
+    except (OSError, ValueError):
+        return None
+
+def pack_and_describe(item):
+    """Pack one group; runs in a worker"""
+    group, sprites = item
+    return group, pack_group(sprites)
+
+def render_page(item):
+    """Compose and save one atlas page"""
+    page_path, page_size, placements = item
+    page = Image.new("RGBA", page_size, (0, 0, 0, 0))
+    for source_path, bbox, position in placements:
+        with Image.open(source_path) as img:
+            page.paste(img.convert("RGBA").crop(bbox), position)
+    tmp_path = page_path + ".tmp.png"
+    page.save(tmp_path, optimize=True)
+    os.replace(tmp_path, page_path)
+    return page_path
+
+
+# ============================================
+# BUILD
+# ============================================
+
+def group_key(asset_name, entry, group_by, symbol_index):
+    if group_by == "shard":
+        return f"s{shard_id(asset_name)}"
+    return categorize_asset(asset_name, "/images/" in entry.get("original_path", ""),
+                            symbol_index.get(asset_name, ()))
+
+def build_atlases(godot_assets_dir, group_by="category", remove_packed=False, workers=None,
+                  extracted_dir=EXTRACTED_DIR):
+    """Pack the lookup's PNG sprites into atlas pages; returns a stats dict"""
+    asset_lookup = load_lookup(godot_assets_dir)
+    # Same symbol names organize_assets.py categorizes with
+    symbol_index = load_symbol_index(extracted_dir) if group_by == "category" else {}
+    atlas_dir = os.path.join(godot_assets_dir, ATLAS_DIR)
+    os.makedirs(atlas_dir, exist_ok=True)
+
+    items = []
+    for asset_name, entry in sorted(asset_lookup.items()):
+        entry.pop("atlas", None)
+        if entry.get("type") == "png":
+            # Read the extracted file itself; lookup/ symlinks may have been removed
+            path = entry.get("original_path") or os.path.join(godot_assets_dir, "lookup", f"{asset_name}.png")
+            items.append((asset_name, path))
+    source_paths = dict(items)
+
+    stats = {"sprites": len(items), "packed": 0, "too_large": 0, "unreadable": 0, "pages": 0}
+    groups = defaultdict(list)
+    bboxes, sizes = {}, {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(measure_sprite, items, chunksize=64):
+            if result is None:
+                stats["unreadable"] += 1
+                continue
+            asset_name, size, bbox = result
+            if bbox is None:
+                bbox = (0, 0, 1, 1)  # fully transparent: keep one pixel
+            width, height = bbox[2] - bbox[0], bbox[3] - bbox[1]
+            if max(width, height) > MAX_SPRITE_SIZE:
+                stats["too_large"] += 1
+                continue
+            bboxes[asset_name], sizes[asset_name] = bbox, size
+            groups[group_key(asset_name, asset_lookup[asset_name], group_by, symbol_index)].append((asset_name, width, height))
+
+        manifest = {"version": ATLAS_MANIFEST_VERSION, "pages": {}, "sprites": {}}
+        page_jobs = []
+        for group, pages in executor.map(pack_and_describe, sorted(groups.items())):
+            for index, (page_size, placed) in enumerate(pages):
+                page_name = f"{group}_{index}.png"
+                page_res = ATLAS_RES_PREFIX + page_name
+                manifest["pages"][page_res] = list(page_size)
+                placements = []
+                for asset_name, (x, y) in sorted(placed.items()):
+                    bbox = bboxes[asset_name]
+                    atlas = {
+                        "page": page_res,
+                        "rect": [x, y, bbox[2] - bbox[0], bbox[3] - bbox[1]],
+                        "offset": [bbox[0], bbox[1]],
+                        "size": list(sizes[asset_name]),
+                    }
+                    manifest["sprites"][asset_name] = atlas
+                    asset_lookup[asset_name]["atlas"] = atlas
+                    placements.append((source_paths[asset_name], bbox, (x, y)))
+                page_jobs.append((os.path.join(atlas_dir, page_name), page_size, placements))
+        stats["pages"] = len(page_jobs)
+        stats["packed"] = len(manifest["sprites"])
+
+        for idx, _ in enumerate(executor.map(render_page, page_jobs), 1):
+            if idx % 25 == 0:
+                print(f"  Rendered {idx}/{len(page_jobs)} pages...")
+
+    # Drop pages left over from an earlier build
+    current_pages = {os.path.basename(job[0]) for job in page_jobs}
+    for filename in os.listdir(atlas_dir):
+        if filename.endswith(".png") and filename not in current_pages:
+            os.remove(os.path.join(atlas_dir, filename))
+            if os.path.exists(os.path.join(atlas_dir, filename + ".import")):
+                os.remove(os.path.join(atlas_dir, filename + ".import"))
+
+    with open(os.path.join(atlas_dir, ATLAS_MANIFEST), 'w') as f:
+        json.dump(manifest, f, separators=(',', ':'), sort_keys=True)
+    write_lookup(asset_lookup, godot_assets_dir)
+
+    if remove_packed:
+        for asset_name in manifest["sprites"]:
+            lookup_file = os.path.join(godot_assets_dir, "lookup", f"{asset_name}.png")
+            for path in (lookup_file, lookup_file + ".import"):
+                if os.path.lexists(path):
+                    os.remove(path)
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Pack lookup sprites into texture atlases')
+    parser.add_argument('--assets', type=str, default=GODOT_ASSETS_DIR, help='Godot sprites directory')
+    parser.add_argument('--extracted', type=str, default=EXTRACTED_DIR,
+                        help='Extracted assets directory (for swf_symbol_index.json next to it)')
+    parser.add_argument('--group', choices=['category', 'shard'], default='category',
+                        help='Pack sprites of the same category or lookup shard together')
+    parser.add_argument('--remove-packed', action='store_true',
+                        help='Delete packed sprites (and their .import files) from lookup/')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    if Image is None:
+        print("Error: Pillow is required (pip3 install pillow)")
+        sys.exit(1)
+    if not os.path.exists(os.path.join(args.assets, "asset_lookup.json")):
+        print(f"Error: No asset_lookup.json in {args.assets} (run organize_assets_v2.py first)")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Building Texture Atlases")
+    print("=" * 60)
+    start_time = time.time()
+    stats = build_atlases(args.assets, group_by=args.group, remove_packed=args.remove_packed,
+                          workers=args.workers, extracted_dir=args.extracted)
+
+    print(f"\nPNG sprites:          {stats['sprites']:,}")
+    print(f"  packed:             {stats['packed']:,}")
+    print(f"  too large to pack:  {stats['too_large']:,}")
+    print(f"  unreadable:         {stats['unreadable']:,}")
+    print(f"Atlas pages:          {stats['pages']:,}")
+    print(f"Time elapsed:         {time.time() - start_time:.1f}s")
+    print(f"\nAtlases: {os.path.join(args.assets, ATLAS_DIR)}")
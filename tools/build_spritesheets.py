@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Animation spritesheet builder
+=============================
+JPEXS writes every frame of the main timeline (frames/<n>.png) and of each
+sprite (sprites/DefineSprite_<id>/<n>.png) as a separate full-canvas PNG,
+and the organize scripts keep only the single largest file of each SWF.
+This stage turns every multi-frame timeline into one animation:
+
+- each frame is trimmed to its alpha bounding box (NumPy, per frame)
+- frames with the same trimmed pixels share one cell, whatever their
+  position on the canvas, so repeated and moved frames are stored once
+- runs of consecutive identical frames become one frame with a longer
+  duration
+- the cells are packed (build_atlases.py's MaxRects packer) into one sheet
+  per animation, split over more pages only if it exceeds MAX_SHEET_SIZE
+
+Sheets and their metadata go to assets/sprites/spritesheets/:
+
+    <asset>_<timeline>_<page>.png
+    <asset>_<timeline>.json   {"fps": 24, "size": [w, h], "pages": [...],
+                               "cells": [[page, x, y, w, h], ...],
+                               "frames": [[cell, left, top, duration], ...]}
+
+durations are in SWF frames (fps is the SWF's frame rate). Lookup entries
+get an "animations" field ({"frames": "res://.../x_frames.json", ...}) that
+AssetLoader.load_sprite_frames turns into SpriteFrames. Each JSON records
+a key of the paths, sizes and mtimes of the frames it was built from, so
+reruns skip unchanged timelines. Run after organize_assets_v2.py (which rewrites the lookup).
+
+Requires NumPy and Pillow (pip3 install numpy pillow).
+
+USAGE:
+   python3 build_spritesheets.py                    # Every timeline with 2+ frames
+   python3 build_spritesheets.py --min-frames 4     # Only longer animations
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from asset_inventory import PATH, EXT, SIZE, load_or_scan_inventory
+from asset_lookup import load_lookup, write_lookup
+from build_atlases import PADDING, pack_group
+from swf_reader import SwfStream, UnsupportedSwf
+
+SOURCE_DIR = "/Users/pa/petsociety/static/assets"
+EXTRACTED_DIR = "/Users/pa/PetSocietyMobile/assets/sprites/extracted"
+GODOT_ASSETS_DIR = "/Users/pa/PetSocietyMobile/assets/sprites"
+
+SHEET_DIR = "spritesheets"
+SHEET_RES_PREFIX = "res://assets/sprites/spritesheets/"
+SHEET_FORMAT_VERSION = 1
+
+# Largest sheet edge; timelines whose cells do not fit one page use several
+MAX_SHEET_SIZE = 2048
+
+# Timelines with fewer frames are not animations
+MIN_FRAMES = 2
+
+# Flash's default, used when the SWF header cannot be read
+DEFAULT_FPS = 24.0
+
+
+# ============================================
+# TIMELINES
+# ============================================
+
+def find_timelines(inventory, min_frames=MIN_FRAMES):
+    """
+    (asset name, timeline, [(rel path, size), ...] in frame order) for every
+    frames/ or sprites/<symbol>/ directory with at least min_frames PNGs
+    """
+    timelines = []
+    for asset_name, entries in sorted(inventory.items()):
+        groups = {}
+        for entry in entries:
+            parts = entry[PATH].split("/")
+            if entry[EXT] != "png" or not parts[-1][:-4].isdigit():
+                continue
+            if parts[0] == "frames" and len(parts) == 2:
+                timeline = "frames"
+            elif parts[0] == "sprites" and len(parts) == 3:
+                timeline = parts[1]
+            else:
+                continue
+            groups.setdefault(timeline, []).append((int(parts[-1][:-4]), entry[PATH], entry[SIZE]))
+        for timeline, frames in sorted(groups.items()):
+            if len(frames) >= min_frames:
+                timelines.append((asset_name, timeline, [(path, size) for _, path, size in sorted(frames)]))
+    return timelines
+
+def swf_frame_rate(swf_path):
+    try:
+        with SwfStream(swf_path) as stream:
+            frame_rate, _ = stream.read_header_fields()
+    except (UnsupportedSwf, OSError, struct.error, zlib.error):
+        return DEFAULT_FPS
+    return frame_rate or DEFAULT_FPS
+
+
+# ============================================
+# IMAGE WORK (worker processes)
+# ============================================
+
+def alpha_bbox(rgba):
+    """(left, top, right, bottom) of the non-transparent pixels, (0, 0, 1, 1) if there are none"""
+    alpha = rgba[..., 3]
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if not rows.size:
+        return 0, 0, 1, 1
+    cols = np.flatnonzero(alpha.any(axis=0))
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+def build_sheet(job):
+    """
+    Build one timeline's sheet pages and metadata; returns (json name,
+    outcome, stats) where outcome is "built", "unchanged", "too_large" or
+    "unreadable"
+    """
+    name, frame_paths, source_key, swf_path, sheet_dir = job
+    json_path = os.path.join(sheet_dir, f"{name}.json")
+    stats = Counter()
+    try:
+        with open(json_path) as f:
+            if json.load(f).get("source") == source_key:
+                return name, "unchanged", stats
+    except (OSError, ValueError):
+        pass
+
+    cells, cell_index, frames = [], {}, []
+    canvas_width = canvas_height = 0
+    seen_frames = {}
+    for path in frame_paths:
+        try:
+            with Image.open(path) as img:
+                rgba = np.asarray(img.convert("RGBA"))
+        except (OSError, ValueError):
+            return name, "unreadable", stats
+        canvas_height, canvas_width = max(canvas_height, rgba.shape[0]), max(canvas_width, rgba.shape[1])
+        stats["frames"] += 1
+
+        # Identical full frames skip the trim entirely
+        frame_key = hashlib.blake2b(rgba.tobytes() + bytes(str(rgba.shape), "ascii"), digest_size=16).digest()
+        if frame_key not in seen_frames:
+            left, top, right, bottom = alpha_bbox(rgba)
+            cell = np.ascontiguousarray(rgba[top:bottom, left:right])
+            cell_key = hashlib.blake2b(cell.tobytes() + bytes(str(cell.shape), "ascii"), digest_size=16).digest()
+            if cell_key not in cell_index:
+                cell_index[cell_key] = len(cells)
+                cells.append(cell)
+            seen_frames[frame_key] = [cell_index[cell_key], left, top]
+        frame = seen_frames[frame_key]
+
+        if frames and frames[-1][:3] == frame:
+            frames[-1][3] += 1
+        else:
+            frames.append(frame + [1])
+
+    if any(max(cell.shape[0], cell.shape[1]) + PADDING > MAX_SHEET_SIZE for cell in cells):
+        return name, "too_large", stats
+    stats["cells"] += len(cells)
+    stats["collapsed"] += stats["frames"] - len(frames)
+    # Read before any page is written, so nothing below can fail halfway
+    fps = swf_frame_rate(swf_path)
+
+    pages = pack_group([(i, cell.shape[1], cell.shape[0]) for i, cell in enumerate(cells)], page_size=MAX_SHEET_SIZE)
+    placed_cells = [None] * len(cells)
+    page_names = []
+    for page_number, (page_size, placed) in enumerate(pages):
+        page = Image.new("RGBA", page_size, (0, 0, 0, 0))
+        for i, (x, y) in placed.items():
+            page.paste(Image.fromarray(cells[i]), (x, y))
+            placed_cells[i] = [page_number, x, y, cells[i].shape[1], cells[i].shape[0]]
+        page_name = f"{name}_{page_number}.png"
+        tmp_path = os.path.join(sheet_dir, page_name + ".tmp.png")
+        page.save(tmp_path, optimize=True)
+        os.replace(tmp_path, os.path.join(sheet_dir, page_name))
+        page_names.append(page_name)
+    stats["pages"] += len(page_names)
+    # Pages left over from a build that needed more of them
+    page_number = len(page_names)
+    while os.path.exists(os.path.join(sheet_dir, f"{name}_{page_number}.png")):
+        os.remove(os.path.join(sheet_dir, f"{name}_{page_number}.png"))
+        page_number += 1
+
+    sheet = {
+        "version": SHEET_FORMAT_VERSION,
+        "source": source_key,
+        "fps": fps,
+        "size": [canvas_width, canvas_height],
+        "pages": [SHEET_RES_PREFIX + page_name for page_name in page_names],
+        "cells": placed_cells,
+        "frames": frames,
+    }
+    tmp_path = json_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(sheet, f, separators=(',', ':'))
+    os.replace(tmp_path, json_path)
+    return name, "built", stats
+
+
+# ============================================
+# BUILD
+# ============================================
+
+def build_spritesheets(source_dir, extracted_dir, godot_assets_dir, min_frames=MIN_FRAMES, workers=None):
+    """Build every timeline's sheet and record them in the lookup; returns a stats Counter"""
+    sheet_dir = os.path.join(godot_assets_dir, SHEET_DIR)
+    os.makedirs(sheet_dir, exist_ok=True)
+    timelines = find_timelines(load_or_scan_inventory(extracted_dir), min_frames)
+
+    jobs, names = [], {}
+    for asset_name, timeline, frames in timelines:
+        name = f"{asset_name}_{timeline}"
+        frame_paths = [os.path.join(extracted_dir, asset_name, path) for path, _ in frames]
+        # A re-extracted frame of the same size still changes the key through its mtime
+        mtimes = []
+        for path in frame_paths:
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        source_key = hashlib.blake2b(json.dumps([[path, size, mtime_ns] for (path, size), mtime_ns
+                                                 in zip(frames, mtimes)]).encode(), digest_size=16).hexdigest()
+        jobs.append((name, frame_paths, source_key, os.path.join(source_dir, asset_name), sheet_dir))
+        names[name] = (asset_name, timeline)
+
+    stats = Counter(timelines=len(jobs))
+    animations = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for idx, (name, outcome, job_stats) in enumerate(executor.map(build_sheet, jobs, chunksize=8), 1):
+            stats[outcome] += 1
+            stats.update(job_stats)
+            if outcome in ("built", "unchanged"):
+                asset_name, timeline = names[name]
+                animations.setdefault(asset_name, {})[timeline] = f"{SHEET_RES_PREFIX}{name}.json"
+            if idx % 500 == 0:
+                print(f"  Processed {idx}/{len(jobs)} timelines...")
+
+    # Drop sheets of timelines that are gone (or no longer packable)
+    current = {f"{asset_name}_{timeline}" for asset_name, timelines in animations.items() for timeline in timelines}
+    for filename in os.listdir(sheet_dir):
+        base = filename.split(".", 1)[0]
+        if base not in current and base.rsplit("_", 1)[0] not in current:
+            os.remove(os.path.join(sheet_dir, filename))
+
+    asset_lookup = load_lookup(godot_assets_dir)
+    for asset_name, entry in asset_lookup.items():
+        entry.pop("animations", None)
+        if asset_name in animations:
+            entry["animations"] = animations[asset_name]
+            stats["lookup_entries"] += 1
+    write_lookup(asset_lookup, godot_assets_dir)
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Pack animation frames into deduplicated, trimmed spritesheets')
+    parser.add_argument('--source', type=str, default=SOURCE_DIR, help='Source directory with SWF files (frame rates)')
+    parser.add_argument('--extracted', type=str, default=EXTRACTED_DIR, help='Extracted assets directory')
+    parser.add_argument('--assets', type=str, default=GODOT_ASSETS_DIR, help='Godot sprites directory')
+    parser.add_argument('--min-frames', type=int, default=MIN_FRAMES,
+                        help=f'Frames a timeline needs to become an animation (default: {MIN_FRAMES})')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    if np is None or Image is None:
+        print("Error: NumPy and Pillow are required (pip3 install numpy pillow)")
+        sys.exit(1)
+    if not os.path.exists(os.path.join(args.assets, "asset_lookup.json")):
+        print(f"Error: No asset_lookup.json in {args.assets} (run organize_assets_v2.py first)")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Building Animation Spritesheets")
+    print("=" * 60)
+    start_time = time.time()
+    stats = build_spritesheets(args.source, args.extracted, args.assets, args.min_frames, args.workers)
+
+    print(f"\nTimelines:            {stats['timelines']:,}")
+    print(f"  built:              {stats['built']:,}")
+    print(f"  unchanged:          {stats['unchanged']:,}")
+    print(f"  too large:          {stats['too_large']:,}")
+    print(f"  unreadable:         {stats['unreadable']:,}")
+    print(f"Frames read:          {stats['frames']:,}")
+    print(f"  unique cells:       {stats['cells']:,}")
+    print(f"  merged into runs:   {stats['collapsed']:,}")
+    print(f"Sheet pages:          {stats['pages']:,}")
+    print(f"Lookup entries:       {stats['lookup_entries']:,}")
+    print(f"Time elapsed:         {time.time() - start_time:.1f}s")
+    print(f"\nSpritesheets: {os.path.join(args.assets, SHEET_DIR)}")
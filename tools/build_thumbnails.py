@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Thumbnail pyramid for the asset lookup
+======================================
+The shop and inventory grids show items as small icons, but the lookup only
+has full-size textures. This stage writes downscaled variants of every
+lookup asset:
+
+    assets/sprites/thumbnails/<size>/<asset name>.png
+
+where the longest edge is at most <size> (64, 128 and 256 by default;
+variants that would not be smaller than the source are skipped).
+Resampling is an exact area average on premultiplied alpha, done in NumPy,
+so transparent pixels do not bleed dark fringes into the edges.
+
+Each lookup entry gets a "thumbnails" field ({"64": "res://...", ...}) that
+AssetLoader.load_thumbnail_by_filename picks from. Work is spread over a
+process pool and is incremental: thumbnail_cache.json records the source
+content hash each asset's variants were made from, and unchanged sources are
+skipped. Run after organize_assets_v2.py (which rewrites the lookup).
+
+Requires NumPy and Pillow (pip3 install numpy pillow).
+
+USAGE:
+   python3 build_thumbnails.py                   # Build missing/outdated thumbnails
+   python3 build_thumbnails.py --sizes 48,96     # Different variant sizes
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from asset_lookup import load_lookup, write_lookup
+
+GODOT_ASSETS_DIR = "/Users/pa/PetSocietyMobile/assets/sprites"
+
+THUMBNAIL_DIR = "thumbnails"
+THUMBNAIL_RES_PREFIX = "res://assets/sprites/thumbnails/"
+THUMBNAIL_CACHE = "thumbnail_cache.json"
+THUMBNAIL_CACHE_VERSION = 1
+
+THUMBNAIL_SIZES = (64, 128, 256)
+
+
+def source_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+def fit_size(width, height, max_edge):
+    """Size with the longest edge scaled to max_edge, keeping the aspect ratio"""
+    scale = max_edge / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+# ============================================
+# RESAMPLING
+# ============================================
+
+def area_weights(source, target):
+    """
+    (target, source) matrix averaging source pixels into target pixels
+    Each output pixel covers source/target input pixels; partially covered
+    inputs contribute by their overlap.
+    """
+    scale = source / target
+    starts = np.arange(target) * scale
+    ends = starts + scale
+    edges = np.arange(source)
+    overlap = np.minimum(ends[:, None], edges[None, :] + 1) - np.maximum(starts[:, None], edges[None, :])
+    return np.clip(overlap, 0, None) / scale
+
+def downscale_premultiplied(rgba, width, height):
+    """Area-average an (h, w, 4) uint8 RGBA array to width x height"""
+    pixels = rgba.astype(np.float32) / 255.0
+    pixels[:, :, :3] *= pixels[:, :, 3:]
+    rows = area_weights(rgba.shape[0], height).astype(np.float32)
+    cols = area_weights(rgba.shape[1], width).astype(np.float32)
+    scaled = (rows @ pixels.reshape(rgba.shape[0], -1)).reshape(height, rgba.shape[1], 4)
+    scaled = (scaled.transpose(0, 2, 1) @ cols.T).transpose(0, 2, 1)
+    scaled = np.ascontiguousarray(scaled)
+    alpha = scaled[:, :, 3:]
+    scaled[:, :, :3] = np.divide(scaled[:, :, :3], alpha, out=np.zeros_like(scaled[:, :, :3]), where=alpha > 0)
+    return np.clip(np.rint(scaled * 255.0), 0, 255).astype(np.uint8)
+
+
+# ============================================
+# WORKER
+# ============================================
+
+def build_variants(job):
+    """
+    Write the thumbnails of one asset
+    Returns (asset_name, source hash, {size: (width, height)}, status) where
+    status is "built", "cached" or an error message.
+    """
+    asset_name, source_path, thumbnail_dir, sizes, cached_hash, cached_variants = job
+    try:
+        content_hash = source_hash(source_path)
+    except OSError as e:
+        return asset_name, None, {}, f"unreadable: {e}"
+    if content_hash == cached_hash and all(
+            os.path.exists(os.path.join(thumbnail_dir, str(size), f"{asset_name}.png"))
+            for size in cached_variants):
+        return asset_name, content_hash, cached_variants, "cached"
+
+    try:
+        with Image.open(source_path) as img:
+            rgba = np.asarray(img.convert("RGBA"))
+    except (OSError, ValueError) as e:
+        return asset_name, content_hash, {}, f"unreadable: {e}"
+
+    height, width = rgba.shape[:2]
+    variants = {}
+    for size in sizes:
+        target_path = os.path.join(thumbnail_dir, str(size), f"{asset_name}.png")
+        if max(width, height) <= size:
+            # No upscaling: the full texture is already this small
+            if os.path.exists(target_path):
+                os.remove(target_path)
+            continue
+        target_width, target_height = fit_size(width, height, size)
+        thumbnail = Image.fromarray(downscale_premultiplied(rgba, target_width, target_height), "RGBA")
+        tmp_path = target_path + ".tmp.png"
+        thumbnail.save(tmp_path, compress_level=9)
+        os.replace(tmp_path, target_path)
+        variants[size] = (target_width, target_height)
+    return asset_name, content_hash, variants, "built"
+
+
+# ============================================
+# STAGE
+# ============================================
+
+def load_cache(path, sizes):
+    """asset name -> [source hash, {size: [w, h]}] (empty if made with other sizes)"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        cache = json.load(f)
+    if cache.get("version") != THUMBNAIL_CACHE_VERSION or cache.get("sizes") != list(sizes):
+        return {}
+    return cache["assets"]
+
+def build_thumbnails(godot_assets_dir, sizes=THUMBNAIL_SIZES, workers=None):
+    """Build the thumbnail pyramid for every lookup asset; returns a stats dict"""
+    asset_lookup = load_lookup(godot_assets_dir)
+    thumbnail_dir = os.path.join(godot_assets_dir, THUMBNAIL_DIR)
+    for size in sizes:
+        os.makedirs(os.path.join(thumbnail_dir, str(size)), exist_ok=True)
+    cache_path = os.path.join(godot_assets_dir, THUMBNAIL_CACHE)
+    cache = load_cache(cache_path, sizes)
+
+    jobs = []
+    for asset_name, entry in sorted(asset_lookup.items()):
+        lookup_file = os.path.join(godot_assets_dir, "lookup", f"{asset_name}.{entry.get('type', 'png')}")
+        source_path = entry.get("original_path") or lookup_file
+        cached_hash, cached_variants = cache.get(asset_name, (None, {}))
+        jobs.append((asset_name, source_path, thumbnail_dir, sizes, cached_hash,
+                     {int(size): tuple(dims) for size, dims in cached_variants.items()}))
+
+    stats = {"assets": len(jobs), "built": 0, "cached": 0, "failed": 0, "variants": 0}
+    new_cache = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for idx, (asset_name, content_hash, variants, status) in enumerate(
+                executor.map(build_variants, jobs, chunksize=16), 1):
+            entry = asset_lookup[asset_name]
+            entry.pop("thumbnails", None)
+            if status in ("built", "cached"):
+                stats[status] += 1
+                new_cache[asset_name] = [content_hash, {str(s): list(d) for s, d in variants.items()}]
+                if variants:
+                    entry["thumbnails"] = {str(size): f"{THUMBNAIL_RES_PREFIX}{size}/{asset_name}.png"
+                                           for size in sorted(variants)}
+                    stats["variants"] += len(variants)
+            else:
+                stats["failed"] += 1
+                print(f"  {asset_name}: {status}")
+            if idx % 1000 == 0:
+                print(f"  Processed {idx}/{len(jobs)} assets...")
+
+    # Drop thumbnails of assets no longer in the lookup
+    for size in sizes:
+        size_dir = os.path.join(thumbnail_dir, str(size))
+        for filename in os.listdir(size_dir):
+            if filename.endswith(".png") and filename[:-4] not in new_cache:
+                os.remove(os.path.join(size_dir, filename))
+
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"version": THUMBNAIL_CACHE_VERSION, "sizes": list(sizes), "assets": new_cache}, f,
+                  separators=(',', ':'))
+    os.replace(tmp_path, cache_path)
+    write_lookup(asset_lookup, godot_assets_dir)
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build downscaled thumbnails of lookup assets')
+    parser.add_argument('--assets', type=str, default=GODOT_ASSETS_DIR, help='Godot sprites directory')
+    parser.add_argument('--sizes', type=str, default=",".join(str(s) for s in THUMBNAIL_SIZES),
+                        help='Comma-separated longest-edge sizes (default: 64,128,256)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    if np is None or Image is None:
+        print("Error: NumPy and Pillow are required (pip3 install numpy pillow)")
+        sys.exit(1)
+    if not os.path.exists(os.path.join(args.assets, "asset_lookup.json")):
+        print(f"Error: No asset_lookup.json in {args.assets} (run organize_assets_v2.py first)")
+        sys.exit(1)
+    sizes = tuple(sorted({int(s) for s in args.sizes.split(",") if s.strip()}))
+
+    print("=" * 60)
+    print("Building Thumbnails")
+    print("=" * 60)
+    start_time = time.time()
+    stats = build_thumbnails(args.assets, sizes=sizes, workers=args.workers)
+
+    print(f"\nAssets:               {stats['assets']:,}")
+    print(f"  built:              {stats['built']:,}")
+    print(f"  unchanged:          {stats['cached']:,}")
+    print(f"  failed:             {stats['failed']:,}")
+    print(f"Thumbnails:           {stats['variants']:,} ({', '.join(str(s) for s in sizes)} px)")
+    print(f"Time elapsed:         {time.time() - start_time:.1f}s")
+    print(f"\nThumbnails: {os.path.join(args.assets, THUMBNAIL_DIR)}")
@@ -1,8 +1,7 @@
 #!/bin/bash
 # Quick script to check extraction progress
 
-LOG_FILE="/Users/pa/PetSocietyMobile/tools/extraction_log.txt"
-OUTPUT_DIR="/Users/pa/PetSocietyMobile/assets/sprites/extracted"
+STATUS_FILE="/Users/pa/PetSocietyMobile/assets/sprites/extraction_status.json"
 
 echo "Extraction Progress Checker"
 echo "=========================="
@@ -11,32 +10,26 @@ echo ""
 # Check if process is running
 if pgrep -f "extract_assets.py" > /dev/null; then
     echo "✓ Extraction is running"
-    echo ""
-    # Show last 20 lines of log
-    if [ -f "$LOG_FILE" ]; then
-        echo "Recent log output:"
-        echo "------------------"
-        tail -20 "$LOG_FILE"
-    fi
 else
     echo "✗ Extraction process not found (may have finished)"
-    if [ -f "$LOG_FILE" ]; then
-        echo ""
-        echo "Last log entries:"
-        echo "------------------"
-        tail -30 "$LOG_FILE"
-    fi
 fi
 
 echo ""
-echo "Extracted files so far:"
-echo "----------------------"
-if [ -d "$OUTPUT_DIR" ]; then
-    TOTAL_DIRS=$(find "$OUTPUT_DIR" -mindepth 1 -type d | wc -l | tr -d ' ')
-    TOTAL_IMAGES=$(find "$OUTPUT_DIR" -type f \( -name "*.png" -o -name "*.jpg" \) | wc -l | tr -d ' ')
-    echo "  Directories created: $TOTAL_DIRS"
-    echo "  Images extracted: $TOTAL_IMAGES"
+echo "Status:"
+echo "-------"
+if [ -f "$STATUS_FILE" ]; then
+    # Live snapshot written by extract_assets.py every few seconds
+    python3 - "$STATUS_FILE" <<'PYEOF'
+import json, sys
+s = json.load(open(sys.argv[1]))
+eta = s["eta_seconds"]
+print(f"  Run {s['run']} ({'running' if s['running'] else 'finished'})")
+print(f"  Files:       {s['done']:,} / {s['total']:,} ({s['done'] / max(s['total'], 1) * 100:.1f}%)")
+print(f"  Results:     {s['success']:,} ok, {s['empty']:,} empty, {s['failed']:,} failed ({s['images']:,} images)")
+print(f"  Throughput:  {s['files_per_second']} files/s, ETA {int(eta // 60)}m {int(eta % 60)}s")
+if s["latency"]:
+    print("  Latency:     " + ", ".join(f"{k} {v:.2f}s" for k, v in s["latency"].items()))
+PYEOF
 else
-    echo "  Output directory not found yet"
+    echo "  No status file yet ($STATUS_FILE)"
 fi
-
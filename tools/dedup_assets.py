@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Deduplicate extracted assets
+============================
+Finds byte-identical files across the extracted tree (shared buttons,
+frames and bitmaps repeated in many SWFs), keeps one canonical copy of each
+and replaces the others with hardlinks to it. Every duplicate -> canonical
+mapping is recorded in asset_dedup_index.json next to the extracted dir, so
+organize_assets_v2.py can point the lookup at canonical blobs.
+
+Only files whose size is shared with another file are hashed, and files that
+are already hardlinked together are recognised by inode and not rehashed.
+
+USAGE:
+   python3 dedup_assets.py                 # Hash, hardlink duplicates and write the index
+   python3 dedup_assets.py --index-only    # Only write the index, leave files alone
+   python3 dedup_assets.py --dry-run       # Report what would be reclaimed
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from asset_inventory import PATH, SIZE, load_or_scan_inventory
+
+EXTRACTED_DIR = "/Users/pa/PetSocietyMobile/assets/sprites/extracted"
+
+DEDUP_INDEX_FILENAME = "asset_dedup_index.json"
+DEDUP_INDEX_VERSION = 1
+
+HASH_WORKERS = 16
+HASH_CHUNK = 1024 * 1024
+
+
+def default_dedup_index_path(extracted_dir):
+    """The index lives next to (not inside) the extracted dir"""
+    return os.path.join(os.path.dirname(os.path.abspath(extracted_dir)), DEDUP_INDEX_FILENAME)
+
+def load_dedup_index(extracted_dir):
+    """Duplicate relative path -> canonical relative path ({} if no index)"""
+    path = default_dedup_index_path(extracted_dir)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)["duplicates"]
+
+def hash_file(path):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def list_outputs(extracted_dir):
+    """(relative path, size) of every extracted file, from the inventory if there is one"""
+    inventory = load_or_scan_inventory(extracted_dir, workers=HASH_WORKERS)
+    files = []
+    for name, entries in inventory.items():
+        files.extend((f"{name}/{entry[PATH]}", entry[SIZE]) for entry in entries)
+    return files
+
+def find_duplicates(extracted_dir, files):
+    """
+    Group byte-identical files
+    Returns a list of (members, size) groups where members are sorted
+    (relative path, inode) pairs; the first member is the canonical copy.
+    """
+    by_size = defaultdict(list)
+    for rel_path, size in files:
+        if size > 0:
+            by_size[size].append(rel_path)
+    candidates = [p for paths in by_size.values() if len(paths) > 1 for p in paths]
+
+    def identify(rel_path):
+        st = os.stat(os.path.join(extracted_dir, rel_path))
+        return rel_path, (st.st_dev, st.st_ino), st.st_size
+
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as executor:
+        identified = list(executor.map(identify, candidates))
+        # Files that already share an inode only need hashing once
+        first_per_inode = {}
+        for rel_path, inode, _ in identified:
+            first_per_inode.setdefault(inode, rel_path)
+        inode_hash = dict(zip(first_per_inode, executor.map(
+            lambda p: hash_file(os.path.join(extracted_dir, p)), first_per_inode.values())))
+
+    groups = defaultdict(list)
+    for rel_path, inode, size in identified:
+        groups[(size, inode_hash[inode])].append((rel_path, inode))
+    return [(sorted(members), size) for (size, _), members in groups.items() if len(members) > 1]
+
+def link_duplicate(canonical, duplicate):
+    """Atomically replace duplicate with a hardlink to canonical"""
+    tmp_path = duplicate + ".dedup_tmp"
+    os.link(canonical, tmp_path)
+    os.replace(tmp_path, duplicate)
+
+def deduplicate(extracted_dir, index_path, index_only=False, dry_run=False):
+    """Hash, link and index duplicates; returns a stats dict"""
+    files = list_outputs(extracted_dir)
+    groups = find_duplicates(extracted_dir, files)
+
+    stats = {"files": len(files), "groups": len(groups), "duplicates": 0,
+             "linked": 0, "already_linked": 0, "reclaimed_bytes": 0}
+    duplicates = {}
+    for members, size in groups:
+        canonical, canonical_inode = members[0]
+        for rel_path, inode in members[1:]:
+            duplicates[rel_path] = canonical
+            stats["duplicates"] += 1
+            if inode == canonical_inode:
+                stats["already_linked"] += 1
+                continue
+            if index_only:
+                continue
+            stats["reclaimed_bytes"] += size
+            if dry_run:
+                continue
+            try:
+                link_duplicate(os.path.join(extracted_dir, canonical), os.path.join(extracted_dir, rel_path))
+                stats["linked"] += 1
+            except OSError as e:
+                stats["reclaimed_bytes"] -= size
+                print(f"  Could not link {rel_path}: {e}")
+
+    if not dry_run:
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"version": DEDUP_INDEX_VERSION, "duplicates": duplicates}, f, separators=(',', ':'))
+        os.replace(tmp_path, index_path)
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Hardlink byte-identical extracted assets')
+    parser.add_argument('--output', type=str, default=EXTRACTED_DIR, help='Extracted asset directory')
+    parser.add_argument('--index-only', action='store_true', help='Only record duplicates, do not link files')
+    parser.add_argument('--dry-run', action='store_true', help='Report duplicates without changing anything')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.output):
+        print(f"Error: Extracted directory not found: {args.output}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Deduplicating Extracted Assets")
+    print("=" * 60)
+    start_time = time.time()
+    index_path = default_dedup_index_path(args.output)
+    stats = deduplicate(args.output, index_path, index_only=args.index_only, dry_run=args.dry_run)
+
+    print(f"\nFiles scanned:        {stats['files']:,}")
+    print(f"Duplicate groups:     {stats['groups']:,}")
+    print(f"Duplicate files:      {stats['duplicates']:,}")
+    print(f"  already hardlinked: {stats['already_linked']:,}")
+    if not args.index_only:
+        action = "Would reclaim:" if args.dry_run else "Reclaimed:"
+        print(f"  newly linked:       {stats['linked']:,}")
+        print(f"{action:<22}{stats['reclaimed_bytes'] / 2**20:,.1f} MB")
+    print(f"Time elapsed:         {time.time() - start_time:.1f}s")
+    if not args.dry_run:
+        print(f"\nIndex: {index_path}")
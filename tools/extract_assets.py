@@ -24,7 +24,11 @@ USAGE:
    python3 extract_assets.py                    # Extract all assets
    python3 extract_assets.py --test             # Test with 10 files first
    python3 extract_assets.py --category pets    # Extract only 'pets' category
-   python3 extract_assets.py --parallel 4       # Use 4 parallel processes
+   python3 extract_assets.py --parallel 4       # At most 4 parallel JPEXS processes or decoders
+   python3 extract_assets.py --fixed-parallel   # Always run exactly --parallel JVMs
+   python3 extract_assets.py --batch-size 32    # Hand 32 SWFs to each JVM
+   python3 extract_assets.py --no-native        # Send every SWF through JPEXS
+   python3 extract_assets.py --retry-failed     # Only retry files that failed last time
 """
 
 import os
@@ -32,10 +36,21 @@ import sys
 import subprocess
 import shutil
 import argparse
-from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 import time
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import swf_reader
+from asset_inventory import InventoryWriter, count_visual, default_inventory_path, scan_output
+import extraction_scheduler
+from extraction_scheduler import AdaptiveScheduler, TimeoutModel, estimate_costs, simulate_makespan
+from extraction_manifest import (ExtractionManifest, default_manifest_path,
+                                 fan_out_output, get_ffdec_version)
+from extraction_telemetry import TelemetryWriter, default_events_path, default_status_path, load_durations
+from swf_prescan import default_scan_cache_path, scan_swfs
+
 # ============================================
 # CONFIGURATION - UPDATE THESE PATHS!
 # ============================================
@@ -43,6 +58,9 @@ import time
 # Path to JPEXS ffdec.jar - Will auto-detect if None
 JPEXS_JAR_PATH = None
 
+# Java executable - Will auto-detect if None (also set by --java)
+JAVA_PATH = None
+
 # Common locations to search for JPEXS:
 JPEXS_SEARCH_PATHS = [
     "/Applications/ffdec_24.1.1/ffdec.jar",  # Your current installation
@@ -63,6 +81,37 @@ JPEXS_SEARCH_PATHS = [
 SOURCE_DIR = "/Users/pa/petsociety/static/assets"
 OUTPUT_DIR = "/Users/pa/PetSocietyMobile/assets/sprites/extracted"
 
+# Asset types requested from JPEXS (each SWF gets the subset its tags call
+# for, see swf_prescan.py; unscannable files get all of them)
+ASSET_TYPES = "image,shape,sprite,button,frame"
+
+# Longest a single SWF may take inside a main-pass JPEXS run. The actual
+# timeout adapts to the file's size and the throughput seen so far (see
+# TimeoutModel); files that fail go to the retry tiers after the main pass.
+SWF_TIMEOUT = 120
+
+# Retry tiers for files that failed the main pass, tried in order:
+# (name, heap multiplier, timeout multiplier, one JPEXS run per asset type)
+RETRY_TIERS = [
+    ("heap", 2, 2, False),
+    ("max-heap", 4, 5, False),
+    ("split-types", 4, 5, True),
+]
+
+# Retry limits: seconds per JPEXS run, heap per JVM (MB)
+RETRY_TIMEOUT_MAX = 1800
+RETRY_XMX_MAX_MB = 16384
+
+# Progress lines printed when output is not a terminal (every N files)
+PROGRESS_EVERY = 500
+
+# Batching: SWFs handed to one JVM (see get_batch_size for the auto default)
+MAX_AUTO_BATCH_SIZE = 64
+BATCHES_PER_WORKER = 4
+
+# Native fast path: SWFs decoded per process-pool job
+NATIVE_CHUNK_SIZE = 16
+
 # ============================================
 # HELPER FUNCTIONS
 # ============================================
@@ -133,6 +182,14 @@ def find_jpexs():
 
 def check_java():
     """Check if Java is installed and get the path"""
+    # An explicitly configured java wins
+    if JAVA_PATH:
+        try:
+            subprocess.run([JAVA_PATH, "-version"], capture_output=True, text=True, timeout=5)
+            return True, JAVA_PATH
+        except (OSError, subprocess.TimeoutExpired):
+            return False, None
+    
     # Check standard java first
     try:
         result = subprocess.run(["java", "-version"], 
@@ -153,95 +210,542 @@ def check_java():
     
     return False, None
 
-def extract_single_swf(args):
+def get_java_cmd():
+    """Use java from PATH unless Homebrew's openjdk is installed (or JAVA_PATH is set)"""
+    if JAVA_PATH:
+        return JAVA_PATH
+    if os.path.exists("/opt/homebrew/opt/openjdk/bin/java"):
+        return "/opt/homebrew/opt/openjdk/bin/java"
+    return "java"
+
+def get_java_env():
+    """Environment for headless JPEXS runs (prevents GUI window creation)"""
+    env = os.environ.copy()
+    env["JAVA_TOOL_OPTIONS"] = "-Djava.awt.headless=true"
+    # On macOS, also ensure no display-related env vars interfere
+    if sys.platform == 'darwin':
+        env.pop("DISPLAY", None)  # Remove DISPLAY if present
+    return env
+
+def build_ffdec_cmd(jpexs_path, output_dir, input_path, extra_args=(), java_opts=(), asset_types=ASSET_TYPES):
+    """
+    Build a headless JPEXS export command
+    JPEXS syntax: -export <itemtypes> <outdirectory> <infile_or_directory>
+    """
+    return [
+        get_java_cmd(),
+        "-Djava.awt.headless=true",  # No GUI mode - prevents window creation
+        *java_opts,
+        "-jar", jpexs_path,
+        *extra_args,
+        "-export", asset_types,
+        output_dir,
+        input_path
+    ]
+
+def summarize_swf_output(swf_path, output_subdir, returncode, meta):
+    """
+    Turn a finished export into the (success, filename, count, error, inventory, meta)
+    result tuple. One os.scandir pass records every produced file; PNG, JPEG
+    and SVG files count as extracted assets. meta carries the telemetry
+    (extraction path, wall seconds, JVM exit code).
+    """
+    inventory = scan_output(output_subdir)
+    extracted_count = count_visual(inventory)
+    
+    if returncode == 0 and extracted_count > 0:
+        return (True, os.path.basename(swf_path), extracted_count, None, inventory, meta)
+    elif extracted_count == 0:
+        # Remove empty directory
+        try:
+            shutil.rmtree(output_subdir)
+        except:
+            pass
+        return (False, os.path.basename(swf_path), 0, "No assets found", [], meta)
+    else:
+        return (False, os.path.basename(swf_path), 0, f"JPEXS exit code {returncode}", inventory, meta)
+
+def jpexs_meta(started, returncode, timeout, batch_size=1):
+    """
+    Telemetry for a JPEXS run (each file in a batch gets an equal share of its
+    time); exit_code is None when the run was killed at its timeout
+    """
+    return {"path": "jpexs", "seconds": round((time.time() - started) / batch_size, 3),
+            "exit_code": returncode, "batch_size": batch_size, "timeout": round(timeout, 1)}
+
+def task_sizes(tasks):
+    """Compressed size of each task's SWF (0 if it cannot be read)"""
+    sizes = []
+    for swf_path, _, _, _ in tasks:
+        try:
+            sizes.append(os.path.getsize(swf_path))
+        except OSError:
+            sizes.append(0)
+    return sizes
+
+def fresh_output_dir(output_subdir):
+    """
+    An empty directory beside output_subdir to export into; the dot prefix
+    keeps it out of inventory scans until replace_output_tree swaps it in
+    """
+    return tempfile.mkdtemp(prefix=".extract_", dir=os.path.dirname(output_subdir))
+
+def replace_output_tree(src, dst):
+    """
+    Swap a finished export in as dst, dropping any earlier output
+    Nothing is written into the old tree, so files left by a previous version
+    of the SWF do not survive and files hardlinked out of it (dedup,
+    fanned-out duplicates) keep their content.
+    """
+    if not os.path.lexists(dst):
+        os.replace(src, dst)
+        return
+    old = tempfile.mkdtemp(prefix=".old_", dir=os.path.dirname(dst))
+    os.replace(dst, os.path.join(old, "output"))
+    os.replace(src, dst)
+    shutil.rmtree(old, ignore_errors=True)
+
+async def extract_single_swf(task, scheduler):
     """
     Extract ALL asset types from a single SWF file
     Extracts: images, shapes, sprites, buttons, frames
     """
-    swf_path, output_subdir, jpexs_path = args
+    swf_path, output_subdir, jpexs_path, asset_types = task
+    started = time.time()
+    staging = None
     
     try:
-        # Create output directory
-        os.makedirs(output_subdir, exist_ok=True)
-        
-        # Use java from PATH (which should include Homebrew's openjdk)
-        java_cmd = "java"
-        if os.path.exists("/opt/homebrew/opt/openjdk/bin/java"):
-            java_cmd = "/opt/homebrew/opt/openjdk/bin/java"
+        # Export into a fresh directory that replaces the old output once
+        # JPEXS exits, so a re-extraction leaves no stale files behind
+        staging = fresh_output_dir(output_subdir)
         
         # Extract MULTIPLE asset types to get everything
-        # JPEXS syntax: -export <itemtypes> <outdirectory> <infile_or_directory>
-        # Types: image, shape, sprite, button, frame
-        # We extract all visual types at once
-        asset_types = "image,shape,sprite,button,frame"
-        
         # Run in HEADLESS mode to prevent GUI windows from opening
-        # -Djava.awt.headless=true prevents all GUI components and window creation
-        # Redirect output to /dev/null to prevent any window creation attempts
-        cmd = [
-            java_cmd,
-            "-Djava.awt.headless=true",  # No GUI mode - prevents window creation
-            "-jar", jpexs_path,
-            "-export", asset_types,
-            output_subdir,
-            swf_path
-        ]
+        cmd = build_ffdec_cmd(jpexs_path, staging, swf_path,
+                              java_opts=scheduler.jvm_options(), asset_types=asset_types or ASSET_TYPES)
         
-        # Run in headless mode with output redirected to prevent any window creation
-        # Use PIPE to capture output (but we don't need to use it)
-        # This prevents any GUI windows from being created
-        env = os.environ.copy()
-        env["JAVA_TOOL_OPTIONS"] = "-Djava.awt.headless=true"
-        # On macOS, also ensure no display-related env vars interfere
-        if sys.platform == 'darwin':
-            env.pop("DISPLAY", None)  # Remove DISPLAY if present
+        # Output is discarded to prevent any window creation attempts
+        sizes = task_sizes([task])
+        timeout = scheduler.timeouts.timeout(sizes)
+        returncode = await scheduler.spawn(cmd, timeout, env=get_java_env())
+        if returncode is None:
+            return (False, os.path.basename(swf_path), 0, "Timeout", None, jpexs_meta(started, None, timeout))
+        if returncode == 0:
+            scheduler.timeouts.observe(sizes, time.time() - started)
         
-        result = subprocess.run(
-            cmd, 
-            stdout=subprocess.DEVNULL,  # Discard stdout completely
-            stderr=subprocess.DEVNULL,  # Discard stderr completely (no windows)
-            timeout=120,  # Increased timeout for multiple types
-            env=env
-        )
+        replace_output_tree(staging, output_subdir)
+        staging = None
+        return summarize_swf_output(swf_path, output_subdir, returncode, jpexs_meta(started, returncode, timeout))
+            
+    except Exception as e:
+        return (False, os.path.basename(swf_path), 0, str(e)[:100], None,
+                {"path": "jpexs", "seconds": round(time.time() - started, 3)})
+    finally:
+        if staging:
+            shutil.rmtree(staging, ignore_errors=True)
+
+def extract_native(task):
+    """
+    Bitmap-only fast path: decode the SWF's bitmap tags in Python
+    Returns a result tuple, or None if the SWF needs JPEXS. Like the JPEXS
+    paths, the export replaces any earlier output wholesale.
+    """
+    swf_path, output_subdir, _, _ = task
+    started = time.time()
+    meta = lambda: {"path": "native", "seconds": round(time.time() - started, 3)}
+    staging = None
+    try:
+        staging = fresh_output_dir(output_subdir)
+        count = swf_reader.extract_bitmaps(swf_path, staging)
+        if count:
+            replace_output_tree(staging, output_subdir)
+            staging = None
+    except swf_reader.UnsupportedSwf:
+        return None
+    except Exception as e:
+        return (False, os.path.basename(swf_path), 0, str(e)[:100], None, meta())
+    finally:
+        if staging:
+            shutil.rmtree(staging, ignore_errors=True)
+    if count == 0:
+        shutil.rmtree(output_subdir, ignore_errors=True)
+        return (False, os.path.basename(swf_path), 0, "No assets found", [], meta())
+    return (True, os.path.basename(swf_path), count, None, scan_output(output_subdir), meta())
+
+def extract_native_all(tasks):
+    """extract_native over a chunk of tasks, in one pool worker"""
+    return [extract_native(task) for task in tasks]
+
+async def extract_native_chunk(chunk, pool, scheduler, batch_size, retry, costs):
+    """
+    Decode a chunk of bitmap-only candidates in the native process pool
+    Files the decoder cannot handle (or fails on) are planned into JPEXS
+    batches and submitted to the scheduler, so they start while the rest
+    of the main pass is still running. Returns the native results.
+    """
+    loop = asyncio.get_running_loop()
+    fallbacks = []
+    results = []
+    for task, result in zip(chunk, await loop.run_in_executor(pool, extract_native_all, chunk)):
+        if result is None or (retry and is_retryable(result)):
+            fallbacks.append(task)
+        else:
+            results.append(result)
+    # submit() starts the last job queued first, so queue in reverse plan order
+    for batch in reversed(plan_batches(fallbacks, batch_size, costs)):
+        scheduler.submit(lambda scheduler, batch=batch: extract_swf_batch(batch, scheduler))
+    return results
+
+def run_extraction(tasks, scheduler, batch_size, native=True, retry=True, costs=None):
+    """
+    Yield one result tuple per task as files finish
+    Tasks whose pre-scan found nothing visual (asset types "") are reported
+    empty straight away. Bitmap-only SWFs (and unscanned ones) are decoded
+    natively in a process pool while the rest are handed to JPEXS in
+    batches, longest first when costs (filename -> estimated seconds) are
+    given. Both share the adaptive scheduler's concurrency limit, and native
+    fallbacks join the JPEXS queue as soon as their chunk is done. Failed
+    files are held back and yielded after the retry tiers (see
+    retry_failures).
+    """
+    jpexs_tasks = []
+    native_tasks = []
+    for task in tasks:
+        asset_types = task[3]
+        if asset_types == "":
+            shutil.rmtree(task[1], ignore_errors=True)
+            yield (False, os.path.basename(task[0]), 0, "No assets found", [], {"path": "scan", "seconds": 0.0})
+        elif native and asset_types in (None, "image"):
+            native_tasks.append(task)
+        else:
+            jpexs_tasks.append(task)
+    
+    # One JVM per batch; native chunks are interleaved with the batches so
+    # both kinds of work run from the start
+    jpexs_jobs = [lambda scheduler, batch=batch: extract_swf_batch(batch, scheduler)
+                  for batch in plan_batches(jpexs_tasks, batch_size, costs)]
+    pool = ProcessPoolExecutor(max_workers=scheduler.hard_cap) if native_tasks else None
+    native_jobs = [lambda scheduler, i=i: extract_native_chunk(native_tasks[i:i + NATIVE_CHUNK_SIZE], pool, scheduler,
+                                                               batch_size, retry, costs)
+                   for i in range(0, len(native_tasks), NATIVE_CHUNK_SIZE)]
+    jobs = []
+    for i in range(max(len(jpexs_jobs), len(native_jobs))):
+        jobs.extend(jpexs_jobs[i:i + 1] + native_jobs[i:i + 1])
+    
+    failures = []
+    try:
+        for result in extraction_scheduler.iterate(scheduler.run(jobs)):
+            if retry and is_retryable(result):
+                failures.append(result)
+            else:
+                yield result
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    
+    # Slow and failing files no longer hold up the main pass: retry them at the end
+    if failures:
+        yield from retry_failures(failures, tasks, scheduler)
+
+def is_retryable(result):
+    """Failed extractions (timeouts, JVM errors, crashes) are retried; empty SWFs are not"""
+    success, _, _, error, _, _ = result
+    return not success and error != "No assets found"
+
+def attempt_record(tier, result):
+    """One entry of a retried file's meta["attempts"]"""
+    success, _, _, error, _, meta = result
+    record = {"tier": tier, "error": None if success else error}
+    for key in ("seconds", "exit_code", "timeout", "heap_mb", "failed_types"):
+        if key in meta:
+            record[key] = meta[key]
+    return record
+
+def with_attempts(result, attempts):
+    """A retried file's final result: meta lists every attempt and their total time"""
+    meta = dict(result[5])
+    meta["attempts"] = attempts
+    meta["seconds"] = round(sum(attempt.get("seconds") or 0 for attempt in attempts), 3)
+    return result[:5] + (meta,)
+
+async def retry_swf(task, tier, scheduler):
+    """
+    One retry-tier attempt at a SWF, alone in a JVM with the tier's heap and
+    timeout; split tiers run JPEXS once per asset type into the same output,
+    so one type that hangs or crashes does not lose the others
+    """
+    name, _, timeout_factor, split = tier
+    swf_path, output_subdir, jpexs_path, requested_types = task
+    requested_types = requested_types or ASSET_TYPES
+    estimate = scheduler.timeouts.estimate(task_sizes([task])) or SWF_TIMEOUT
+    timeout = min(max(estimate, SWF_TIMEOUT) * timeout_factor, RETRY_TIMEOUT_MAX)
+    asset_types = requested_types.split(",") if split else [requested_types]
+    started = time.time()
+    
+    try:
+        # Start clean so a killed run's partial output is not counted
+        shutil.rmtree(output_subdir, ignore_errors=True)
+        os.makedirs(output_subdir)
+        returncodes = []
+        for asset_type in asset_types:
+            cmd = build_ffdec_cmd(jpexs_path, output_subdir, swf_path,
+                                  java_opts=scheduler.jvm_options(), asset_types=asset_type)
+            returncodes.append(await scheduler.spawn(cmd, timeout, env=get_java_env()))
+    except Exception as e:
+        return [(False, os.path.basename(swf_path), 0, str(e)[:100], None,
+                 {"path": "jpexs", "seconds": round(time.time() - started, 3), "tier": name})]
+    
+    returncode = 0 if 0 in returncodes else returncodes[-1]
+    meta = jpexs_meta(started, returncode, timeout)
+    meta.update(tier=name, heap_mb=scheduler.xmx_mb())
+    if split:
+        meta["failed_types"] = [t for t, code in zip(asset_types, returncodes) if code != 0]
+    if returncode is None:
+        return [(False, os.path.basename(swf_path), 0, "Timeout", None, meta)]
+    return [summarize_swf_output(swf_path, output_subdir, returncode, meta)]
+
+def retry_failures(failures, tasks, scheduler):
+    """
+    Run the main pass's failures through RETRY_TIERS
+    Each tier gets a bigger heap (fewer JVMs at once) and a longer timeout.
+    Yields one result per file: from the first tier that extracts it or finds
+    it empty, otherwise the last tier's failure. meta["attempts"] records
+    every tier's outcome, and meta["tier"] the tier that produced the result.
+    """
+    task_by_name = {os.path.basename(task[0]): task for task in tasks}
+    pending = {result[1]: (result, [attempt_record("main", result)]) for result in failures}
+    base_heap = scheduler.xmx_mb()
+    
+    for tier in RETRY_TIERS:
+        if not pending:
+            break
+        name, heap_factor, _, _ = tier
+        tier_scheduler = scheduler.with_heap(min(base_heap * heap_factor, RETRY_XMX_MAX_MB))
+        jobs = [lambda s, task=task_by_name[filename], tier=tier: retry_swf(task, tier, s)
+                for filename in pending]
+        for result in extraction_scheduler.iterate(tier_scheduler.run(jobs)):
+            _, attempts = pending[result[1]]
+            attempts.append(attempt_record(name, result))
+            if is_retryable(result):
+                pending[result[1]] = (result, attempts)
+            else:
+                del pending[result[1]]
+                yield with_attempts(result, attempts)
+    
+    for result, attempts in pending.values():
+        yield with_attempts(result, attempts)
+
+def apply_manifest(results, plan, manifest, output_dir):
+    """
+    Record each result in the manifest and fan it out to byte-identical files
+    Yields the canonical result followed by one result per duplicate, after
+    first yielding the duplicates of content extracted in an earlier run.
+    """
+    for name, existing in plan.reuse:
+        row = manifest.get(existing)
+        fan_out_output(os.path.join(output_dir, existing), os.path.join(output_dir, name))
+        manifest.record(name, plan.file_info[name], True, row["asset_count"], None, canonical=existing,
+                        asset_types=row["asset_types"])
+        yield (True, name, row["asset_count"], None, scan_output(os.path.join(output_dir, name)),
+               {"path": "reused", "canonical": existing})
+    
+    for success, filename, count, error, inventory, meta in results:
+        manifest.record(filename, plan.file_info[filename], success, count, error,
+                        asset_types=plan.asset_types.get(filename))
+        yield (success, filename, count, error, inventory, meta)
+        for duplicate in plan.duplicates.get(filename, []):
+            if success:
+                fan_out_output(os.path.join(output_dir, filename), os.path.join(output_dir, duplicate))
+            manifest.record(duplicate, plan.file_info[duplicate], success, count, error, canonical=filename,
+                            asset_types=plan.asset_types.get(filename))
+            yield (success, duplicate, count, error, inventory if success else [],
+                   {"path": "reused", "canonical": filename})
+
+def get_batch_size(requested, files_to_process, parallel):
+    """
+    SWFs per JPEXS invocation. 0 means auto: small enough that every worker
+    gets several batches (so no core idles at the tail), capped so one slow
+    batch can't hold too much of the run.
+    """
+    if requested > 0:
+        return requested
+    per_worker = files_to_process // (max(parallel, 1) * BATCHES_PER_WORKER)
+    return max(1, min(MAX_AUTO_BATCH_SIZE, per_worker))
+
+def make_batches(tasks, batch_size, costs=None):
+    """
+    Split (swf_path, output_subdir, jpexs_path) tasks into batches
+    Without costs the tasks are cut in order. With costs (estimated seconds
+    per task) batches are packed longest-processing-time first: tasks are
+    taken from most to least expensive and a batch closes at batch_size
+    files or batch_size average files' worth of time, so expensive files run
+    alone and cheap ones share a JVM. Batches come out most expensive first.
+    """
+    if costs is None:
+        return [tasks[i:i + batch_size] for i in range(0, len(tasks), batch_size)]
+    if not tasks:
+        return []
+    budget = batch_size * sum(costs) / len(costs)
+    batches, current, current_cost = [], [], 0.0
+    for i in sorted(range(len(tasks)), key=lambda i: costs[i], reverse=True):
+        if current and (len(current) >= batch_size or current_cost + costs[i] > budget):
+            batches.append((current_cost, current))
+            current, current_cost = [], 0.0
+        current.append(tasks[i])
+        current_cost += costs[i]
+    batches.append((current_cost, current))
+    batches.sort(key=lambda batch: batch[0], reverse=True)
+    return [batch for _, batch in batches]
+
+def plan_batches(tasks, batch_size, costs=None):
+    """
+    JPEXS batches for tasks: one invocation exports one set of asset types,
+    so tasks are grouped by their types and each group is cut by
+    make_batches. With costs (filename -> estimated seconds) all batches are
+    ordered most expensive first.
+    """
+    groups = {}
+    for task in tasks:
+        groups.setdefault(task[3], []).append(task)
+    batch_cost = lambda batch: sum(costs[os.path.basename(task[0])] for task in batch)
+    batches = []
+    for group in groups.values():
+        group_costs = [costs[os.path.basename(task[0])] for task in group] if costs else None
+        batches.extend(make_batches(group, batch_size, group_costs))
+    if costs:
+        batches.sort(key=batch_cost, reverse=True)
+    return batches
+
+def makespan_saving(durations, batch_size, costs, workers):
+    """
+    (LPT makespan, filename-order makespan) in seconds for the JPEXS files of
+    this run, replaying their measured durations (filename -> seconds) through
+    both batchings on the given number of workers
+    """
+    names = sorted(durations)
+    naive = make_batches(names, batch_size)
+    lpt = make_batches(names, batch_size, [costs[name] for name in names])
+    batch_seconds = lambda batches: [sum(durations[name] for name in batch) for batch in batches]
+    return (simulate_makespan(batch_seconds(lpt), workers),
+            simulate_makespan(batch_seconds(naive), workers))
+
+def find_staged_output(staging_out, staged_name):
+    """JPEXS names per-file folders after the input file (with or without .swf)"""
+    for candidate in (staged_name, os.path.splitext(staged_name)[0]):
+        path = os.path.join(staging_out, candidate)
+        if os.path.isdir(path):
+            return path
+    return None
+
+async def extract_swf_batch(batch, scheduler):
+    """
+    Extract a batch of SWFs with a single JPEXS invocation
+    The batch is staged as a directory of symlinks so one JVM exports every
+    file; each file's output then replaces its own output subdirectory and
+    is counted separately. Returns one result tuple per SWF.
+    """
+    if len(batch) == 1:
+        return [await extract_single_swf(batch[0], scheduler)]
+    
+    jpexs_path = batch[0][2]
+    asset_types = batch[0][3] or ASSET_TYPES
+    output_dir = os.path.dirname(batch[0][1])
+    # Stage inside the output dir so moving results is a cheap rename
+    staging_root = tempfile.mkdtemp(prefix=".ffdec_batch_", dir=output_dir)
+    staging_in = os.path.join(staging_root, "in")
+    staging_out = os.path.join(staging_root, "out")
+    
+    try:
+        os.makedirs(staging_in)
+        os.makedirs(staging_out)
         
-        # Count ALL extracted visual files (including subdirectories)
-        extracted_count = 0
-        # JPEXS organizes exports into subdirectories: images/, shapes/, sprites/, etc.
-        # Count PNG/JPEG (from images, sprites, buttons, frames)
-        extracted_count += len(list(Path(output_subdir).rglob("*.png")))  # rglob = recursive
-        extracted_count += len(list(Path(output_subdir).rglob("*.jpg")))
-        extracted_count += len(list(Path(output_subdir).rglob("*.jpeg")))
-        # Count SVG (from shapes - we'll need to convert these later or use as-is)
-        extracted_count += len(list(Path(output_subdir).rglob("*.svg")))
+        # JPEXS only picks up files with a SWF extension from a directory
+        staged_names = []
+        for swf_path, output_subdir, _, _ in batch:
+            staged_name = os.path.basename(swf_path) + ".swf"
+            os.symlink(os.path.abspath(swf_path), os.path.join(staging_in, staged_name))
+            staged_names.append(staged_name)
         
-        if result.returncode == 0 and extracted_count > 0:
-            return (True, os.path.basename(swf_path), extracted_count, None)
-        elif extracted_count == 0:
-            # Remove empty directory
-            try:
-                shutil.rmtree(output_subdir)
-            except:
-                pass
-            return (False, os.path.basename(swf_path), 0, "No assets found")
-        else:
-            return (False, os.path.basename(swf_path), 0, result.stderr[:100])
-            
-    except subprocess.TimeoutExpired:
-        return (False, os.path.basename(swf_path), 0, "Timeout")
+        cmd = build_ffdec_cmd(jpexs_path, staging_out, staging_in,
+                              extra_args=("-onerror", "ignore"),
+                              java_opts=scheduler.jvm_options(), asset_types=asset_types)
+        sizes = task_sizes(batch)
+        timeout = scheduler.timeouts.timeout(sizes)
+        started = time.time()
+        returncode = await scheduler.spawn(cmd, timeout, env=get_java_env())
+        meta = jpexs_meta(started, returncode, timeout, len(batch))
+        batch_ok = returncode == 0
+        if batch_ok:
+            scheduler.timeouts.observe(sizes, time.time() - started)
+        
+        results = []
+        retry = []
+        for task, staged_name in zip(batch, staged_names):
+            swf_path, output_subdir = task[0], task[1]
+            if not batch_ok:
+                # The batch died (crash, timeout, OOM): any output it left may be
+                # partial, so it is discarded with the staging dir and every file
+                # is rerun on its own
+                retry.append(task)
+                continue
+            staged_output = find_staged_output(staging_out, staged_name)
+            if staged_output is None:
+                shutil.rmtree(output_subdir, ignore_errors=True)
+                results.append((False, os.path.basename(swf_path), 0, "No assets found", [], dict(meta)))
+                continue
+            replace_output_tree(staged_output, output_subdir)
+            results.append(summarize_swf_output(swf_path, output_subdir, 0, dict(meta)))
+        
+        for task in retry:
+            results.append(await extract_single_swf(task, scheduler))
+        return results
+    
     except Exception as e:
-        return (False, os.path.basename(swf_path), 0, str(e)[:100])
+        return [(False, os.path.basename(swf_path), 0, str(e)[:100], None, {"path": "jpexs"})
+                for swf_path, _, _, _ in batch]
+    finally:
+        shutil.rmtree(staging_root, ignore_errors=True)
 
 def main():
     parser = argparse.ArgumentParser(description='Extract images from Pet Society SWF files')
     parser.add_argument('--test', action='store_true', help='Test mode: only process 10 files')
-    parser.add_argument('--parallel', type=int, default=4, help='Number of parallel processes (default: 4)')
+    parser.add_argument('--parallel', type=int, default=0,
+                        help='Hard cap on parallel JPEXS processes and native decoders (default: CPU count)')
+    parser.add_argument('--fixed-parallel', action='store_true',
+                        help='Always run exactly --parallel processes instead of adapting to load and memory')
     parser.add_argument('--start', type=int, default=0, help='Start from file index (for resuming)')
     parser.add_argument('--limit', type=int, default=None, help='Limit number of files to process')
+    parser.add_argument('--batch-size', type=int, default=0,
+                        help='SWFs per JPEXS invocation (default: auto, 1 = one JVM per file)')
+    parser.add_argument('--no-native', action='store_true',
+                        help='Disable the pure-Python bitmap fast path (always use JPEXS)')
     parser.add_argument('--source', type=str, default=SOURCE_DIR, help='Source directory with SWF files')
     parser.add_argument('--output', type=str, default=OUTPUT_DIR, help='Output directory for extracted images')
+    parser.add_argument('--manifest', type=str, default=None,
+                        help='Extraction manifest path (default: extraction_manifest.db next to the output dir)')
+    parser.add_argument('--no-manifest', action='store_true',
+                        help='Ignore the manifest and extract every selected file')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='Only retry files the manifest records as failed')
+    parser.add_argument('--all-types', action='store_true',
+                        help='Request every asset type for every SWF (skip the tag pre-scan)')
+    parser.add_argument('--filename-order', action='store_true',
+                        help='Queue files in filename order instead of longest-first')
+    parser.add_argument('--no-retry', action='store_true',
+                        help='Record main-pass failures as they are instead of running the retry tiers')
+    parser.add_argument('--jpexs', type=str, default=None, help='Path to ffdec.jar (default: auto-detect)')
+    parser.add_argument('--java', type=str, default=None, help='Java executable (default: auto-detect)')
     parser.add_argument('--yes', '-y', action='store_true', help='Skip confirmation prompt')
     args = parser.parse_args()
     
+    global JPEXS_JAR_PATH, JAVA_PATH
+    # An explicit jar that is missing is an error, not a reason to auto-detect another one
+    if args.jpexs and not os.path.isfile(args.jpexs):
+        print(f"{Colors.RED}✗ --jpexs: {args.jpexs} not found{Colors.END}")
+        sys.exit(1)
+    JPEXS_JAR_PATH = args.jpexs or JPEXS_JAR_PATH
+    JAVA_PATH = args.java or JAVA_PATH
+    
     print_header()
     
     # Check Java
@@ -262,7 +766,7 @@ def main():
         print(f"  {Colors.CYAN}https://github.com/jindrapetrik/jpexs-decompiler/releases{Colors.END}")
         print(f"\n  After downloading, either:")
         print(f"  1. Place ffdec.jar in one of these locations:")
-        for p in [JPEXS_JAR_PATH] + JPEXS_ALT_PATHS[:3]:
+        for p in JPEXS_SEARCH_PATHS[:3]:
             print(f"     {p}")
         print(f"  2. Or edit JPEXS_JAR_PATH in this script")
         sys.exit(1)
@@ -292,15 +796,51 @@ def main():
             all_files = all_files[:args.limit]
             print(f"{Colors.MAGENTA}Limited to {args.limit} files{Colors.END}")
     
-    files_to_process = len(all_files)
-    
     # Create output directory
     output_dir = args.output
     os.makedirs(output_dir, exist_ok=True)
     print(f"  {Colors.GREEN}✓ Output directory ready: {output_dir}{Colors.END}")
     
+    # Pre-scan tag lists: request only the asset types each SWF contains
+    # (before the manifest, which re-extracts files that now need more types)
+    types_by_name = {}
+    if not args.all_types and all_files:
+        print(f"\n{Colors.BLUE}Pre-scanning SWF tags...{Colors.END}")
+        types_by_name, scan_stats = scan_swfs(source_dir, all_files, default_scan_cache_path(output_dir))
+        skipped = sum(1 for types in types_by_name.values() if types == "")
+        without_frames = sum(1 for types in types_by_name.values() if types and "frame" not in types)
+        print(f"  {Colors.GREEN}✓ {scan_stats['scanned']:,} scanned, {scan_stats['cached']:,} cached: "
+              f"{skipped:,} without visual tags, {without_frames:,} without frame export{Colors.END}")
+    
+    # Consult the manifest: skip unchanged files, extract identical content once
+    manifest = None
+    plan = None
+    to_extract = all_files
+    files_to_process = len(all_files)
+    if not args.no_manifest:
+        manifest_path = args.manifest or default_manifest_path(output_dir)
+        manifest = ExtractionManifest(manifest_path, get_ffdec_version(java_path, jpexs_path), ASSET_TYPES)
+        print(f"\n{Colors.BLUE}Hashing source files against manifest {manifest_path}...{Colors.END}")
+        plan = manifest.plan(source_dir, output_dir, all_files, retry_failed=args.retry_failed,
+                             requested_types=types_by_name)
+        to_extract = plan.to_extract
+        files_to_process = len(to_extract) + len(plan.reuse) + sum(len(d) for d in plan.duplicates.values())
+        print(f"  {Colors.GREEN}✓ {plan.up_to_date:,} files up to date (skipped){Colors.END}")
+        if plan.failed_skipped:
+            print(f"  {Colors.YELLOW}○ {plan.failed_skipped:,} previously failed files skipped (use --retry-failed){Colors.END}")
+        duplicate_count = files_to_process - len(to_extract)
+        if duplicate_count:
+            print(f"  {Colors.GREEN}✓ {duplicate_count:,} byte-identical files will reuse another file's output{Colors.END}")
+    
+    max_parallel = args.parallel or os.cpu_count() or 4
+    batch_size = get_batch_size(args.batch_size, len(to_extract), max_parallel)
+    
     # Confirm
-    print(f"\n{Colors.BOLD}Ready to extract {files_to_process:,} files using {args.parallel} parallel processes{Colors.END}")
+    if args.fixed_parallel:
+        print(f"\n{Colors.BOLD}Ready to extract {files_to_process:,} files using {max_parallel} parallel processes{Colors.END}")
+    else:
+        print(f"\n{Colors.BOLD}Ready to extract {files_to_process:,} files using up to {max_parallel} parallel processes (adaptive){Colors.END}")
+    print(f"  Batch size: {batch_size} SWF(s) per JPEXS invocation")
     if not args.test and not args.yes:
         print(f"{Colors.YELLOW}This may take several hours depending on your system.{Colors.END}")
         try:
@@ -312,12 +852,20 @@ def main():
             print("\nCancelled (non-interactive mode). Use --yes to skip confirmation.")
             sys.exit(0)
     
-    # Prepare extraction tasks
+    # Prepare extraction tasks: (swf_path, output_subdir, jpexs_path, asset types or None for all)
     tasks = []
-    for filename in all_files:
+    for filename in to_extract:
         swf_path = os.path.join(source_dir, filename)
         output_subdir = os.path.join(output_dir, filename)
-        tasks.append((swf_path, output_subdir, jpexs_path))
+        tasks.append((swf_path, output_subdir, jpexs_path, types_by_name.get(filename)))
+    
+    # Longest-first queue: cost from earlier runs' durations, else file size
+    costs = None
+    if not args.filename_order:
+        history = load_durations(default_events_path(output_dir))
+        costs = dict(zip(to_extract, estimate_costs(zip(to_extract, task_sizes(tasks)), history)))
+        known = sum(1 for filename in to_extract if filename in history)
+        print(f"  Queue order: longest first ({known:,} files with recorded durations, the rest by size)")
     
     # Progress tracking
     start_time = time.time()
@@ -325,41 +873,77 @@ def main():
     fail_count = 0
     empty_count = 0
     total_images = 0
+    retried_count = 0
+    recovered_count = 0
+    jpexs_durations = {}  # filename -> main-pass seconds, for the makespan comparison
     
     print(f"\n{Colors.BLUE}Starting extraction...{Colors.END}")
     print("-" * 60)
     
-    # Process files in parallel
-    with ThreadPoolExecutor(max_workers=args.parallel) as executor:
-        futures = {executor.submit(extract_single_swf, task): task for task in tasks}
+    # Process files: native fast path and JPEXS batches side by side
+    scheduler = AdaptiveScheduler(max_parallel, adaptive=not args.fixed_parallel,
+                                  timeouts=TimeoutModel(SWF_TIMEOUT))
+    results = run_extraction(tasks, scheduler, batch_size, native=not args.no_native, retry=not args.no_retry,
+                             costs=costs)
+    if manifest is not None:
+        results = apply_manifest(results, plan, manifest, output_dir)
+    inventory_writer = InventoryWriter(default_inventory_path(output_dir))
+    telemetry = TelemetryWriter(output_dir, files_to_process, {
+        "parallel": max_parallel, "adaptive": not args.fixed_parallel,
+        "batch_size": batch_size, "native": not args.no_native, "retry": not args.no_retry,
+        "order": "filename" if args.filename_order else "lpt", "prescan": not args.all_types})
+    # Redirected output (background runs) gets a plain line now and then
+    # instead of a carriage-return line per file; see extraction_status.json
+    interactive = sys.stdout.isatty()
+    for i, (success, filename, count, error, inventory, meta) in enumerate(results, 1):
+        # Persist what this SWF produced so later stages never rescan the tree
+        if inventory is not None:
+            inventory_writer.write(filename, inventory)
+        try:
+            input_bytes = os.path.getsize(os.path.join(source_dir, filename))
+        except OSError:
+            input_bytes = 0
+        telemetry.record(filename, success, count, error, inventory, meta, input_bytes)
+        if "attempts" in meta:
+            retried_count += 1
+            recovered_count += success
+        if meta.get("path") == "jpexs":
+            main_pass = meta["attempts"][0] if "attempts" in meta else meta
+            jpexs_durations[filename] = main_pass.get("seconds") or 0.0
         
-        for i, future in enumerate(as_completed(futures), 1):
-            success, filename, count, error = future.result()
-            
-            # Update progress
-            progress = (i / files_to_process) * 100
-            elapsed = time.time() - start_time
-            rate = i / elapsed if elapsed > 0 else 0
-            eta = (files_to_process - i) / rate if rate > 0 else 0
-            
-            if success:
-                success_count += 1
-                total_images += count
-                status = f"{Colors.GREEN}✓{Colors.END}"
-                detail = f"{count} images"
+        # Update progress
+        progress = (i / files_to_process) * 100
+        elapsed = time.time() - start_time
+        rate = i / elapsed if elapsed > 0 else 0
+        eta = (files_to_process - i) / rate if rate > 0 else 0
+        
+        if success:
+            success_count += 1
+            total_images += count
+            status = f"{Colors.GREEN}✓{Colors.END}"
+            detail = f"{count} images"
+        else:
+            if error == "No assets found":
+                empty_count += 1
+                status = f"{Colors.YELLOW}○{Colors.END}"
+                detail = "no images"
             else:
-                if "No images" in str(error):
-                    empty_count += 1
-                    status = f"{Colors.YELLOW}○{Colors.END}"
-                    detail = "no images"
-                else:
-                    fail_count += 1
-                    status = f"{Colors.RED}✗{Colors.END}"
-                    detail = str(error)[:30]
-            
-            # Print progress line
-            eta_str = f"{int(eta//60)}m {int(eta%60)}s" if eta > 0 else "..."
+                fail_count += 1
+                status = f"{Colors.RED}✗{Colors.END}"
+                detail = str(error)[:30]
+        
+        # Print progress line
+        eta_str = f"{int(eta//60)}m {int(eta%60)}s" if eta > 0 else "..."
+        if interactive:
             print(f"\r[{progress:5.1f}%] {status} {filename[:25]:<25} {detail:<20} ETA: {eta_str}    ", end="")
+        elif i % PROGRESS_EVERY == 0 or i == files_to_process:
+            print(f"[{progress:5.1f}%] {i:,}/{files_to_process:,} files, {success_count:,} ok, "
+                  f"{empty_count:,} empty, {fail_count:,} failed, ETA: {eta_str}", flush=True)
+    
+    inventory_writer.close()
+    telemetry.close()
+    if manifest is not None:
+        manifest.close()
     
     # Final summary
     elapsed_total = time.time() - start_time
@@ -370,14 +954,23 @@ def main():
     print(f"  {Colors.GREEN}Successful:       {success_count:,} files ({total_images:,} images){Colors.END}")
     print(f"  {Colors.YELLOW}Empty (no images): {empty_count:,} files{Colors.END}")
     print(f"  {Colors.RED}Failed:           {fail_count:,} files{Colors.END}")
+    if retried_count:
+        print(f"  Retried:          {retried_count:,} files ({recovered_count:,} recovered by the retry tiers)")
     print(f"\n  Time elapsed:     {int(elapsed_total//60)}m {int(elapsed_total%60)}s")
+    print(f"  Concurrency:      {scheduler.min_seen}-{scheduler.max_seen} JPEXS processes (-Xmx{scheduler.xmx_mb()}m)")
+    if costs and jpexs_durations:
+        lpt_span, naive_span = makespan_saving(jpexs_durations, batch_size, costs, scheduler.max_seen)
+        saving = (naive_span - lpt_span) / naive_span * 100 if naive_span > 0 else 0.0
+        print(f"  JPEXS makespan:   {lpt_span:.0f}s longest-first vs {naive_span:.0f}s in filename order "
+              f"({saving:.0f}% saved, replayed on {scheduler.max_seen} workers)")
     print(f"  Output location:  {output_dir}")
+    print(f"  Telemetry:        {default_status_path(output_dir)} (report: python3 extraction_telemetry.py)")
     
     print(f"\n{Colors.MAGENTA}NEXT STEPS:{Colors.END}")
     print("  1. Review the extracted images")
     print("  2. Organize them into categories (pets, furniture, ui, etc.)")
     print("  3. Import into Godot project")
-    print(f"\n{Colors.CYAN}Pro tip: Use 'python3 extract_assets.py --start X' to resume from file X{Colors.END}")
+    print(f"\n{Colors.CYAN}Pro tip: Just rerun the script to resume - the manifest skips files already extracted{Colors.END}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Extraction manifest
+===================
+Persistent SQLite record of every source SWF that extract_assets.py has
+processed: content hash, size, mtime, ffdec version, requested asset types
+and the result. Used to make reruns incremental:
+
+- unchanged inputs (same hash and ffdec version, extracted with at least
+  the asset types this run requests for them) are skipped
+- byte-identical SWFs under different names are extracted once and the
+  output is fanned out (hardlinked) to the other names
+- failed entries are only retried when asked for (--retry-failed)
+
+USAGE:
+   python3 extraction_manifest.py MANIFEST.db    # Print a summary of a manifest
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MANIFEST_FILENAME = "extraction_manifest.db"
+
+# Result states stored per file
+STATUS_SUCCESS = "success"
+STATUS_EMPTY = "empty"
+STATUS_FAILED = "failed"
+
+# Rows written between commits (a crash loses at most this many results)
+COMMIT_EVERY = 100
+
+HASH_CHUNK = 1024 * 1024
+HASH_WORKERS = 8
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    ffdec_version TEXT,
+    asset_types TEXT,
+    status TEXT,
+    asset_count INTEGER,
+    error TEXT,
+    canonical TEXT,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS files_by_hash ON files (content_hash);
+"""
+
+
+def default_manifest_path(output_dir):
+    """The manifest lives next to (not inside) the extraction output dir"""
+    return os.path.join(os.path.dirname(os.path.abspath(output_dir)), MANIFEST_FILENAME)
+
+def hash_file(path):
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_ffdec_version(java_cmd, jpexs_path):
+    """Version string reported by JPEXS (falls back to jar name and size)"""
+    try:
+        result = subprocess.run([java_cmd, "-jar", jpexs_path, "-version"],
+                                capture_output=True, text=True, timeout=30)
+        lines = (result.stdout or "").strip().splitlines()
+        if result.returncode == 0 and lines:
+            return lines[0].strip()
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+    return f"{os.path.basename(jpexs_path)}:{os.path.getsize(jpexs_path)}"
+
+def type_set(asset_types, all_types):
+    """Set of requested types ("" requests none, None requests all_types)"""
+    if asset_types is None:
+        asset_types = all_types
+    return set(asset_types.split(",")) if asset_types else set()
+
+def result_status(success, error):
+    """Map an extraction result tuple onto a manifest status"""
+    if success:
+        return STATUS_SUCCESS
+    if error == "No assets found":
+        return STATUS_EMPTY
+    return STATUS_FAILED
+
+def fan_out_output(src_dir, dst_dir):
+    """Mirror an extracted output tree under another name using hardlinks"""
+    if os.path.exists(dst_dir):
+        shutil.rmtree(dst_dir)
+    for root, dirs, files in os.walk(src_dir):
+        target_root = os.path.join(dst_dir, os.path.relpath(root, src_dir))
+        os.makedirs(target_root, exist_ok=True)
+        for name in files:
+            src = os.path.join(root, name)
+            dst = os.path.join(target_root, name)
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copy2(src, dst)
+
+
+class ExtractionPlan:
+    """What a run has to do after consulting the manifest"""
+
+    def __init__(self):
+        self.to_extract = []    # names whose SWF has to be extracted
+        self.duplicates = {}    # canonical name -> [names with identical content]
+        self.reuse = []         # (name, existing name) already extracted in an earlier run
+        self.up_to_date = 0     # unchanged files skipped entirely
+        self.failed_skipped = 0 # unchanged failures left alone (no --retry-failed)
+        self.file_info = {}     # name -> (content_hash, size, mtime_ns)
+        self.asset_types = {}   # name -> asset types requested this run (None = all)
+
+
+class ExtractionManifest:
+    """SQLite-backed per-file extraction record"""
+
+    def __init__(self, path, ffdec_version, asset_types):
+        self.path = path
+        self.ffdec_version = ffdec_version
+        self.asset_types = asset_types  # every type (what None requests)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self.pending_writes = 0
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def get(self, name):
+        row = self.conn.execute(
+            "SELECT name, content_hash, size, mtime_ns, ffdec_version, asset_types,"
+            " status, asset_count, error, canonical FROM files WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        keys = ("name", "content_hash", "size", "mtime_ns", "ffdec_version", "asset_types",
+                "status", "asset_count", "error", "canonical")
+        return dict(zip(keys, row))
+
+    def _covers(self, recorded_types, wanted_types):
+        """Whether output extracted with recorded_types has every type wanted now"""
+        return type_set(recorded_types, self.asset_types) >= type_set(wanted_types, self.asset_types)
+
+    def _is_current(self, row, content_hash, wanted_types):
+        return (row is not None
+                and row["content_hash"] == content_hash
+                and row["ffdec_version"] == self.ffdec_version
+                and self._covers(row["asset_types"], wanted_types))
+
+    def _stat_and_hash(self, source_dir, names):
+        """(content_hash, size, mtime_ns) per name; rehash only when size/mtime changed"""
+        cached = {}
+        for name in names:
+            row = self.get(name)
+            if row is not None:
+                cached[name] = row
+
+        def info(name):
+            st = os.stat(os.path.join(source_dir, name))
+            row = cached.get(name)
+            if row is not None and row["size"] == st.st_size and row["mtime_ns"] == st.st_mtime_ns:
+                return name, (row["content_hash"], st.st_size, st.st_mtime_ns)
+            return name, (hash_file(os.path.join(source_dir, name)), st.st_size, st.st_mtime_ns)
+
+        with ThreadPoolExecutor(max_workers=HASH_WORKERS) as executor:
+            return dict(executor.map(info, names))
+
+    def plan(self, source_dir, output_dir, names, retry_failed=False, requested_types=None):
+        """
+        Decide which of names need extracting
+        requested_types maps names to the asset types this run would ask
+        for (missing or None: all of them); a file extracted earlier with
+        fewer types is extracted again. With retry_failed only unchanged
+        entries that previously failed are scheduled. Identical content is
+        extracted once: the first name (in the given order) becomes
+        canonical and the rest are fanned out.
+        """
+        plan = ExtractionPlan()
+        plan.file_info = self._stat_and_hash(source_dir, names)
+        requested_types = requested_types or {}
+        plan.asset_types = {name: requested_types.get(name) for name in names}
+
+        # Hashes already extracted successfully in an earlier run, with their types
+        extracted_by_hash = {}
+        for name, content_hash, ffdec_version, asset_types in self.conn.execute(
+                "SELECT name, content_hash, ffdec_version, asset_types FROM files WHERE status = ?",
+                (STATUS_SUCCESS,)):
+            # Skip names whose source changed since (their output is about to be replaced)
+            if name in plan.file_info and plan.file_info[name][0] != content_hash:
+                continue
+            if ffdec_version == self.ffdec_version and os.path.isdir(os.path.join(output_dir, name)):
+                extracted_by_hash.setdefault(content_hash, []).append((name, asset_types))
+
+        canonical_by_hash = {}
+        for name in names:
+            content_hash = plan.file_info[name][0]
+            row = self.get(name)
+            wanted_types = plan.asset_types[name]
+            current = self._is_current(row, content_hash, wanted_types)
+
+            if retry_failed:
+                if not (current and row["status"] == STATUS_FAILED):
+                    plan.up_to_date += 1
+                    continue
+            elif current:
+                if row["status"] == STATUS_FAILED:
+                    plan.failed_skipped += 1
+                    continue
+                if row["status"] == STATUS_EMPTY or os.path.isdir(os.path.join(output_dir, name)):
+                    plan.up_to_date += 1
+                    continue
+
+            existing = next((other for other, asset_types in extracted_by_hash.get(content_hash, [])
+                             if other != name and self._covers(asset_types, wanted_types)), None)
+            if existing is not None:
+                plan.reuse.append((name, existing))
+            elif content_hash in canonical_by_hash:
+                plan.duplicates[canonical_by_hash[content_hash]].append(name)
+            else:
+                canonical_by_hash[content_hash] = name
+                plan.duplicates[name] = []
+                plan.to_extract.append(name)
+
+        return plan
+
+    def record(self, name, file_info, success, count, error, canonical=None, asset_types=None):
+        """Store the result for one source file (asset_types: what was requested, None = all)"""
+        content_hash, size, mtime_ns = file_info
+        if asset_types is None:
+            asset_types = self.asset_types
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (name, content_hash, size, mtime_ns, ffdec_version,"
+            " asset_types, status, asset_count, error, canonical, updated)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (name, content_hash, size, mtime_ns, self.ffdec_version, asset_types,
+             result_status(success, error), count, error, canonical or name, time.time()))
+        self.pending_writes += 1
+        if self.pending_writes >= COMMIT_EVERY:
+            self.conn.commit()
+            self.pending_writes = 0
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or not os.path.exists(sys.argv[1]):
+        print("Usage: python3 extraction_manifest.py MANIFEST.db")
+        sys.exit(1)
+    conn = sqlite3.connect(sys.argv[1])
+    total, unique = conn.execute("SELECT COUNT(*), COUNT(DISTINCT content_hash) FROM files").fetchone()
+    print(f"Entries:        {total:,}")
+    print(f"Unique content: {unique:,}")
+    for status, count in conn.execute("SELECT status, COUNT(*) FROM files GROUP BY status ORDER BY status"):
+        print(f"  {status:<12} {count:,}")
+    conn.close()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Adaptive extraction scheduler
+=============================
+Runs JPEXS jobs with asyncio.create_subprocess_exec and adjusts how many
+run at once from what the machine is doing:
+
+- load average per CPU above LOAD_HIGH (or free memory running short
+  compared to the JVMs' resident size) shrinks the concurrency limit
+- load below LOAD_LOW with plenty of free memory grows it again
+- the limit never exceeds the hard cap (--parallel)
+
+Each JVM gets a -Xmx budget so the running workers together stay within
+JVM_MEMORY_FRACTION of physical memory.
+
+The queue is ordered longest-processing-time first: estimate_costs() puts
+a cost on every file from its recorded duration in earlier runs, or its
+size at the recorded seconds per MB, so the slowest work starts first and
+short files fill in at the end; simulate_makespan() estimates how long a
+queue takes on N workers.
+
+Timeouts come from a TimeoutModel: a SWF may take TIMEOUT_MARGIN times what
+a slow file of its compressed size took so far (the TIMEOUT_RATE_PERCENTILE
+seconds per MB over successful runs), plus JVM start-up, between a floor
+and the caller's cap. Until enough runs were observed every file gets the cap.
+
+psutil is used for memory/RSS sampling when installed; otherwise the
+scheduler falls back to /proc (Linux) or sysctl/vm_stat/ps (macOS).
+"""
+
+import asyncio
+import heapq
+import os
+import re
+import subprocess
+import sys
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Seconds between load/memory samples
+SAMPLE_INTERVAL = 5.0
+
+# Load average per CPU that grows / shrinks concurrency
+LOAD_LOW = 0.85
+LOAD_HIGH = 1.25
+
+# Never let free memory drop below this (MB)
+MIN_FREE_MB = 1024
+
+# Share of physical memory all JVM heaps together may use
+JVM_MEMORY_FRACTION = 0.6
+
+# Per-JVM heap limits (MB)
+XMX_MIN_MB = 512
+XMX_MAX_MB = 4096
+
+# RSS assumed for a JVM before any has been sampled (MB)
+DEFAULT_JVM_RSS_MB = 600
+
+# Adaptive timeouts: seconds = TIMEOUT_STARTUP + TIMEOUT_MARGIN * MB * slow rate
+TIMEOUT_MIN = 20
+TIMEOUT_STARTUP = 10.0
+TIMEOUT_MARGIN = 3.0
+TIMEOUT_RATE_PERCENTILE = 95
+# Successful runs observed before the rate is trusted
+TIMEOUT_MIN_SAMPLES = 20
+# Smaller files are charged this size (their time is mostly JVM start-up)
+TIMEOUT_MIN_MB = 0.25
+
+# Seconds per MB assumed for files without history when nothing was recorded
+DEFAULT_SECONDS_PER_MB = 4.0
+
+
+# ============================================
+# SYSTEM SAMPLING
+# ============================================
+
+def get_memory_mb():
+    """(total, available) physical memory in MB"""
+    if psutil is not None:
+        memory = psutil.virtual_memory()
+        return memory.total // 2**20, memory.available // 2**20
+
+    if os.path.exists("/proc/meminfo"):
+        values = {}
+        with open("/proc/meminfo") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                values[key] = int(value.split()[0])  # kB
+        return values["MemTotal"] // 1024, values.get("MemAvailable", values["MemFree"]) // 1024
+
+    if sys.platform == 'darwin':
+        total = int(subprocess.run(["sysctl", "-n", "hw.memsize"],
+                                   capture_output=True, text=True).stdout)
+        vm_stat = subprocess.run(["vm_stat"], capture_output=True, text=True).stdout
+        page_size = int(re.search(r"page size of (\d+) bytes", vm_stat).group(1))
+        pages = 0
+        for key in ("Pages free", "Pages inactive", "Pages speculative"):
+            match = re.search(rf"{key}:\s+(\d+)", vm_stat)
+            if match:
+                pages += int(match.group(1))
+        return total // 2**20, pages * page_size // 2**20
+
+    return 0, 0
+
+def get_rss_mb(pids):
+    """Resident set size in MB per running process id"""
+    if not pids:
+        return {}
+    if psutil is not None:
+        rss = {}
+        for pid in pids:
+            try:
+                rss[pid] = psutil.Process(pid).memory_info().rss // 2**20
+            except psutil.Error:
+                pass
+        return rss
+    try:
+        result = subprocess.run(["ps", "-o", "pid=,rss=", "-p", ",".join(str(p) for p in pids)],
+                                capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.TimeoutExpired):
+        return {}
+    rss = {}
+    for line in result.stdout.splitlines():
+        fields = line.split()
+        if len(fields) == 2:
+            rss[int(fields[0])] = int(fields[1]) // 1024  # kB
+    return rss
+
+def get_load_per_cpu():
+    """1-minute load average divided by CPU count"""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except OSError:
+        return 0.0
+
+
+# ============================================
+# TIMEOUTS
+# ============================================
+
+class TimeoutModel:
+    """Per-run timeouts from input sizes and the throughput observed so far"""
+
+    def __init__(self, max_seconds):
+        self.max_seconds = max_seconds
+        self.rates = []  # seconds per MB of successful runs
+        self.rate = None
+        self.rate_samples = 0
+
+    def observe(self, sizes, seconds):
+        """Record a successful run over files of the given sizes (bytes)"""
+        self.rates.append(seconds / charged_mb(sizes))
+
+    def slow_rate(self):
+        """Seconds per MB of a slow run, or None before TIMEOUT_MIN_SAMPLES runs"""
+        if len(self.rates) < TIMEOUT_MIN_SAMPLES:
+            return None
+        # Re-sort only after the sample count grew by an eighth
+        if self.rate is None or len(self.rates) > self.rate_samples * 1.125:
+            ordered = sorted(self.rates)
+            self.rate = ordered[min(len(ordered) - 1, len(ordered) * TIMEOUT_RATE_PERCENTILE // 100)]
+            self.rate_samples = len(self.rates)
+        return self.rate
+
+    def estimate(self, sizes):
+        """Uncapped seconds a run over these files may take (None before enough samples)"""
+        rate = self.slow_rate()
+        if rate is None:
+            return None
+        return TIMEOUT_STARTUP + TIMEOUT_MARGIN * charged_mb(sizes) * rate
+
+    def timeout(self, sizes):
+        """Timeout for one run over these files: the estimate, at least TIMEOUT_MIN, at most the cap per file"""
+        cap = self.max_seconds * len(sizes)
+        estimate = self.estimate(sizes)
+        if estimate is None:
+            return cap
+        return min(cap, max(TIMEOUT_MIN, estimate))
+
+def charged_mb(sizes):
+    return sum(max(size / 2**20, TIMEOUT_MIN_MB) for size in sizes)
+
+
+# ============================================
+# QUEUE ORDER
+# ============================================
+
+def estimate_costs(files, history):
+    """
+    Estimated JPEXS seconds for each (name, size) in files
+    history maps a name to (seconds, input bytes) from earlier runs; a file
+    whose size is unchanged gets its recorded time, the rest are charged the
+    seconds per MB averaged over the history.
+    """
+    known = [(seconds, size) for seconds, size in history.values() if seconds]
+    rate = DEFAULT_SECONDS_PER_MB
+    if known:
+        rate = sum(seconds for seconds, _ in known) / charged_mb([size for _, size in known])
+    costs = []
+    for name, size in files:
+        recorded = history.get(name)
+        if recorded and recorded[0] and recorded[1] == size:
+            costs.append(recorded[0])
+        else:
+            costs.append(charged_mb([size]) * rate)
+    return costs
+
+def simulate_makespan(job_costs, workers):
+    """Seconds until the last job finishes when workers take jobs in list order"""
+    finish = [0.0] * max(1, workers)
+    for cost in job_costs:
+        heapq.heapreplace(finish, finish[0] + cost)
+    return max(finish)
+
+
+# ============================================
+# SCHEDULER
+# ============================================
+
+class AdaptiveScheduler:
+    """
+    Concurrency-limited runner for extraction jobs
+    Jobs are coroutine functions taking the scheduler; they launch JPEXS
+    through spawn() so their JVMs are sized and sampled, and take their
+    timeouts from the shared TimeoutModel.
+    """
+
+    def __init__(self, hard_cap, adaptive=True, timeouts=None, heap_mb=None):
+        self.hard_cap = max(1, hard_cap)
+        self.adaptive = adaptive
+        self.timeouts = timeouts
+        self.heap_mb = heap_mb
+        self.limit = self.hard_cap if not adaptive else max(1, min(self.hard_cap, (os.cpu_count() or 2) // 2))
+        self.active = 0
+        self.pending = []
+        self.pids = set()
+        self.jvm_rss_mb = DEFAULT_JVM_RSS_MB
+        self.total_mb, self.available_mb = get_memory_mb()
+        self.min_seen = self.limit
+        self.max_seen = self.limit
+        self.changed = asyncio.Event()
+
+    def xmx_mb(self):
+        """Heap budget for one JVM at the current concurrency limit (or the fixed heap)"""
+        if self.heap_mb:
+            return self.heap_mb
+        if not self.total_mb:
+            return XMX_MAX_MB
+        budget = int(self.total_mb * JVM_MEMORY_FRACTION / self.limit)
+        return max(XMX_MIN_MB, min(XMX_MAX_MB, budget))
+
+    def jvm_options(self):
+        return [f"-Xmx{self.xmx_mb()}m"]
+
+    def with_heap(self, heap_mb):
+        """
+        A scheduler for bigger JVMs (retries): every JVM gets heap_mb, and
+        concurrency is capped so all heaps fit the memory budget
+        """
+        heap_mb = min(heap_mb, int(self.total_mb * JVM_MEMORY_FRACTION)) if self.total_mb else heap_mb
+        cap = self.hard_cap
+        if self.total_mb:
+            cap = min(cap, int(self.total_mb * JVM_MEMORY_FRACTION // heap_mb))
+        return AdaptiveScheduler(max(1, cap), adaptive=self.adaptive, timeouts=self.timeouts, heap_mb=heap_mb)
+
+    async def spawn(self, cmd, timeout, env=None):
+        """
+        Run a command to completion; returns its exit code or None on timeout
+        The process is killed when the timeout expires.
+        """
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL, env=env)
+        self.pids.add(process.pid)
+        try:
+            return await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return None
+        finally:
+            self.pids.discard(process.pid)
+
+    def _set_limit(self, limit):
+        limit = max(1, min(self.hard_cap, limit))
+        if limit != self.limit:
+            self.limit = limit
+            self.min_seen = min(self.min_seen, limit)
+            self.max_seen = max(self.max_seen, limit)
+            self.changed.set()
+
+    def adjust(self):
+        """Grow or shrink the limit from one load/memory sample"""
+        self.total_mb, self.available_mb = get_memory_mb()
+        rss = get_rss_mb(list(self.pids))
+        if rss:
+            self.jvm_rss_mb = max(1, sum(rss.values()) // len(rss))
+        load = get_load_per_cpu()
+
+        memory_short = self.total_mb and self.available_mb < max(MIN_FREE_MB, self.jvm_rss_mb * 1.5)
+        memory_room = not self.total_mb or self.available_mb > MIN_FREE_MB + self.jvm_rss_mb * 2
+
+        if memory_short or load > LOAD_HIGH:
+            self._set_limit(self.limit - 1)
+        elif load < LOAD_LOW and memory_room and self.active >= self.limit:
+            self._set_limit(self.limit + 1)
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(SAMPLE_INTERVAL)
+            self.adjust()
+
+    def submit(self, job):
+        """
+        Queue one more job on the running run(), ahead of the jobs still
+        pending (for follow-up work a job discovers, e.g. native fallbacks)
+        """
+        self.pending.append(job)
+
+    async def run(self, jobs):
+        """
+        Run job coroutine functions, yielding each item of every job's result
+        list as jobs finish. Jobs may add more through submit().
+        """
+        self.pending = list(reversed(jobs))
+        running = set()
+        monitor = asyncio.ensure_future(self._monitor()) if self.adaptive else None
+        try:
+            while self.pending or running:
+                while self.pending and self.active < self.limit:
+                    running.add(asyncio.ensure_future(self.pending.pop()(self)))
+                    self.active += 1
+                self.changed.clear()
+                waiter = asyncio.ensure_future(self.changed.wait())
+                done, _ = await asyncio.wait(running | {waiter}, return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                for task in done:
+                    if task is waiter:
+                        continue
+                    running.discard(task)
+                    self.active -= 1
+                    for result in task.result():
+                        yield result
+        finally:
+            if monitor is not None:
+                monitor.cancel()
+
+def iterate(async_gen):
+    """Drive an async generator from synchronous code, one item at a time"""
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(async_gen.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
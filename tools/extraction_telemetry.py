@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Extraction telemetry
+====================
+Structured progress for extract_assets.py, replacing the colour-coded
+carriage-return log the monitor scripts used to grep:
+
+- extraction_events.jsonl  one JSON line per event, appended across runs:
+                           run_start, one "file" event per SWF (status,
+                           extraction path, wall time, JVM exit code, input
+                           bytes, output files/bytes by type, and for files
+                           that failed the main pass every retry tier's
+                           outcome), run_end
+- extraction_status.json   live snapshot rewritten every few seconds:
+                           progress, throughput, ETA, p50/p95/p99 per-file
+                           latency and the slowest files so far
+
+Both live next to the extraction output dir. JPEXS batches run several
+SWFs in one JVM, so each file in a batch is charged the batch's wall time
+divided by its size (batch_size is recorded with the event).
+
+USAGE:
+   python3 extraction_telemetry.py              # Report on the latest run (finished or in progress)
+   python3 extraction_telemetry.py --run ID     # Report on an earlier run
+   python3 extraction_telemetry.py --list       # List recorded runs
+"""
+
+import argparse
+import heapq
+import json
+import math
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from asset_inventory import EXT, SIZE, VISUAL_EXTENSIONS
+
+OUTPUT_DIR = "/Users/pa/PetSocietyMobile/assets/sprites/extracted"
+
+EVENTS_FILENAME = "extraction_events.jsonl"
+STATUS_FILENAME = "extraction_status.json"
+
+# Seconds between status file rewrites
+STATUS_INTERVAL = 2.0
+
+# Files listed in the slowest-N list
+SLOWEST_COUNT = 20
+
+# Latency percentiles reported
+PERCENTILES = (50, 95, 99)
+
+
+def default_events_path(output_dir):
+    """Telemetry lives next to (not inside) the extraction output dir"""
+    return os.path.join(os.path.dirname(os.path.abspath(output_dir)), EVENTS_FILENAME)
+
+def default_status_path(output_dir):
+    return os.path.join(os.path.dirname(os.path.abspath(output_dir)), STATUS_FILENAME)
+
+def percentiles(values):
+    """{"p50": ..., ...} by nearest rank (empty dict for no values)"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {f"p{p}": round(ordered[max(0, math.ceil(p * len(ordered) / 100) - 1)], 3) for p in PERCENTILES}
+
+def file_status(success, error):
+    if success:
+        return "success"
+    return "empty" if error == "No assets found" else "failed"
+
+
+# ============================================
+# WRITER (used by extract_assets.py)
+# ============================================
+
+class TelemetryWriter:
+    """Appends per-file events and keeps the live status file current"""
+
+    def __init__(self, output_dir, total, settings=None):
+        self.events_path = default_events_path(output_dir)
+        self.status_path = default_status_path(output_dir)
+        self.run_id = time.strftime("%Y%m%d-%H%M%S")
+        self.total = total
+        self.started = time.time()
+        self.last_status = 0.0
+        self.counts = Counter()
+        self.images = 0
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.latencies = []
+        self.slowest = []  # min-heap of (seconds, name)
+        self.file = open(self.events_path, 'a')
+        self._emit({"event": "run_start", "total": total, **(settings or {})})
+        self.write_status(running=True)
+
+    def _emit(self, event):
+        event = {"run": self.run_id, "t": round(time.time(), 3), **event}
+        self.file.write(json.dumps(event, separators=(',', ':')) + "\n")
+
+    def record(self, filename, success, count, error, inventory, meta, input_bytes):
+        """Log one finished SWF (a result tuple from extract_assets.py)"""
+        status = file_status(success, error)
+        inventory = inventory or []
+        outputs = Counter(entry[EXT] for entry in inventory)
+        output_bytes = sum(entry[SIZE] for entry in inventory)
+        seconds = meta.get("seconds")
+
+        self.counts[status] += 1
+        self.images += count if success else 0
+        self.input_bytes += input_bytes
+        self.output_bytes += output_bytes
+        if seconds is not None and meta.get("path") in ("native", "jpexs"):
+            self.latencies.append(seconds)
+            heapq.heappush(self.slowest, (seconds, filename))
+            if len(self.slowest) > SLOWEST_COUNT:
+                heapq.heappop(self.slowest)
+
+        self._emit({
+            "event": "file", "name": filename, "status": status, "error": error if status == "failed" else None,
+            "assets": count, "input_bytes": input_bytes, "output_files": len(inventory),
+            "output_bytes": output_bytes, "outputs": dict(outputs), **meta,
+        })
+        if time.time() - self.last_status >= STATUS_INTERVAL:
+            self.file.flush()
+            self.write_status(running=True)
+
+    def done(self):
+        return sum(self.counts.values())
+
+    def snapshot(self, running):
+        elapsed = time.time() - self.started
+        done = self.done()
+        rate = done / elapsed if elapsed > 0 else 0.0
+        return {
+            "run": self.run_id,
+            "running": running,
+            "started": round(self.started, 3),
+            "updated": round(time.time(), 3),
+            "elapsed_seconds": round(elapsed, 1),
+            "total": self.total,
+            "done": done,
+            "success": self.counts["success"],
+            "empty": self.counts["empty"],
+            "failed": self.counts["failed"],
+            "images": self.images,
+            "input_bytes": self.input_bytes,
+            "output_bytes": self.output_bytes,
+            "files_per_second": round(rate, 2),
+            "eta_seconds": round((self.total - done) / rate, 1) if rate > 0 and running else 0,
+            "latency": percentiles(self.latencies),
+            "slowest": [[name, round(seconds, 3)] for seconds, name in sorted(self.slowest, reverse=True)],
+        }
+
+    def write_status(self, running):
+        tmp_path = self.status_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(running), f, indent=2)
+        os.replace(tmp_path, self.status_path)
+        self.last_status = time.time()
+
+    def close(self):
+        snapshot = self.snapshot(running=False)
+        self._emit({"event": "run_end", "done": snapshot["done"], "elapsed_seconds": snapshot["elapsed_seconds"]})
+        self.file.close()
+        self.write_status(running=False)
+
+
+# ============================================
+# REPORT
+# ============================================
+
+def load_runs(events_path):
+    """run id -> list of events, in file order"""
+    runs = defaultdict(list)
+    with open(events_path) as f:
+        for line in f:
+            if line.strip():
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partially written last line of a live run
+                runs[event["run"]].append(event)
+    return runs
+
+def load_durations(events_path):
+    """
+    name -> (seconds, input bytes) of each file's latest JPEXS extraction
+    across all runs ({} without telemetry); failed runs count too, their time
+    being a lower bound on the file's cost
+    """
+    durations = {}
+    if not os.path.exists(events_path):
+        return durations
+    with open(events_path) as f:
+        for line in f:
+            if '"event":"file"' not in line or '"path":"jpexs"' not in line:
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if event.get("seconds") is not None:
+                durations[event["name"]] = (event["seconds"], event["input_bytes"])
+    return durations
+
+def format_bytes(count):
+    for unit in ("B", "KB", "MB", "GB"):
+        if count < 1024 or unit == "GB":
+            return f"{count:.1f} {unit}" if unit != "B" else f"{count} B"
+        count /= 1024
+
+def format_seconds(seconds):
+    return f"{int(seconds // 3600)}h {int(seconds % 3600 // 60)}m {int(seconds % 60)}s"
+
+def report(events, status=None, slowest_count=10):
+    """Print a summary of one run's events"""
+    start = next((e for e in events if e["event"] == "run_start"), None)
+    end = next((e for e in events if e["event"] == "run_end"), None)
+    files = [e for e in events if e["event"] == "file"]
+    total = start["total"] if start else len(files)
+    first_t = start["t"] if start else (files[0]["t"] if files else 0)
+    last_t = end["t"] if end else (files[-1]["t"] if files else first_t)
+    elapsed = max(last_t - first_t, 0.001)
+
+    statuses = Counter(e["status"] for e in files)
+    print(f"Run {events[0]['run']}: {'finished' if end else 'in progress (or interrupted)'}")
+    if status and status.get("run") == events[0]["run"] and status.get("running"):
+        print(f"  Live status updated {time.time() - status['updated']:.0f}s ago, ETA {format_seconds(status['eta_seconds'])}")
+    print(f"\nFiles:            {len(files):,} / {total:,} ({len(files) / max(total, 1) * 100:.1f}%)")
+    print(f"  success:        {statuses['success']:,}")
+    print(f"  empty:          {statuses['empty']:,}")
+    print(f"  failed:         {statuses['failed']:,}")
+    print(f"Elapsed:          {format_seconds(elapsed)} ({len(files) / elapsed:.1f} files/s)")
+    print(f"Input:            {format_bytes(sum(e['input_bytes'] for e in files))}")
+    outputs = Counter()
+    for e in files:
+        outputs.update(e["outputs"])
+    by_type = ", ".join(f"{n:,} {ext}" for ext, n in outputs.most_common() if ext in VISUAL_EXTENSIONS)
+    print(f"Output:           {format_bytes(sum(e['output_bytes'] for e in files))} in "
+          f"{sum(outputs.values()):,} files" + (f" ({by_type})" if by_type else ""))
+
+    print("\nPer-file latency (seconds):")
+    by_path = defaultdict(list)
+    for e in files:
+        by_path[e.get("path", "?")].append(e)
+    for path, path_events in sorted(by_path.items()):
+        latencies = [e["seconds"] for e in path_events if e.get("seconds") is not None]
+        values = percentiles(latencies) if path in ("native", "jpexs") else {}
+        print(f"  {path:<10} {len(path_events):>7,} files  "
+              + "  ".join(f"{key} {value:.3f}" for key, value in values.items()))
+
+    exit_codes = Counter(e["exit_code"] for e in files if e.get("path") == "jpexs" and "exit_code" in e)
+    if exit_codes:
+        print("\nJVM exit codes:   " + ", ".join(f"{'timeout' if code is None else code}: {n:,}"
+                                             for code, n in exit_codes.most_common()))
+
+    retried = [e for e in files if e.get("attempts")]
+    if retried:
+        print(f"\nRetry tiers ({len(retried):,} files failed the main pass):")
+        tiers = defaultdict(Counter)
+        for e in retried:
+            for attempt in e["attempts"][1:]:
+                outcome = "recovered" if attempt["error"] is None else (
+                    "empty" if attempt["error"] == "No assets found" else "failed")
+                tiers[attempt["tier"]][outcome] += 1
+        for tier, outcomes in tiers.items():
+            print(f"  {tier:<12} {sum(outcomes.values()):>6,} tried  {outcomes['recovered']:>6,} recovered  "
+                  f"{outcomes['empty']:>6,} empty  {outcomes['failed']:>6,} failed")
+
+    errors = Counter(e["error"] for e in files if e["status"] == "failed")
+    if errors:
+        print("\nFailures:")
+        for error, n in errors.most_common(10):
+            print(f"  {n:>6,}  {error}")
+
+    timed = [e for e in files if e.get("seconds") is not None and e.get("path") in ("native", "jpexs")]
+    if timed:
+        print(f"\nSlowest {min(slowest_count, len(timed))} files:")
+        for e in heapq.nlargest(slowest_count, timed, key=lambda e: e["seconds"]):
+            print(f"  {e['seconds']:8.2f}s  {e['name']:<30} {e['path']} "
+                  f"(batch of {e.get('batch_size', 1)}, {format_bytes(e['input_bytes'])})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Summarize extraction telemetry')
+    parser.add_argument('--output', type=str, default=OUTPUT_DIR, help='Extraction output directory')
+    parser.add_argument('--events', type=str, default=None,
+                        help='Events file (default: extraction_events.jsonl next to the output dir)')
+    parser.add_argument('--run', type=str, default=None, help='Run id to report on (default: latest)')
+    parser.add_argument('--list', action='store_true', help='List recorded runs')
+    parser.add_argument('--slowest', type=int, default=10, help='Slowest files to list (default: 10)')
+    args = parser.parse_args()
+
+    events_path = args.events or default_events_path(args.output)
+    if not os.path.exists(events_path):
+        print(f"Error: No telemetry found at {events_path} (run extract_assets.py first)")
+        sys.exit(1)
+    runs = load_runs(events_path)
+    if not runs:
+        print(f"Error: {events_path} has no events")
+        sys.exit(1)
+
+    if args.list:
+        for run_id, events in runs.items():
+            files = sum(1 for e in events if e["event"] == "file")
+            finished = any(e["event"] == "run_end" for e in events)
+            print(f"  {run_id}  {files:>7,} files  {'finished' if finished else 'in progress/interrupted'}")
+        sys.exit(0)
+
+    run_id = args.run or list(runs)[-1]
+    if run_id not in runs:
+        print(f"Error: No run {run_id} in {events_path}")
+        sys.exit(1)
+    status = None
+    status_path = os.path.join(os.path.dirname(os.path.abspath(events_path)), STATUS_FILENAME)
+    if os.path.exists(status_path):
+        with open(status_path) as f:
+            status = json.load(f)
+    report(runs[run_id], status, args.slowest)
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Image metadata index
+====================
+The organize scripts used to pick each SWF's "best" image by file size,
+which favours badly compressed files over larger, better compressed ones,
+and the game only learned a sprite's size by decoding its texture.
+
+This stage records, for every candidate image (the PNG/JPEG files the
+organize scripts choose from):
+
+- width and height, from the PNG IHDR chunk or the JPEG SOF marker, read
+  through mmap without decoding any pixels
+- channels after decoding (alpha counts for RGBA, grey+alpha and PNGs with
+  a tRNS chunk)
+- with --alpha, the opaque bounding box [x, y, w, h] of pixels with
+  non-zero alpha (decodes the image; NumPy and Pillow required)
+
+The index is asset_image_metadata.json next to the extracted dir.
+organize_assets_v2.py ranks candidates by pixel area when it exists and
+copies width/height/channels/opaque_rect into the lookup entries. Files
+whose size and mtime have not changed since the last run are not read
+again.
+
+USAGE:
+   python3 image_metadata.py                # Header pass (seconds on the full tree)
+   python3 image_metadata.py --alpha        # Also compute opaque bounding boxes
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from perceptual_hash import list_candidates
+
+EXTRACTED_DIR = "/Users/pa/PetSocietyMobile/assets/sprites/extracted"
+
+METADATA_INDEX_FILENAME = "asset_image_metadata.json"
+METADATA_INDEX_VERSION = 1
+
+# Record fields: [file size, width, height, channels, opaque rect or None, mtime_ns]
+FILE_SIZE, WIDTH, HEIGHT, CHANNELS, OPAQUE_RECT, MTIME = range(6)
+
+# Images per worker task
+CHUNK_SIZE = 512
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Channels per PNG colour type (palette decodes to RGB)
+PNG_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+# JPEG start-of-frame markers (C4, C8 and CC are DHT, JPG and DAC)
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# JPEG markers without a length field
+JPEG_STANDALONE_MARKERS = set(range(0xD0, 0xDA)) | {0x01}
+
+
+def default_metadata_index_path(extracted_dir):
+    """The index lives next to (not inside) the extracted dir"""
+    return os.path.join(os.path.dirname(os.path.abspath(extracted_dir)), METADATA_INDEX_FILENAME)
+
+def load_image_metadata(extracted_dir):
+    """Relative path -> record (see FILE_SIZE..OPAQUE_RECT), {} if there is no index"""
+    path = default_metadata_index_path(extracted_dir)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)["images"]
+
+
+# ============================================
+# HEADERS
+# ============================================
+
+def png_header(data):
+    """(width, height, channels) from IHDR; tRNS before IDAT adds an alpha channel"""
+    width, height, _, color_type = struct.unpack(">IIBB", data[16:26])
+    channels = PNG_CHANNELS[color_type]
+    offset = 8
+    while offset + 8 <= len(data):
+        length, kind = struct.unpack(">I4s", data[offset:offset + 8])
+        if kind == b"tRNS":
+            channels = {1: 2, 3: 4}.get(channels, channels)
+            break
+        if kind in (b"IDAT", b"IEND"):
+            break
+        offset += 12 + length
+    return width, height, channels
+
+def jpeg_header(data):
+    """(width, height, channels) from the first SOF marker, or None"""
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            # Not at a marker (e.g. SWF JPEGs with a doubled header): resync
+            offset = data.find(b"\xff", offset + 1)
+            if offset < 0:
+                return None
+            continue
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker in JPEG_STANDALONE_MARKERS or marker == 0xD8:
+            offset += 2
+            continue
+        length = struct.unpack(">H", data[offset + 2:offset + 4])[0]
+        if marker in JPEG_SOF_MARKERS and offset + 10 <= len(data):
+            height, width, channels = struct.unpack(">HHB", data[offset + 5:offset + 10])
+            return width, height, channels
+        offset += 2 + length
+    return None
+
+def read_header(path):
+    """(width, height, channels) of a PNG/JPEG without decoding it, or None"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < 26:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:8] == PNG_SIGNATURE and data[12:16] == b"IHDR":
+                return png_header(data)
+            if data[:2] == b"\xff\xd8":
+                return jpeg_header(data)
+    return None
+
+def opaque_rect(path):
+    """[x, y, w, h] of the pixels with non-zero alpha ([0, 0, 0, 0] if none)"""
+    with Image.open(path) as img:
+        if "A" not in img.getbands() and "transparency" not in img.info:
+            return [0, 0, img.width, img.height]
+        alpha = np.asarray(img.convert("RGBA"))[:, :, 3]
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if not len(rows):
+        return [0, 0, 0, 0]
+    cols = np.flatnonzero(alpha.any(axis=0))
+    return [int(cols[0]), int(rows[0]), int(cols[-1] - cols[0] + 1), int(rows[-1] - rows[0] + 1)]
+
+
+# ============================================
+# WORKER
+# ============================================
+
+def read_metadata(job):
+    """Records for a chunk of (path, size, mtime_ns) items; None for unreadable files"""
+    items, with_alpha = job
+    records = []
+    for path, size, mtime_ns in items:
+        try:
+            header = read_header(path)
+            if header is None and Image is not None:
+                # Unusual layouts: let Pillow parse the header (still no decode)
+                with Image.open(path) as img:
+                    header = (img.width, img.height, len(img.getbands()))
+            if header is None:
+                records.append(None)
+                continue
+            rect = opaque_rect(path) if with_alpha else None
+        except (OSError, ValueError, struct.error, KeyError):
+            records.append(None)
+            continue
+        records.append([size, header[0], header[1], header[2], rect, mtime_ns])
+    return records
+
+
+# ============================================
+# INDEX
+# ============================================
+
+def build_metadata_index(extracted_dir, index_path, with_alpha=False, workers=None):
+    """Read metadata for every candidate and write the index; returns a stats dict"""
+    candidates = list_candidates(extracted_dir)
+    previous = {}
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            previous = json.load(f).get("images", {})
+
+    images, todo = {}, []
+    for rel_path, size in candidates:
+        try:
+            mtime_ns = os.stat(os.path.join(extracted_dir, rel_path)).st_mtime_ns
+        except OSError:
+            continue
+        record = previous.get(rel_path)
+        if (record and len(record) > MTIME and record[FILE_SIZE] == size and record[MTIME] == mtime_ns
+                and (record[OPAQUE_RECT] is not None or not with_alpha)):
+            images[rel_path] = record
+        else:
+            todo.append((rel_path, size, mtime_ns))
+
+    stats = {"candidates": len(candidates), "read": len(todo), "cached": len(images), "unreadable": 0}
+    jobs = [([(os.path.join(extracted_dir, rel_path), size, mtime_ns)
+              for rel_path, size, mtime_ns in todo[i:i + CHUNK_SIZE]], with_alpha)
+            for i in range(0, len(todo), CHUNK_SIZE)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_start, records in zip(range(0, len(todo), CHUNK_SIZE), executor.map(read_metadata, jobs)):
+            for (rel_path, _, _), record in zip(todo[chunk_start:chunk_start + CHUNK_SIZE], records):
+                if record is None:
+                    stats["unreadable"] += 1
+                else:
+                    images[rel_path] = record
+
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"version": METADATA_INDEX_VERSION, "images": dict(sorted(images.items()))}, f,
+                  separators=(',', ':'))
+    os.replace(tmp_path, index_path)
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Index dimensions and opaque bounds of extracted images')
+    parser.add_argument('--output', type=str, default=EXTRACTED_DIR, help='Extracted asset directory')
+    parser.add_argument('--alpha', action='store_true', help='Also compute opaque bounding boxes (decodes images)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    if args.alpha and (np is None or Image is None):
+        print("Error: NumPy and Pillow are required for --alpha (pip3 install numpy pillow)")
+        sys.exit(1)
+    if not os.path.isdir(args.output):
+        print(f"Error: Extracted directory not found: {args.output}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Indexing Image Metadata")
+    print("=" * 60)
+    start_time = time.time()
+    index_path = default_metadata_index_path(args.output)
+    stats = build_metadata_index(args.output, index_path, with_alpha=args.alpha, workers=args.workers)
+
+    print(f"\nCandidates:           {stats['candidates']:,}")
+    print(f"  read:               {stats['read']:,}")
+    print(f"  unchanged:          {stats['cached']:,}")
+    print(f"  unreadable:         {stats['unreadable']:,}")
+    print(f"Time elapsed:         {time.time() - start_time:.1f}s")
+    print(f"\nIndex: {index_path}")
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Item hash index
+===============
+Items in the original game refer to their graphics by an item hash, while
+the extracted assets are named after their SWF file. This builds the
+item hash -> SWF name table AssetLoader.load_texture_by_hash reads.
+
+Pairs come from:
+
+- the original game data (XML or JSON files under DATA_DIR): any element
+  or object with an id/hash field (HASH_FIELDS) and a field naming a SWF
+  that is in the asset lookup
+- swf_symbol_index.json (swf_symbols.py): SWFs with a class or export
+  name that is an item number, like Item_12345 or com.game.Item12345
+  (frame labels are not used)
+
+Data files take precedence over symbols. A hash that one source ties to
+more than one SWF is ambiguous and left out rather than guessed. Only
+assets present in asset_lookup.json are indexed, so every hash in the
+table resolves.
+
+item_hash_index.bin (next to asset_lookup.json) is a fixed-width binary
+table the loader binary-searches without parsing anything:
+
+   header   magic "PSIH", u16 version, u16 name width, u32 record count
+   records  s64 item hash, name (UTF-8, zero-padded to name width)
+
+all little-endian, records sorted by hash as a signed 64-bit integer (the
+way GDScript compares ints).
+
+USAGE:
+   python3 item_hash_index.py                   # Build from DATA_DIR and the symbol index
+   python3 item_hash_index.py --data DIR        # Another game data directory
+   python3 item_hash_index.py --find 12345      # Look up one hash in the built table (0x1A2B for hex)
+"""
+
+import argparse
+import json
+import os
+import re
+import struct
+import sys
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from asset_lookup import LOOKUP_JSON, load_lookup
+from swf_symbols import default_symbol_index_path, load_index_files
+
+DATA_DIR = "/Users/pa/petsociety/static/data"
+EXTRACTED_DIR = "/Users/pa/PetSocietyMobile/assets/sprites/extracted"
+GODOT_ASSETS_DIR = "/Users/pa/PetSocietyMobile/assets/sprites"
+
+INDEX_FILENAME = "item_hash_index.bin"
+INDEX_MAGIC = b"PSIH"
+INDEX_VERSION = 1
+HEADER = struct.Struct('<4sHHI')
+
+# Field names (lowercase) that hold an item's hash, in preference order
+HASH_FIELDS = ["hash", "item_hash", "itemhash", "item_id", "itemid", "id"]
+
+# Class/export names that are an item number: Item12345, Item_12345, com.game.Item12345
+# (not MenuItem3 or InventoryItemRenderer2)
+ITEM_SYMBOL_PATTERN = re.compile(r"^(?:.*\.)?Item_?(\d+)$")
+
+# Symbol kinds item names are taken from
+ITEM_SYMBOL_KINDS = ["classes", "exports"]
+
+INT64_MIN, INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+
+def default_index_path(godot_assets_dir):
+    return os.path.join(godot_assets_dir, INDEX_FILENAME)
+
+def parse_hash(value):
+    """Signed 64-bit item hash from "12345", "-5" or "0x1A2B" (None if not one)"""
+    if not isinstance(value, (str, int)) or isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        text = value.strip().lower()
+        try:
+            value = int(text, 16) if text.startswith("0x") else int(text, 10)
+        except ValueError:
+            return None
+    # Unsigned 64-bit hashes wrap to the signed int GDScript stores
+    if INT64_MAX < value < (1 << 64):
+        value -= 1 << 64
+    return value if INT64_MIN <= value <= INT64_MAX else None
+
+def asset_reference(value, names):
+    """The lookup name a field value refers to ("assets/00AOM3dlhY.swf" -> "00AOM3dlhY")"""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    name = os.path.splitext(value.strip().replace("\\", "/").rsplit("/", 1)[-1])[0]
+    return name if name in names else None
+
+def record_pair(fields, names):
+    """(hash, asset name) of one element/object's fields, or None"""
+    lowered = {key.lower(): value for key, value in fields.items()}
+    item_hash = next((h for h in (parse_hash(lowered.get(f)) for f in HASH_FIELDS) if h is not None), None)
+    if item_hash is None:
+        return None
+    asset = next((a for a in (asset_reference(v, names) for v in fields.values()) if a), None)
+    return (item_hash, asset) if asset else None
+
+
+# ============================================
+# SOURCES
+# ============================================
+
+def xml_pairs(path, names):
+    """Pairs from an XML file's elements (attributes plus leaf child text)"""
+    for _, element in ET.iterparse(path, events=("end",)):
+        fields = dict(element.attrib)
+        for child in element:
+            if len(child) == 0 and child.text:
+                fields.setdefault(child.tag, child.text)
+        pair = record_pair(fields, names)
+        if pair:
+            yield pair
+        # Grandchildren are no longer needed once this element is done
+        for child in element:
+            child.clear()
+
+def json_pairs(path, names):
+    """Pairs from every object in a JSON file"""
+    with open(path) as f:
+        stack = [json.load(f)]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            pair = record_pair({k: v for k, v in value.items() if not isinstance(v, (dict, list))}, names)
+            if pair:
+                yield pair
+            stack.extend(reversed(list(value.values())))
+        elif isinstance(value, list):
+            stack.extend(reversed(value))
+
+DATA_READERS = {".xml": xml_pairs, ".json": json_pairs}
+
+def data_pairs(data_dir, names, stats):
+    for root, dirs, files in os.walk(data_dir):
+        dirs.sort()
+        for filename in sorted(files):
+            reader = DATA_READERS.get(os.path.splitext(filename)[1].lower())
+            if reader is None:
+                continue
+            path = os.path.join(root, filename)
+            try:
+                for pair in reader(path, names):
+                    stats["data"] += 1
+                    yield pair
+            except (OSError, ET.ParseError, json.JSONDecodeError, UnicodeDecodeError) as e:
+                stats["unreadable"] += 1
+                print(f"  Skipping {path}: {e}")
+
+def symbol_pairs(extracted_dir, names, stats):
+    files = load_index_files(default_symbol_index_path(extracted_dir))
+    for asset_name, (_, _, symbols) in sorted(files.items()):
+        if asset_name not in names or not symbols:
+            continue
+        for kind in ITEM_SYMBOL_KINDS:
+            for symbol in symbols.get(kind, []):
+                match = ITEM_SYMBOL_PATTERN.match(symbol)
+                if match:
+                    stats["symbols"] += 1
+                    yield parse_hash(match.group(1)), asset_name
+
+
+# ============================================
+# TABLE
+# ============================================
+
+def build_table(sources, stats):
+    """
+    hash -> asset name from sources in precedence order; a hash one source
+    ties to several assets is dropped, and later sources only fill hashes
+    earlier ones did not claim
+    """
+    table, claimed = {}, set()
+    for pairs in sources:
+        claims = {}
+        for item_hash, asset_name in pairs:
+            if item_hash is not None:
+                claims.setdefault(item_hash, set()).add(asset_name)
+        for item_hash, assets in claims.items():
+            if item_hash in claimed:
+                if item_hash in table and assets != {table[item_hash]}:
+                    stats["overridden"] += 1
+            elif len(assets) > 1:
+                stats["ambiguous"] += 1
+            else:
+                table[item_hash] = next(iter(assets))
+        claimed.update(claims)
+    return table
+
+def write_index(table, path):
+    """Write the sorted fixed-width table atomically; returns the name width"""
+    encoded = {item_hash: name.encode("utf-8") for item_hash, name in table.items()}
+    name_width = max((len(name) for name in encoded.values()), default=0)
+    record = struct.Struct(f'<q{name_width}s')
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, name_width, len(encoded)))
+        for item_hash in sorted(encoded):
+            f.write(record.pack(item_hash, encoded[item_hash]))
+    os.replace(tmp_path, path)
+    return name_width
+
+def find_in_index(path, item_hash):
+    """Binary-search the table file for a hash (same search as AssetLoader)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, name_width, count = HEADER.unpack_from(data)
+    if magic != INDEX_MAGIC or version != INDEX_VERSION:
+        raise ValueError(f"{path} is not a version {INDEX_VERSION} item hash index")
+    record = struct.Struct(f'<q{name_width}s')
+    low, high = 0, count - 1
+    while low <= high:
+        mid = (low + high) // 2
+        key, name = record.unpack_from(data, HEADER.size + mid * record.size)
+        if key < item_hash:
+            low = mid + 1
+        elif key > item_hash:
+            high = mid - 1
+        else:
+            return name.rstrip(b"\0").decode("utf-8")
+    return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the item hash -> asset table for AssetLoader')
+    parser.add_argument('--data', type=str, default=DATA_DIR, help='Original game data directory (XML/JSON)')
+    parser.add_argument('--extracted', type=str, default=EXTRACTED_DIR,
+                        help='Extracted assets directory (for swf_symbol_index.json next to it)')
+    parser.add_argument('--assets', type=str, default=GODOT_ASSETS_DIR,
+                        help='Directory with asset_lookup.json (the index is written there)')
+    parser.add_argument('--find', type=str, default=None, metavar='HASH',
+                        help='Look up one item hash in the built index (decimal, or hex with 0x, as in the data files)')
+    args = parser.parse_args()
+
+    index_path = default_index_path(args.assets)
+    if args.find is not None:
+        item_hash = parse_hash(args.find)
+        if item_hash is None or not os.path.exists(index_path):
+            print(f"Error: need an item hash (12345 or 0x1A2B) and {index_path}")
+            sys.exit(1)
+        print(find_in_index(index_path, item_hash) or "not found")
+        sys.exit(0)
+
+    if not os.path.exists(os.path.join(args.assets, LOOKUP_JSON)):
+        print(f"Error: {LOOKUP_JSON} not found in {args.assets} (run organize_assets_v2.py first)")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Building Item Hash Index")
+    print("=" * 60)
+    start_time = time.time()
+    names = set(load_lookup(args.assets))
+    stats = Counter()
+    sources = []
+    if os.path.isdir(args.data):
+        sources.append(data_pairs(args.data, names, stats))
+    else:
+        print(f"Note: no game data directory at {args.data}")
+    sources.append(symbol_pairs(args.extracted, names, stats))
+    table = build_table(sources, stats)
+    name_width = write_index(table, index_path)
+
+    print(f"\nLookup assets:        {len(names):,}")
+    print(f"Pairs found:          {stats['data']:,} in data files, {stats['symbols']:,} in symbol names")
+    print(f"  ambiguous hashes:   {stats['ambiguous']:,} (tied to several SWFs, dropped)")
+    print(f"  overridden:         {stats['overridden']:,} (symbols disagreeing with data files)")
+    print(f"  unreadable files:   {stats['unreadable']:,}")
+    print(f"Items indexed:        {len(table):,} ({HEADER.size + len(table) * (8 + name_width):,} bytes)")
+    print(f"\nIndex saved to: {index_path}")
+    print(f"Time elapsed:         {time.time() - start_time:.1f}s")
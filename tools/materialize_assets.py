@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Asset materialization
+=====================
+The lookup directory (assets/sprites/lookup/) and organize_assets.py's
+category folders are symlinks into the extracted tree, which Godot exports
+and some filesystems do not follow. This turns them into real files:
+
+- hardlink when source and destination share a filesystem
+- otherwise a reflink (FICLONE on Linux, clonefile on macOS)
+- otherwise a copy (copy_file_range where available)
+
+Files run over a thread pool. Each destination's source path, sizes and
+mtimes are cached in materialize_cache.json (next to the destination
+directory), so a rerun skips every file whose source and destination are
+unchanged without reading them; files whose stat changed are compared by
+inode, then size and content hash, before anything is rewritten.
+Destinations are replaced atomically.
+
+organize_assets_v2.py leaves materialized lookup files alone when they
+were made from the file it would link, so organize -> materialize reruns
+only touch what changed. optimize_pngs.py records the lookup files it
+rewrites here too (record_files), so they are kept rather than treated as
+stale copies of their source.
+
+USAGE:
+   python3 materialize_assets.py                              # Replace lookup/ symlinks with real files
+   python3 materialize_assets.py --dir DIR                    # Another directory of symlinks
+   python3 materialize_assets.py --source SRC --dest DEST     # Real copies of SRC's files in DEST
+   python3 materialize_assets.py --method copy                # Force copies (no hardlinks/reflinks)
+"""
+
+import argparse
+import ctypes
+import hashlib
+import json
+import os
+import shutil
+import stat
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+GODOT_ASSETS_DIR = "/Users/pa/PetSocietyMobile/assets/sprites"
+
+CACHE_FILENAME = "materialize_cache.json"
+CACHE_VERSION = 1
+
+# Cache record fields
+SOURCE, SOURCE_SIZE, SOURCE_MTIME, DEST_SIZE, DEST_MTIME, CONTENT_HASH = range(6)
+
+METHODS = ["auto", "hardlink", "reflink", "copy"]
+
+# Linux ioctl that shares a file's extents with another (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+HASH_CHUNK = 1024 * 1024
+
+
+def default_cache_path(dest_dir):
+    """The cache lives next to (not inside) the destination directory"""
+    return os.path.join(os.path.dirname(os.path.abspath(dest_dir)), CACHE_FILENAME)
+
+def link_target(path):
+    """Absolute path a symlink points at, relative targets resolved against the link's own directory"""
+    return os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(path)), os.readlink(path)))
+
+def load_cache(cache_path):
+    """Destination path (relative to the cache's directory) -> record, {} if missing"""
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return cache["files"] if cache.get("version") == CACHE_VERSION else {}
+
+def load_materialized(dest_dir):
+    """File name -> source path of every materialized file in dest_dir"""
+    cache_path = default_cache_path(dest_dir)
+    prefix = os.path.basename(os.path.normpath(dest_dir)) + "/"
+    return {key[len(prefix):]: record[SOURCE] for key, record in load_cache(cache_path).items()
+            if key.startswith(prefix) and "/" not in key[len(prefix):]}
+
+def write_cache(cache_path, cache):
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"version": CACHE_VERSION, "files": cache}, f, separators=(',', ':'))
+    os.replace(tmp_path, cache_path)
+
+def record_files(dest_dir, sources):
+    """
+    Record files another stage wrote into dest_dir (file name -> source
+    path) as materialized from that source in their current state, so
+    reruns keep them until the source changes
+    """
+    cache_path = default_cache_path(dest_dir)
+    cache_dir = os.path.dirname(cache_path)
+    cache = load_cache(cache_path)
+    for name, source in sources.items():
+        dest = os.path.join(dest_dir, name)
+        try:
+            src, dst = os.stat(source), os.lstat(dest)
+        except OSError:
+            continue
+        cache[os.path.relpath(os.path.abspath(dest), cache_dir)] = [
+            source, src.st_size, src.st_mtime_ns, dst.st_size, dst.st_mtime_ns, None]
+    write_cache(cache_path, cache)
+
+def file_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ============================================
+# WRITE METHODS
+# ============================================
+
+def write_hardlink(source, target):
+    os.link(source, target)
+
+def write_reflink(source, target):
+    """Clone source's extents; raises OSError where the filesystem cannot"""
+    if sys.platform == 'darwin':
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(os.fsencode(source), os.fsencode(target), 0) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), target)
+        return
+    if fcntl is None:
+        raise OSError("reflinks not supported on this platform")
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(target)
+            raise
+
+def write_copy(source, target):
+    """In-kernel copy (copy_file_range) where available, else a buffered copy"""
+    if hasattr(os, "copy_file_range"):
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            try:
+                while os.copy_file_range(src.fileno(), dst.fileno(), HASH_CHUNK * 16):
+                    pass
+                return
+            except OSError:
+                pass  # Cross-device on older kernels, unsupported filesystem: fall through
+    shutil.copyfile(source, target)
+
+WRITERS = {"hardlink": write_hardlink, "reflink": write_reflink, "copy": write_copy}
+
+def methods_to_try(method, source_stat, dest_dir):
+    if method != "auto":
+        return [method]
+    if os.stat(dest_dir).st_dev == source_stat.st_dev:
+        return ["hardlink", "reflink", "copy"]
+    return ["reflink", "copy"]
+
+
+# ============================================
+# SYNC
+# ============================================
+
+def sync_file(source, dest, method, cached):
+    """
+    Make dest a real file with source's content
+    Returns (outcome, cache record or None): outcome is "unchanged", a write
+    method name, "missing" (no source) or "failed: ...".
+    """
+    try:
+        src = os.stat(source)
+    except OSError:
+        return "missing", None
+    try:
+        dst = os.lstat(dest)
+    except FileNotFoundError:
+        dst = None
+
+    if dst is not None and stat.S_ISREG(dst.st_mode):
+        if cached and cached[:DEST_MTIME + 1] == [source, src.st_size, src.st_mtime_ns, dst.st_size, dst.st_mtime_ns]:
+            return "unchanged", cached
+        if (dst.st_dev, dst.st_ino) == (src.st_dev, src.st_ino):
+            return "unchanged", [source, src.st_size, src.st_mtime_ns, dst.st_size, dst.st_mtime_ns, None]
+        if dst.st_size == src.st_size:
+            content_hash = file_hash(source)
+            if file_hash(dest) == content_hash:
+                return "unchanged", [source, src.st_size, src.st_mtime_ns, dst.st_size, dst.st_mtime_ns, content_hash]
+
+    # Write next to the destination and swap it in (replaces symlinks too)
+    tmp_path = f"{dest}.{os.getpid()}.{threading.get_ident()}.tmp"
+    error = None
+    for name in methods_to_try(method, src, os.path.dirname(dest) or "."):
+        try:
+            WRITERS[name](source, tmp_path)
+            os.replace(tmp_path, dest)
+            written = os.lstat(dest)
+            return name, [source, src.st_size, src.st_mtime_ns, written.st_size, written.st_mtime_ns, None]
+        except OSError as e:
+            error = e
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    return f"failed: {error}", None
+
+def lookup_pairs(link_dir, cache, cache_dir):
+    """
+    (source, dest) for every symlink in link_dir, plus files materialized
+    earlier (so changed sources are picked up again)
+    """
+    pairs = []
+    with os.scandir(link_dir) as iterator:
+        for entry in iterator:
+            if entry.is_symlink():
+                pairs.append((link_target(entry.path), entry.path))
+            elif entry.is_file(follow_symlinks=False):
+                record = cache.get(os.path.relpath(entry.path, cache_dir))
+                if record:
+                    pairs.append((record[SOURCE], entry.path))
+    pairs.sort()
+    return pairs
+
+def mirror_pairs(source_dir, dest_dir):
+    """(source, dest) for every file or symlink directly in source_dir"""
+    pairs = []
+    with os.scandir(source_dir) as iterator:
+        for entry in iterator:
+            if entry.is_symlink():
+                pairs.append((link_target(entry.path), os.path.join(dest_dir, entry.name)))
+            elif entry.is_file():
+                pairs.append((os.path.abspath(entry.path), os.path.join(dest_dir, entry.name)))
+    pairs.sort()
+    return pairs
+
+def materialize(pairs, cache_path, method="auto", workers=None):
+    """Sync every (source, dest) pair over a thread pool; returns outcome counts"""
+    cache_dir = os.path.dirname(os.path.abspath(cache_path))
+    cache = load_cache(cache_path)
+    keys = [os.path.relpath(os.path.abspath(dest), cache_dir) for _, dest in pairs]
+    stats = Counter()
+    failures = []
+
+    workers = workers or min(32, (os.cpu_count() or 4) * 4)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda job: sync_file(job[0], job[1], method, cache.get(job[2])),
+                               [(source, dest, key) for (source, dest), key in zip(pairs, keys)])
+        for (source, dest), key, (outcome, record) in zip(pairs, keys, results):
+            if outcome.startswith("failed"):
+                stats["failed"] += 1
+                failures.append((dest, outcome))
+            else:
+                stats[outcome] += 1
+            if record is not None:
+                cache[key] = record
+            else:
+                cache.pop(key, None)
+
+    write_cache(cache_path, cache)
+
+    for dest, outcome in failures[:10]:
+        print(f"  Error with {dest}: {outcome[len('failed: '):]}")
+    return stats
+
+def print_stats(stats, elapsed):
+    written = sum(stats[name] for name in WRITERS)
+    print(f"\nFiles:                {sum(stats.values()):,}")
+    print(f"  unchanged:          {stats['unchanged']:,}")
+    print(f"  written:            {written:,} ({stats['hardlink']:,} hardlinked, "
+          f"{stats['reflink']:,} reflinked, {stats['copy']:,} copied)")
+    print(f"  missing source:     {stats['missing']:,}")
+    print(f"  failed:             {stats['failed']:,}")
+    print(f"Time elapsed:         {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Turn asset symlinks into real files')
+    parser.add_argument('--dir', type=str, default=os.path.join(GODOT_ASSETS_DIR, "lookup"),
+                        help='Directory whose symlinks are replaced in place (default: the lookup directory)')
+    parser.add_argument('--source', type=str, default=None, help='Directory to mirror as real files (with --dest)')
+    parser.add_argument('--dest', type=str, default=None, help='Destination directory for --source')
+    parser.add_argument('--method', choices=METHODS, default="auto",
+                        help='How to write files (default: hardlink, else reflink, else copy)')
+    parser.add_argument('--workers', type=int, default=None, help='Threads (default: 4x CPU count, at most 32)')
+    args = parser.parse_args()
+
+    if (args.source is None) != (args.dest is None):
+        print("Error: --source and --dest go together")
+        sys.exit(1)
+    target_dir = args.dest or args.dir
+    if args.source is not None and not os.path.isdir(args.source):
+        print(f"Error: Source directory not found: {args.source}")
+        sys.exit(1)
+    if args.source is None and not os.path.isdir(args.dir):
+        print(f"Error: Directory not found: {args.dir}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Materializing Assets")
+    print("=" * 60)
+    start_time = time.time()
+    os.makedirs(target_dir, exist_ok=True)
+    cache_path = default_cache_path(target_dir)
+    if args.source is not None:
+        pairs = mirror_pairs(args.source, target_dir)
+    else:
+        pairs = lookup_pairs(target_dir, load_cache(cache_path), os.path.dirname(cache_path))
+    print(f"\n{len(pairs):,} files in {target_dir}")
+    stats = materialize(pairs, cache_path, method=args.method, workers=args.workers)
+    print_stats(stats, time.time() - start_time)
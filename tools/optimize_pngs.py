@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+PNG optimizer for the lookup set
+================================
+JPEXS writes every PNG as full RGBA with default zlib settings, even when
+the image is opaque or only uses a handful of colours. This stage replaces
+the files in the lookup directory with whichever encoding is smallest:
+
+- lossless reductions: opaque RGBA -> RGB, grey -> L/LA, <= 256 colours ->
+  exact palette (with tRNS for alpha)
+- re-filtering: every PNG row filter (None/Sub/Up/Average/Paeth) plus a
+  per-row adaptive choice, computed with NumPy
+- deflate at level 9 with both the default and Z_FILTERED strategies
+- optional palette quantization (--quantize), only kept when the RMS error
+  over alpha-premultiplied RGBA stays under --max-error
+
+The extracted originals stay as they are: a lookup symlink (or a file
+hardlinked to the original) is replaced by a new file, never written
+through, and lookup files sharing one original are optimized once and
+hardlinked to each other. Rewritten files are recorded in
+materialize_cache.json with their original as source, so
+materialize_assets.py and organize_assets_v2.py keep them until the
+original changes.
+
+Files run in a process pool. A per-file before/after line is written to
+png_optimize_report.jsonl and every output content hash is cached in
+png_optimize_cache.json (both next to lookup/), so reruns skip files that
+were already processed. Lookup entries get their new size.
+
+Requires Pillow (pip3 install pillow); NumPy (pip3 install numpy) enables
+the re-filtering and quantization, without it only Pillow's optimizer runs.
+
+USAGE:
+   python3 optimize_pngs.py                     # Lossless recompression of the lookup PNGs
+   python3 optimize_pngs.py --quantize          # Also try 256-colour palettes
+   python3 optimize_pngs.py --max-error 1.0     # Stricter quantization threshold
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from asset_lookup import load_lookup, write_lookup
+from materialize_assets import link_target, load_materialized, record_files
+from swf_reader import PNG_MAGIC, png_chunk
+
+GODOT_ASSETS_DIR = "/Users/pa/PetSocietyMobile/assets/sprites"
+
+REPORT_FILENAME = "png_optimize_report.jsonl"
+CACHE_FILENAME = "png_optimize_cache.json"
+CACHE_VERSION = 2
+
+# Default RMS error (0-255 scale) a quantized palette may introduce
+DEFAULT_MAX_ERROR = 2.0
+
+ZLIB_STRATEGIES = (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED)
+
+# PNG colour types
+COLOR_GRAY, COLOR_RGB, COLOR_INDEXED, COLOR_GRAY_ALPHA, COLOR_RGBA = 0, 2, 3, 4, 6
+
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+# ============================================
+# ENCODING
+# ============================================
+
+def _filter_rows(rows, bpp):
+    """
+    All five PNG filters applied to (height, stride) uint8 rows
+    Returns a (5, height, stride) uint8 array indexed by filter type.
+    """
+    x = rows.astype(np.int16)
+    left = np.zeros_like(x)
+    left[:, bpp:] = x[:, :-bpp]
+    up = np.zeros_like(x)
+    up[1:] = x[:-1]
+    up_left = np.zeros_like(x)
+    up_left[:, bpp:] = up[:, :-bpp]
+
+    p = left + up - up_left
+    pa, pb, pc = np.abs(p - left), np.abs(p - up), np.abs(p - up_left)
+    paeth = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, up_left))
+    average = (left + up) >> 1
+    return (np.stack([x, x - left, x - up, x - average, x - paeth]) & 0xFF).astype(np.uint8)
+
+def _filtered_streams(rows, bpp):
+    """Candidate IDAT payloads (filter byte + row) for each filter choice"""
+    filtered = _filter_rows(rows, bpp)
+    height = rows.shape[0]
+    streams = []
+    for filter_type in range(5):
+        column = np.full((height, 1), filter_type, dtype=np.uint8)
+        streams.append(np.hstack([column, filtered[filter_type]]).tobytes())
+    # Adaptive: per row, the filter with the smallest sum of absolute signed bytes
+    cost = np.abs(filtered.view(np.int8).astype(np.int32)).sum(axis=2)
+    choice = cost.argmin(axis=0)
+    adaptive = filtered[choice, np.arange(height)]
+    streams.append(np.hstack([choice.astype(np.uint8)[:, None], adaptive]).tobytes())
+    return streams
+
+def _deflate_smallest(streams):
+    best = None
+    for stream in streams:
+        for strategy in ZLIB_STRATEGIES:
+            compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+            data = compressor.compress(stream) + compressor.flush()
+            if best is None or len(data) < len(best):
+                best = data
+    return best
+
+def encode_png_smallest(width, height, pixels, color_type, palette=None, transparency=None):
+    """Encode 8-bit pixels trying every filter and deflate strategy; returns PNG bytes"""
+    channels = {COLOR_GRAY: 1, COLOR_RGB: 3, COLOR_INDEXED: 1, COLOR_GRAY_ALPHA: 2, COLOR_RGBA: 4}[color_type]
+    rows = np.ascontiguousarray(pixels, dtype=np.uint8).reshape(height, width * channels)
+    streams = _filtered_streams(rows, channels)
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)
+    chunks = [PNG_MAGIC, png_chunk(b'IHDR', ihdr)]
+    if palette is not None:
+        chunks.append(png_chunk(b'PLTE', palette))
+    if transparency:
+        chunks.append(png_chunk(b'tRNS', transparency))
+    chunks.append(png_chunk(b'IDAT', _deflate_smallest(streams)))
+    chunks.append(png_chunk(b'IEND', b''))
+    return b''.join(chunks)
+
+
+# ============================================
+# REDUCTIONS
+# ============================================
+
+def _exact_palette(rgba):
+    """(indices, palette, transparency) if the image has <= 256 colours, else None"""
+    packed = np.ascontiguousarray(rgba).reshape(-1, 4).view(np.uint32).ravel()
+    colours, indices = np.unique(packed, return_inverse=True)
+    if len(colours) > 256:
+        return None
+    colours = colours.view(np.uint8).reshape(-1, 4)
+    # Opaque colours last so tRNS can stop early
+    order = np.argsort(colours[:, 3] == 255, kind="stable")
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+    colours = colours[order]
+    transparency = bytes(colours[colours[:, 3] < 255, 3])
+    return remap[indices.ravel()].astype(np.uint8), colours[:, :3].tobytes(), transparency
+
+def lossless_candidates(rgba):
+    """(color_type, pixels, palette, transparency) encodings that keep every pixel"""
+    height, width, _ = rgba.shape
+    opaque = bool((rgba[:, :, 3] == 255).all())
+    grey = bool(((rgba[:, :, 0] == rgba[:, :, 1]) & (rgba[:, :, 1] == rgba[:, :, 2])).all())
+
+    candidates = []
+    if grey:
+        candidates.append((COLOR_GRAY, rgba[:, :, 0], None, None) if opaque
+                          else (COLOR_GRAY_ALPHA, rgba[:, :, [0, 3]], None, None))
+    else:
+        candidates.append((COLOR_RGB, rgba[:, :, :3], None, None) if opaque
+                          else (COLOR_RGBA, rgba, None, None))
+    palette = _exact_palette(rgba)
+    if palette is not None:
+        indices, colours, transparency = palette
+        candidates.append((COLOR_INDEXED, indices.reshape(height, width), colours, transparency))
+    return candidates
+
+def quantized_candidate(image, rgba, max_error):
+    """256-colour palette encoding if its premultiplied RMS error is within max_error"""
+    quantized = image.quantize(256, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+    restored = np.asarray(quantized.convert("RGBA"), dtype=np.float32)
+    original = rgba.astype(np.float32)
+    # Compare premultiplied colours, so differences under transparency do not count
+    def premultiply(pixels):
+        return np.concatenate([pixels[:, :, :3] * (pixels[:, :, 3:] / 255.0), pixels[:, :, 3:]], axis=2)
+    error = float(np.sqrt(np.mean((premultiply(restored) - premultiply(original)) ** 2)))
+    if error > max_error:
+        return None, error
+    palette = _exact_palette(np.asarray(quantized.convert("RGBA")))
+    if palette is None:
+        return None, error
+    indices, colours, transparency = palette
+    height, width, _ = rgba.shape
+    return (COLOR_INDEXED, indices.reshape(height, width), colours, transparency), error
+
+
+# ============================================
+# WORKER
+# ============================================
+
+_known_hashes = frozenset()
+
+def _init_worker(known_hashes):
+    global _known_hashes
+    _known_hashes = known_hashes
+
+def write_outputs(data, paths):
+    """
+    Replace paths with new files holding data (hardlinked to each other);
+    os.replace swaps the directory entry, so symlink targets and other
+    links to the old file keep their content
+    """
+    for path in paths:
+        tmp_path = path + ".opt_tmp"
+        try:
+            linked = path != paths[0]
+            if linked:
+                os.link(paths[0], tmp_path)
+        except OSError:
+            linked = False
+        if not linked:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+        os.replace(tmp_path, path)
+
+def optimize_file(job):
+    """
+    Optimize one PNG, writing the result to every lookup path that shares it
+    Returns a report dict: name, path, before, after, mode, error and the
+    content hashes before and after.
+    """
+    name, paths, quantize, max_error = job
+    path = paths[0]
+    with open(path, 'rb') as f:
+        data = f.read()
+    record = {"name": name, "path": path, "before": len(data), "after": len(data),
+              "mode": "unchanged", "error": 0.0, "hash": content_hash(data)}
+    if record["hash"] in _known_hashes:
+        record["mode"] = "cached"
+        return record
+    if not data.startswith(PNG_MAGIC):
+        record["mode"] = "not-png"
+        return record
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            image = img.convert("RGBA")
+    except (OSError, ValueError) as e:
+        record["mode"] = f"unreadable: {e}"
+        return record
+
+    best, best_mode = data, "unchanged"
+    if np is None:
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", optimize=True)
+        if buffer.tell() < len(best):
+            best, best_mode = buffer.getvalue(), "lossless"
+    else:
+        rgba = np.asarray(image)
+        width, height = image.size
+        encodings = [(c, "lossless") for c in lossless_candidates(rgba)]
+        if quantize and encodings[-1][0][0] != COLOR_INDEXED:
+            candidate, error = quantized_candidate(image, rgba, max_error)
+            record["error"] = round(error, 3)
+            if candidate is not None:
+                encodings.append((candidate, "palette"))
+        for (color_type, pixels, palette, transparency), mode in encodings:
+            encoded = encode_png_smallest(width, height, pixels, color_type, palette, transparency)
+            if len(encoded) < len(best):
+                best, best_mode = encoded, mode
+
+    if best is not data:
+        write_outputs(best, paths)
+    record.update(after=len(best), mode=best_mode, optimized_hash=content_hash(best))
+    return record
+
+
+# ============================================
+# STAGE
+# ============================================
+
+def load_cache(path, settings):
+    """Known content hashes, or an empty set if the cache was made with other settings"""
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        cache = json.load(f)
+    if cache.get("version") != CACHE_VERSION or cache.get("settings") != settings:
+        return set()
+    return set(cache["hashes"])
+
+def optimize_lookup(godot_assets_dir, quantize=False, max_error=DEFAULT_MAX_ERROR, workers=None):
+    """Optimize every PNG the lookup points at; returns a stats dict"""
+    asset_lookup = load_lookup(godot_assets_dir)
+    settings = {"quantize": quantize, "max_error": max_error if quantize else None}
+    cache_path = os.path.join(godot_assets_dir, CACHE_FILENAME)
+    known_hashes = frozenset(load_cache(cache_path, settings))
+
+    # One job per distinct file behind the lookup paths (symlinks and hardlinks share one)
+    lookup_dir = os.path.join(godot_assets_dir, "lookup")
+    materialized = load_materialized(lookup_dir)
+    groups, sources = {}, {}
+    for asset_name, entry in sorted(asset_lookup.items()):
+        if entry.get("type") != "png":
+            continue
+        filename = f"{asset_name}.png"
+        path = os.path.join(lookup_dir, filename)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        # The original each lookup file stands for, to record once it is rewritten
+        sources[filename] = link_target(path) if os.path.islink(path) else materialized.get(filename)
+        groups.setdefault((st.st_dev, st.st_ino), (asset_name, []))[1].append(path)
+    jobs = [(asset_name, paths, quantize, max_error) for asset_name, paths in groups.values()]
+
+    stats = {"files": len(jobs), "optimized": 0, "cached": 0, "quantized": 0, "before": 0, "after": 0}
+    hashes = set(known_hashes)
+    sizes = {}
+    rewritten = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(known_hashes,)) as executor, \
+            open(os.path.join(godot_assets_dir, REPORT_FILENAME), 'w') as report:
+        for idx, (job, record) in enumerate(zip(jobs, executor.map(optimize_file, jobs, chunksize=16)), 1):
+            report.write(json.dumps(record, separators=(',', ':')) + "\n")
+            # Only outputs count as done: an original seen again (a restored
+            # symlink) still needs its optimized copy
+            hashes.add(record.get("optimized_hash", record["hash"]))
+            for path in job[1]:
+                sizes[path] = record["after"]
+                filename = os.path.basename(path)
+                if record["after"] < record["before"] and sources.get(filename):
+                    rewritten[filename] = sources[filename]
+            stats["before"] += record["before"]
+            stats["after"] += record["after"]
+            if record["mode"] == "cached":
+                stats["cached"] += 1
+            elif record["after"] < record["before"]:
+                stats["optimized"] += 1
+                stats["quantized"] += record["mode"] == "palette"
+            if idx % 1000 == 0:
+                print(f"  Processed {idx}/{len(jobs)} files...")
+
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"version": CACHE_VERSION, "settings": settings, "hashes": sorted(hashes)}, f,
+                  separators=(',', ':'))
+    os.replace(tmp_path, cache_path)
+    if rewritten:
+        record_files(lookup_dir, rewritten)
+
+    # Keep the lookup's size field in step with the rewritten files
+    for asset_name, entry in asset_lookup.items():
+        if entry.get("type") == "png":
+            path = os.path.join(lookup_dir, f"{asset_name}.png")
+            if path in sizes:
+                entry["size"] = sizes[path]
+    write_lookup(asset_lookup, godot_assets_dir)
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Recompress the PNGs of the asset lookup')
+    parser.add_argument('--assets', type=str, default=GODOT_ASSETS_DIR, help='Godot sprites directory')
+    parser.add_argument('--quantize', action='store_true', help='Also try lossy 256-colour palettes')
+    parser.add_argument('--max-error', type=float, default=DEFAULT_MAX_ERROR,
+                        help=f'Largest RMS error a palette may introduce (default: {DEFAULT_MAX_ERROR})')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    if Image is None:
+        print("Error: Pillow is required (pip3 install pillow)")
+        sys.exit(1)
+    if np is None:
+        print("Warning: NumPy not installed, only Pillow's optimizer will run (pip3 install numpy)")
+        if args.quantize:
+            print("Warning: --quantize needs NumPy and is ignored")
+            args.quantize = False
+    if not os.path.exists(os.path.join(args.assets, "asset_lookup.json")):
+        print(f"Error: No asset_lookup.json in {args.assets} (run organize_assets_v2.py first)")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Optimizing Lookup PNGs")
+    print("=" * 60)
+    start_time = time.time()
+    stats = optimize_lookup(args.assets, quantize=args.quantize, max_error=args.max_error,
+                            workers=args.workers)
+
+    saved = stats["before"] - stats["after"]
+    print(f"\nPNG files:            {stats['files']:,}")
+    print(f"  optimized:          {stats['optimized']:,}")
+    if args.quantize:
+        print(f"  quantized:          {stats['quantized']:,}")
+    print(f"  cached (skipped):   {stats['cached']:,}")
+    print(f"Size:                 {stats['before'] / 2**20:,.1f} MB -> {stats['after'] / 2**20:,.1f} MB "
+          f"({saved / max(1, stats['before']) * 100:.1f}% saved)")
+    print(f"Time elapsed:         {time.time() - start_time:.1f}s")
+    print(f"\nReport: {os.path.join(args.assets, REPORT_FILENAME)}")
@@ -2,14 +2,35 @@
 """
 Organize extracted assets by category for Godot project
 Creates organized structure and mapping files
+
+Uses asset_inventory.jsonl (written by extract_assets.py) when present, so
+the extracted tree is never walked; otherwise falls back to scanning it.
+If perceptual_hash.py has run, near-duplicate images are replaced by the
+highest-resolution member of their cluster; if rasterize_shapes.py has run,
+shape SVGs are replaced by their PNG render.
+
+The SWF file names are random hashes, so categories come from the
+SymbolClass/ExportAssets names and frame labels in swf_symbol_index.json
+(run swf_symbols.py first) as well as the name: every keyword is matched
+as a whole word (camelCase and package names split, plurals allowed) by
+one compiled pattern, and the earliest category in CATEGORIES wins.
 """
 
 import os
 import sys
-import shutil
 import json
+import re
+import time
 from pathlib import Path
-from collections import defaultdict
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from asset_inventory import PATH, SUBDIR, EXT, SIZE, default_inventory_path, load_inventory
+from perceptual_hash import load_phash_index
+from dedup_assets import load_dedup_index
+from rasterize_shapes import load_raster_index, lookup_render
+from swf_symbols import load_symbol_index
+from materialize_assets import default_cache_path, materialize, mirror_pairs, print_stats
 
 # Paths
 EXTRACTED_DIR = "/Users/pa/PetSocietyMobile/assets/sprites/extracted"
@@ -30,12 +51,26 @@ CATEGORIES = {
     "effects": ["effect", "sparkle", "particle", "smoke"]
 }
 
+# Keyword -> rank of its category (CATEGORIES order), and one pattern for all of them
+KEYWORD_RANKS = {}
+for rank, keywords in enumerate(CATEGORIES.values()):
+    for keyword in keywords:
+        KEYWORD_RANKS.setdefault(keyword, rank)
+CATEGORY_NAMES = list(CATEGORIES)
+KEYWORD_PATTERN = re.compile(r"\b(" + "|".join(sorted(KEYWORD_RANKS, key=len, reverse=True)) + r")s?\b")
+
+# Word breaks in symbol names: camelCase, acronyms, digits, punctuation
+WORD_BOUNDARY = re.compile(r"(?<=[a-z])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])|(?<=[A-Za-z])(?=[0-9])|(?<=[0-9])(?=[A-Za-z])|[^A-Za-z0-9]+")
+
+# Subdirectories searched for the best asset, in priority order
+ASSET_PRIORITY = ["images", "sprites", "buttons", "frames", "shapes"]
+
 def find_best_asset_in_dir(asset_dir):
     """Find the best quality asset file in a directory"""
     asset_path = Path(asset_dir)
     
     # Priority order: PNG images > SVG shapes > other
-    for subdir in ["images", "sprites", "buttons", "frames", "shapes"]:
+    for subdir in ASSET_PRIORITY:
         subdir_path = asset_path / subdir
         if subdir_path.exists():
             # Get PNG files first
@@ -58,18 +93,74 @@ def find_best_asset_in_dir(asset_dir):
     
     return None
 
-def categorize_asset(asset_name, asset_dir):
-    """Try to categorize an asset based on filename and content"""
-    asset_name_lower = asset_name.lower()
+def find_best_inventory_entry(entries):
+    """Same selection as find_best_asset_in_dir, from a SWF's inventory entries"""
+    for subdir in ASSET_PRIORITY:
+        # Direct children of the subdir only (like the non-recursive glob)
+        candidates = [e for e in entries if e[SUBDIR] == subdir and e[PATH].count("/") == 1]
+        
+        png_files = [e for e in candidates if e[EXT] == "png"]
+        if png_files:
+            return max(png_files, key=lambda e: e[SIZE])
+        
+        svg_files = [e for e in candidates if e[EXT] == "svg"]
+        if svg_files:
+            return svg_files[0]
+        
+        jpeg_files = [e for e in candidates if e[EXT] in ("jpg", "jpeg")]
+        if jpeg_files:
+            return max(jpeg_files, key=lambda e: e[SIZE])
+    
+    return None
+
+def iter_best_assets(extracted_path):
+    """
+    Yield (asset_name, best_asset, has_images) for every extracted SWF
+    (best_asset is None when the SWF produced nothing usable)
+    """
+    representatives, _ = load_phash_index(extracted_path)
+    raster_scales, raster_shapes = load_raster_index(extracted_path)
+    dedup_index = load_dedup_index(extracted_path) if raster_shapes else {}
     
-    # Check filename patterns
-    for category, keywords in CATEGORIES.items():
-        for keyword in keywords:
-            if keyword in asset_name_lower:
-                return category
+    def representative(best_asset):
+        if best_asset is None:
+            return best_asset
+        rel_path = best_asset.relative_to(extracted_path).as_posix()
+        if best_asset.suffix == ".svg":
+            shape = raster_shapes.get(dedup_index.get(rel_path, rel_path))
+            render = shape and lookup_render(extracted_path, raster_scales, shape)
+            return Path(render[0]) if render else best_asset
+        return extracted_path / representatives.get(rel_path, rel_path)
+    
+    inventory_path = default_inventory_path(extracted_path)
+    if os.path.exists(inventory_path):
+        inventory = load_inventory(inventory_path)
+        print(f"Using inventory {inventory_path}")
+        print(f"Found {len(inventory)} asset directories to organize\n")
+        for asset_name, entries in inventory.items():
+            entry = find_best_inventory_entry(entries)
+            best_asset = extracted_path / asset_name / entry[PATH] if entry else None
+            yield asset_name, representative(best_asset), any(e[SUBDIR] == "images" for e in entries)
+        return
+    
+    asset_dirs = [d for d in extracted_path.iterdir() if d.is_dir()]
+    print(f"Found {len(asset_dirs)} asset directories to organize\n")
+    for asset_dir in asset_dirs:
+        yield asset_dir.name, representative(find_best_asset_in_dir(asset_dir)), (asset_dir / "images").exists()
+
+def name_words(names):
+    """Lowercase words of names ("game.RedSofa2" -> "game red sofa 2")"""
+    return " ".join(WORD_BOUNDARY.sub(" ", name) for name in names).lower()
+
+def categorize_asset(asset_name, has_images, symbols=()):
+    """Try to categorize an asset based on its filename, symbol names and content"""
+    # Check filename and symbol name patterns
+    ranks = [KEYWORD_RANKS[match.group(1)] for match in KEYWORD_PATTERN.finditer(name_words([asset_name, *symbols]))]
+    if ranks:
+        return CATEGORY_NAMES[min(ranks)]
     
     # Check if it's in images/ subdirectory (likely UI or decoration)
-    if (Path(asset_dir) / "images").exists():
+    if has_images:
         return "ui"
     
     # Default to misc
@@ -99,25 +190,19 @@ def organize_assets():
     asset_mapping = {}
     category_counts = defaultdict(int)
     
+    symbol_index = load_symbol_index(extracted_path)
+    if symbol_index:
+        print(f"Using symbol names of {len(symbol_index)} SWFs")
+    
     print(f"\nScanning {EXTRACTED_DIR}...")
     
     # Process each extracted asset directory
-    asset_dirs = [d for d in extracted_path.iterdir() if d.is_dir()]
-    total = len(asset_dirs)
-    
-    print(f"Found {total} asset directories to organize\n")
-    
-    for idx, asset_dir in enumerate(asset_dirs, 1):
-        asset_name = asset_dir.name
-        
-        # Find best asset file
-        best_asset = find_best_asset_in_dir(asset_dir)
-        
+    for idx, (asset_name, best_asset, has_images) in enumerate(iter_best_assets(extracted_path), 1):
         if not best_asset:
             continue
         
         # Categorize
-        category = categorize_asset(asset_name, asset_dir)
+        category = categorize_asset(asset_name, has_images, symbol_index.get(asset_name, ()))
         
         # Copy to organized location
         dest_dir = organized_path / category
@@ -147,7 +232,7 @@ def organize_assets():
             category_counts[category] += 1
             
             if idx % 1000 == 0:
-                print(f"  Processed {idx}/{total} ({idx*100//total}%)...")
+                print(f"  Processed {idx} asset directories...")
                 
         except Exception as e:
             print(f"  Error processing {asset_name}: {e}")
@@ -175,11 +260,16 @@ def organize_assets():
     return True
 
 def copy_to_godot():
-    """Copy organized assets to Godot project structure"""
+    """
+    Copy organized assets to Godot project structure
+    The category symlinks become real files (see materialize_assets.py);
+    files already up to date are skipped.
+    """
     print("\n" + "=" * 60)
     print("Copying Assets to Godot Project")
     print("=" * 60)
     
+    start_time = time.time()
     organized_path = Path(ORGANIZED_DIR)
     godot_assets = Path(GODOT_ASSETS_DIR)
     
@@ -202,8 +292,9 @@ def copy_to_godot():
         "misc": "items"
     }
     
-    # Copy each category
-    for category_dir in organized_path.iterdir():
+    # Materialize each category (real files: hardlink, reflink or copy)
+    stats = Counter()
+    for category_dir in sorted(organized_path.iterdir()):
         if not category_dir.is_dir() or category_dir.name == "misc":
             continue
         
@@ -211,17 +302,10 @@ def copy_to_godot():
         dest_dir = godot_sprites / godot_folder
         dest_dir.mkdir(parents=True, exist_ok=True)
         
-        # Copy all files (follow symlinks)
-        for asset_file in category_dir.iterdir():
-            if asset_file.is_file() or asset_file.is_symlink():
-                dest_file = dest_dir / asset_file.name
-                if not dest_file.exists():
-                    if asset_file.is_symlink():
-                        # Copy the actual file, not the symlink
-                        shutil.copy2(asset_file.readlink() if asset_file.readlink().is_absolute() else asset_file, dest_file)
-                    else:
-                        shutil.copy2(asset_file, dest_file)
+        pairs = mirror_pairs(str(category_dir), str(dest_dir))
+        stats.update(materialize(pairs, default_cache_path(str(dest_dir))))
     
+    print_stats(stats, time.time() - start_time)
     print(f"\nAssets copied to: {godot_sprites}")
     print("Godot project structure ready!")
 
@@ -2,43 +2,262 @@
 """
 Organize extracted assets for Godot project
 Creates a hash-based lookup system compatible with original game
+
+Uses asset_inventory.jsonl (written by extract_assets.py) when present, so
+the extracted tree is never walked; otherwise the directories are scanned
+in batches over a process pool. Entries stream to asset_lookup.json in
+sorted order as their lookup symlinks are made, and symlinks that already
+point at the right file are left alone (as are files materialize_assets.py
+made from the right file).
+If dedup_assets.py has run, lookup entries point at the canonical copy of
+each deduplicated file; if perceptual_hash.py has run, at the
+highest-resolution member of each near-duplicate cluster. If
+image_metadata.py has run, the best image is the one with the most pixels
+(not the most bytes) and entries carry its width, height and channels.
+SWFs with nothing but vector shapes use the PNG renders of
+rasterize_shapes.py.
+With --pack, the file list (and, without image_metadata.py's index, the
+image sizes) come from asset_pack.py's pack, and lookup files are written
+from it as real files instead of symlinks into the extracted tree.
 """
 
+import argparse
 import os
 import sys
 import shutil
-import json
 from pathlib import Path
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from asset_inventory import PATH, SUBDIR, EXT, SIZE, default_inventory_path, load_inventory
+from asset_lookup import LookupWriter
+from asset_pack import AssetPack, default_pack_dir, file_matches
+from dedup_assets import load_dedup_index
+from perceptual_hash import load_phash_index
+from image_metadata import WIDTH, HEIGHT, CHANNELS, OPAQUE_RECT, load_image_metadata
+from rasterize_shapes import load_raster_index, lookup_render
+from materialize_assets import load_materialized
 
 # Paths
 EXTRACTED_DIR = "/Users/pa/PetSocietyMobile/assets/sprites/extracted"
 GODOT_ASSETS_DIR = "/Users/pa/PetSocietyMobile/assets/sprites"
 
-def find_best_asset_file(asset_dir):
+# Subdirectories searched for the best asset, in priority order
+ASSET_PRIORITY = ["images", "sprites", "buttons", "frames"]
+
+# Shape SVGs rendered by rasterize_shapes.py are the last resort
+SHAPES_SUBDIR = "shapes"
+
+# Asset directories per pool task, and tasks queued per worker, when scanning
+EVAL_BATCH_SIZE = 256
+MAX_IN_FLIGHT_PER_WORKER = 4
+
+# Lookup symlinks created per batch before their entries are written
+LINK_BATCH_SIZE = 1024
+
+def scan_asset_dir(asset_dir):
+    """
+    Inventory-style entries ([rel path, subdir, ext, size]) for the direct
+    children of a SWF directory's priority subdirs, one os.scandir per subdir
+    """
+    entries = []
+    for subdir in ASSET_PRIORITY:
+        try:
+            iterator = os.scandir(os.path.join(asset_dir, subdir))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with iterator:
+            for entry in iterator:
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                ext = os.path.splitext(entry.name)[1][1:].lower()
+                if ext in ("png", "jpg", "jpeg"):
+                    entries.append([f"{subdir}/{entry.name}", subdir, ext, entry.stat().st_size])
+    entries.sort()
+    return entries
+
+def find_best_asset_file(asset_dir, areas=None):
     """Find the best quality PNG/JPEG asset file in a directory"""
-    asset_path = Path(asset_dir)
-    
-    # Priority: images/ > sprites/ > buttons/ > frames/
-    for subdir in ["images", "sprites", "buttons", "frames"]:
-        subdir_path = asset_path / subdir
-        if subdir_path.exists():
-            # Get PNG files first
-            png_files = list(subdir_path.glob("*.png"))
-            if png_files:
-                # Prefer largest file (better quality)
-                png_files.sort(key=lambda x: x.stat().st_size, reverse=True)
-                return png_files[0], "png"
-            
-            # Then JPEG
-            jpeg_files = list(subdir_path.glob("*.jpg")) + list(subdir_path.glob("*.jpeg"))
-            if jpeg_files:
-                jpeg_files.sort(key=lambda x: x.stat().st_size, reverse=True)
-                return jpeg_files[0], "jpg"
+    entry, file_type = find_best_inventory_entry(scan_asset_dir(asset_dir), areas)
+    if entry is None:
+        return None, None
+    return Path(asset_dir) / entry[PATH], file_type
+
+def evaluate_asset_dirs(extracted_dir, names, areas_by_name, shapes_by_name):
+    """Pool worker: (name, best inventory entry or None, file type) for a batch of SWF dirs"""
+    results = []
+    for name in names:
+        entries = scan_asset_dir(os.path.join(extracted_dir, name)) + shapes_by_name.get(name, [])
+        entry, file_type = find_best_inventory_entry(entries, areas_by_name.get(name))
+        results.append((name, entry, file_type))
+    return results
+
+def find_best_inventory_entry(entries, areas=None):
+    """
+    Same selection as find_best_asset_file, from a SWF's inventory entries
+    areas maps entry paths to pixel areas (from image_metadata.py); the
+    largest image wins, then the largest file. Without it, the largest file.
+    Rendered shapes appear as PNG entries in shapes/ (see shape_entries).
+    """
+    areas = areas or {}
+    rank = lambda e: (areas.get(e[PATH], 0), e[SIZE])
+    for subdir in ASSET_PRIORITY + [SHAPES_SUBDIR]:
+        # Direct children of the subdir only (like the non-recursive glob)
+        candidates = [e for e in entries if e[SUBDIR] == subdir and e[PATH].count("/") == 1]
+        
+        png_files = [e for e in candidates if e[EXT] == "png"]
+        if png_files:
+            # Prefer most pixels, then largest file (better quality)
+            return max(png_files, key=rank), "png"
+        
+        jpeg_files = [e for e in candidates if e[EXT] in ("jpg", "jpeg")]
+        if jpeg_files:
+            return max(jpeg_files, key=rank), "jpg"
     
     return None, None
 
-def create_asset_lookup():
+def evaluate_in_pool(extracted_path, names, areas_by_name, shapes_by_name, workers=None):
+    """
+    Yield evaluate_asset_dirs results for names, in order
+    Batches go to a process pool with at most MAX_IN_FLIGHT_PER_WORKER
+    batches per worker outstanding, so memory stays flat on any tree size.
+    """
+    workers = workers or os.cpu_count() or 4
+    batches = [names[i:i + EVAL_BATCH_SIZE] for i in range(0, len(names), EVAL_BATCH_SIZE)]
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for batch in batches:
+            if len(pending) >= workers * MAX_IN_FLIGHT_PER_WORKER:
+                yield from pending.popleft().result()
+            batch_areas = {name: areas_by_name[name] for name in batch if name in areas_by_name}
+            batch_shapes = {name: shapes_by_name[name] for name in batch if name in shapes_by_name}
+            pending.append(executor.submit(evaluate_asset_dirs, str(extracted_path), batch, batch_areas, batch_shapes))
+        while pending:
+            yield from pending.popleft().result()
+
+def iter_best_assets(extracted_path, workers=None, pack=None):
+    """
+    Yield (asset_name, best_file, file_type, size, metadata) for every
+    extracted SWF, in sorted name order (best_file is None when the SWF
+    produced no usable image; metadata holds the lookup fields from
+    image_metadata.py, if it has run)
+    Files deduplicated by dedup_assets.py resolve to their canonical copy, and
+    near-duplicates clustered by perceptual_hash.py to the highest-resolution
+    member of their cluster. Shape SVGs rendered by rasterize_shapes.py
+    resolve to their lookup-scale PNG. With a pack (AssetPack), its index
+    replaces the inventory.
+    """
+    dedup_index = load_dedup_index(extracted_path)
+    representatives, representative_info = load_phash_index(extracted_path)
+    image_metadata = load_image_metadata(extracted_path)
+    if pack is not None and not image_metadata:
+        # Header sizes recorded when the files were packed
+        image_metadata = {f"{asset_name}/{rel_path}": [entry.length, entry.width, entry.height, entry.channels, None]
+                          for asset_name, rel_path, entry in pack.records() if entry.width}
+    raster_scales, raster_shapes = load_raster_index(extracted_path)
+    
+    # SWF name -> {path within the SWF dir: pixel area}, duplicates via their canonical file
+    areas_by_name = defaultdict(dict)
+    for rel_path, canonical in [(p, p) for p in image_metadata] + list(dedup_index.items()):
+        record = image_metadata.get(canonical)
+        if record:
+            asset_name, _, entry_path = rel_path.partition("/")
+            areas_by_name[asset_name][entry_path] = record[WIDTH] * record[HEIGHT]
+    
+    # SWF name -> PNG entries standing in for its rendered shape SVGs
+    shapes_by_name = defaultdict(list)
+    for rel_path, canonical in [(p, p) for p in raster_shapes] + list(dedup_index.items()):
+        shape = raster_shapes.get(canonical)
+        render = shape and lookup_render(extracted_path, raster_scales, shape)
+        if render:
+            asset_name, _, entry_path = rel_path.partition("/")
+            _, width, height, png_size = render
+            shapes_by_name[asset_name].append([entry_path, SHAPES_SUBDIR, "png", png_size])
+            areas_by_name[asset_name][entry_path] = width * height
+    
+    def resolve(asset_name, entry, file_type):
+        if entry is None:
+            return asset_name, None, None, 0, {}
+        size = entry[SIZE]
+        rel_path = f"{asset_name}/{entry[PATH]}"
+        rel_path = dedup_index.get(rel_path, rel_path)
+        if entry[SUBDIR] == SHAPES_SUBDIR and rel_path.endswith(".svg"):
+            png_path, width, height, png_size = lookup_render(extracted_path, raster_scales, raster_shapes[rel_path])
+            return asset_name, Path(png_path), "png", png_size, {"width": width, "height": height, "channels": 4}
+        if rel_path in representatives:
+            rel_path = representatives[rel_path]
+            file_type = "png" if rel_path.endswith(".png") else "jpg"
+            size = representative_info[rel_path][2]
+        metadata = {}
+        record = image_metadata.get(rel_path)
+        if record:
+            metadata = {"width": record[WIDTH], "height": record[HEIGHT], "channels": record[CHANNELS]}
+            if record[OPAQUE_RECT] is not None:
+                metadata["opaque_rect"] = record[OPAQUE_RECT]
+        return asset_name, extracted_path / rel_path, file_type, size, metadata
+    
+    inventory_path = default_inventory_path(extracted_path)
+    if pack is not None or os.path.exists(inventory_path):
+        if pack is not None:
+            inventory = pack.inventory()
+            print(f"\nUsing asset pack {pack.pack_dir}")
+        else:
+            inventory = load_inventory(inventory_path)
+            print(f"\nUsing inventory {inventory_path}")
+        print(f"Scanning {len(inventory)} asset directories...\n")
+        for asset_name in sorted(inventory):
+            entries = inventory[asset_name] + shapes_by_name.get(asset_name, [])
+            yield resolve(asset_name, *find_best_inventory_entry(entries, areas_by_name.get(asset_name)))
+        return
+    
+    names = sorted(entry.name for entry in os.scandir(extracted_path) if entry.is_dir())
+    print(f"\nScanning {len(names)} asset directories...\n")
+    for asset_name, entry, file_type in evaluate_in_pool(extracted_path, names, areas_by_name, shapes_by_name, workers):
+        yield resolve(asset_name, entry, file_type)
+
+def existing_links(lookup_dir):
+    """Symlink name -> target for everything already in the lookup directory"""
+    links = {}
+    with os.scandir(lookup_dir) as iterator:
+        for entry in iterator:
+            links[entry.name] = os.readlink(entry.path) if entry.is_symlink() else None
+    return links
+
+def link_batch(lookup_dir, batch, links, materialized, pack=None):
+    """
+    Create the symlinks of a batch of (asset_name, link_name, target, entry,
+    packed); packed is (SWF name, path) of a file to write from the pack
+    instead. Links already pointing at their target, and real files
+    materialized from it (or with the packed content), are left alone.
+    Returns the (asset_name, entry) pairs whose link is in place.
+    """
+    linked = []
+    for asset_name, link_name, target, entry, packed in batch:
+        link_path = os.path.join(lookup_dir, link_name)
+        try:
+            current = links.get(link_name, False)
+            if packed is not None:
+                if current is not None or not file_matches(link_path, pack.find(*packed)):
+                    pack.extract(*packed, link_path)
+                    links[link_name] = None
+                linked.append((asset_name, entry))
+                continue
+            if current is None and materialized.get(link_name) == os.path.normpath(os.path.join(lookup_dir, target)):
+                current = target
+                # The kept file may have been rewritten since (optimize_pngs.py)
+                entry["size"] = os.path.getsize(link_path)
+            if current != target:
+                if link_name in links:
+                    os.remove(link_path)
+                os.symlink(target, link_path)
+                links[link_name] = target
+            linked.append((asset_name, entry))
+        except OSError as e:
+            print(f"  Error with {asset_name}: {e}")
+    return linked
+
+def create_asset_lookup(workers=None, pack=None):
     """Create a lookup system for assets by SWF filename"""
     print("=" * 70)
     print("Creating Asset Lookup System for Godot")
@@ -55,8 +274,11 @@ def create_asset_lookup():
     categories_dir = godot_assets / "categorized"
     categories_dir.mkdir(parents=True, exist_ok=True)
     
-    # Asset lookup: filename -> best asset path
-    asset_lookup = {}
+    # Entries stream to asset_lookup.json as their symlink batches complete
+    writer = LookupWriter(str(godot_assets))
+    links = existing_links(lookup_dir)
+    materialized = load_materialized(str(lookup_dir))
+    batch = []
     stats = {
         "total": 0,
         "with_png": 0,
@@ -64,18 +286,14 @@ def create_asset_lookup():
         "no_assets": 0
     }
     
-    print(f"\nScanning {len(list(extracted_path.iterdir()))} asset directories...\n")
+    def flush():
+        for asset_name, entry in link_batch(str(lookup_dir), batch, links, materialized, pack):
+            writer.add(asset_name, entry)
+        batch.clear()
     
-    asset_dirs = sorted([d for d in extracted_path.iterdir() if d.is_dir()])
-    total = len(asset_dirs)
-    
-    for idx, asset_dir in enumerate(asset_dirs, 1):
-        asset_name = asset_dir.name
+    for idx, (asset_name, best_file, file_type, size, metadata) in enumerate(iter_best_assets(extracted_path, workers, pack), 1):
         stats["total"] += 1
         
-        # Find best asset
-        best_file, file_type = find_best_asset_file(asset_dir)
-        
         if not best_file:
             stats["no_assets"] += 1
             continue
@@ -85,37 +303,29 @@ def create_asset_lookup():
         elif file_type == "jpg":
             stats["with_jpg"] += 1
         
-        # Create symlink in lookup directory (organized by filename)
-        lookup_file = lookup_dir / f"{asset_name}.{file_type}"
-        
-        try:
-            # Remove old symlink if exists
-            if lookup_file.exists() or lookup_file.is_symlink():
-                lookup_file.unlink()
-            
-            # Create symlink to original file
-            lookup_file.symlink_to(os.path.relpath(best_file, lookup_file.parent))
-            
-            # Store in lookup
-            asset_lookup[asset_name] = {
-                "path": f"res://assets/sprites/lookup/{asset_name}.{file_type}",
-                "original_path": str(best_file),
-                "type": file_type,
-                "size": best_file.stat().st_size
-            }
-            
-        except Exception as e:
-            print(f"  Error with {asset_name}: {e}")
-            continue
+        # Symlink in lookup directory (organized by filename) to the original file
+        link_name = f"{asset_name}.{file_type}"
+        packed = None
+        if pack is not None and best_file.is_relative_to(extracted_path):
+            source_name, _, rel_path = best_file.relative_to(extracted_path).as_posix().partition("/")
+            packed = (source_name, rel_path) if pack.find(source_name, rel_path) else None
+        batch.append((asset_name, link_name, os.path.relpath(best_file, lookup_dir), {
+            "path": f"res://assets/sprites/lookup/{link_name}",
+            "original_path": str(best_file),
+            "type": file_type,
+            "size": size,
+            **metadata
+        }, packed))
+        if len(batch) >= LINK_BATCH_SIZE:
+            flush()
         
         # Progress update
         if idx % 2500 == 0:
-            print(f"  Processed {idx}/{total} ({idx*100//total}%)...")
+            print(f"  Processed {idx} asset directories...")
+    flush()
     
-    # Save lookup JSON
-    lookup_json = godot_assets / "asset_lookup.json"
-    with open(lookup_json, 'w') as f:
-        json.dump(asset_lookup, f, indent=2)
+    # Finish the lookup JSON and write the sharded runtime lookup AssetLoader reads
+    lookup_json, shard_dir, shard_count = writer.close()
     
     # Print summary
     print(f"\n{'=' * 70}")
@@ -126,13 +336,27 @@ def create_asset_lookup():
     print(f"Assets with PNG files:   {stats['with_png']}")
     print(f"Assets with JPEG files:  {stats['with_jpg']}")
     print(f"Assets with no images:   {stats['no_assets']}")
-    print(f"Total usable assets:     {stats['with_png'] + stats['with_jpg']}")
+    print(f"Total usable assets:     {writer.count}")
     print(f"\nLookup file: {lookup_json}")
+    print(f"Runtime shards: {shard_count} in {shard_dir}")
     print(f"Lookup directory: {lookup_dir}")
     print(f"\n✅ Asset lookup system ready for Godot!")
     
     return True
 
 if __name__ == "__main__":
-    create_asset_lookup()
-
+    parser = argparse.ArgumentParser(description='Create the asset lookup for Godot')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Processes evaluating asset directories when there is no inventory (default: CPU count)')
+    parser.add_argument('--pack', type=str, nargs='?', const=default_pack_dir(EXTRACTED_DIR), default=None,
+                        help='Read from an asset pack (default: asset_pack next to the extracted dir)')
+    args = parser.parse_args()
+    
+    if args.pack is None:
+        create_asset_lookup(workers=args.workers)
+    else:
+        if not os.path.exists(os.path.join(args.pack, "index.bin")):
+            print(f"Error: No asset pack in {args.pack} (run asset_pack.py first)")
+            sys.exit(1)
+        with AssetPack(args.pack) as pack:
+            create_asset_lookup(workers=args.workers, pack=pack)
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Perceptual near-duplicate clustering
+====================================
+Many SWFs carry the same picture at several scales, or with tiny
+differences (re-encoded JPEGs, a one-pixel border). Byte-level dedup
+(dedup_assets.py) cannot see these, so the organize scripts end up picking
+whichever copy happens to have the most bytes.
+
+This stage hashes every candidate image (the PNG/JPEG files the organize
+scripts choose from) with two 64-bit perceptual hashes:
+
+- dHash: horizontal gradient signs of a 9x8 area-averaged thumbnail (steps
+  under DHASH_MIN_STEP count as flat, so resampling noise in flat-coloured
+  art does not flip bits)
+- pHash: signs of the 8x8 lowest AC coefficients (the DC term left out) of
+  a 32x32 thumbnail's DCT against their median
+
+Both hashes only see luma, so each image also gets a colour layout: the
+mean RGB of a 4x4 grid over the thumbnail. Images are trimmed to the
+bounding box of their (at least half) opaque pixels before downsampling,
+so a copy at another scale or with a different transparent margin gives
+the same thumbnails.
+
+Thumbnails are made by Pillow in a process pool and alpha-composited onto
+white; hashing is vectorized with NumPy over whole chunks. Candidate
+matches (within RADIUS bits on both hashes) come from a multi-index hash
+table: each hash is split into RADIUS+1 chunks, so a match shares at least
+one pHash chunk and one dHash chunk exactly, and only images sharing such
+a chunk pair are ever compared. Clusters are then grown from the best
+image down (highest resolution, then larger file): an image not yet in a
+cluster becomes a representative and takes every free match whose colour
+layout is within COLOUR_TOLERANCE of its own. Members are only ever
+compared with their representative, so clusters do not chain. The result
+goes to asset_phash_index.json next to the extracted dir. The organize
+scripts substitute representatives for the files they pick.
+
+Requires NumPy and Pillow (pip3 install numpy pillow).
+
+USAGE:
+   python3 perceptual_hash.py                # Hash all candidates and write the index
+   python3 perceptual_hash.py --radius 6     # Looser matching (bits, default 4)
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from asset_inventory import PATH, SUBDIR, EXT, SIZE, load_or_scan_inventory
+from dedup_assets import load_dedup_index
+
+EXTRACTED_DIR = "/Users/pa/PetSocietyMobile/assets/sprites/extracted"
+
+PHASH_INDEX_FILENAME = "asset_phash_index.json"
+PHASH_INDEX_VERSION = 1
+
+# Subdirectories and extensions the organize scripts choose from
+CANDIDATE_SUBDIRS = {"images", "sprites", "buttons", "frames"}
+CANDIDATE_EXTENSIONS = {"png", "jpg", "jpeg"}
+
+# Maximum Hamming distance (on both hashes) for two images to match
+DEFAULT_RADIUS = 4
+
+# Maximum RMS difference (0-255) of the colour layouts of two matching images
+COLOUR_TOLERANCE = 16.0
+COLOUR_GRID = 4
+
+# Alpha from which a pixel counts towards the trimmed bounding box
+TRIM_ALPHA = 128
+
+# Images per worker task
+CHUNK_SIZE = 256
+
+DHASH_SIZE = (9, 8)
+DHASH_MIN_STEP = 4.0
+PHASH_SIZE = 32
+PHASH_LOW = 8
+
+
+def default_phash_index_path(extracted_dir):
+    """The index lives next to (not inside) the extracted dir"""
+    return os.path.join(os.path.dirname(os.path.abspath(extracted_dir)), PHASH_INDEX_FILENAME)
+
+def load_phash_index(extracted_dir):
+    """
+    (representatives, images) from the index, or ({}, {}) if there is none
+    representatives maps a member's relative path to its cluster
+    representative; images maps a representative to [width, height, size].
+    """
+    path = default_phash_index_path(extracted_dir)
+    if not os.path.exists(path):
+        return {}, {}
+    with open(path) as f:
+        index = json.load(f)
+    return index["representatives"], index["images"]
+
+
+# ============================================
+# THUMBNAILS (worker processes)
+# ============================================
+
+def make_thumbnails(paths):
+    """
+    Decode, trim to the alpha bounding box and downsample a chunk of images
+    Returns (indices of decodable images, [(width, height)], 32x32 RGBA stack,
+    9x8 RGBA stack).
+    """
+    ok, dims, large, small = [], [], [], []
+    for i, path in enumerate(paths):
+        try:
+            with Image.open(path) as img:
+                width, height = img.size
+                img.draft("RGB", (PHASH_SIZE * 2, PHASH_SIZE * 2))  # JPEG DCT scaling
+                rgba = img.convert("RGBA")
+            # Edge pixels under half coverage (antialiasing, resampling ringing) do not count
+            bbox = rgba.getchannel("A").point(lambda a: 255 if a >= TRIM_ALPHA else 0).getbbox()
+            if bbox:
+                rgba = rgba.crop(bbox)
+            # Pillow resizes RGBA premultiplied, so edges do not pick up hidden colour
+            large.append(np.asarray(rgba.resize((PHASH_SIZE, PHASH_SIZE), Image.BOX)))
+            small.append(np.asarray(rgba.resize(DHASH_SIZE, Image.BOX)))
+        except (OSError, ValueError, Image.DecompressionBombError):
+            continue
+        ok.append(i)
+        dims.append((width, height))
+    if not ok:
+        return ok, dims, None, None
+    return ok, dims, np.stack(large), np.stack(small)
+
+
+# ============================================
+# HASHING (vectorized)
+# ============================================
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix.astype(np.float32)
+
+def _luminance(rgba):
+    """Alpha-composite an (n, h, w, 4) uint8 stack onto white, as float32 luma"""
+    rgba = rgba.astype(np.float32)
+    luma = rgba[..., 0] * 0.299 + rgba[..., 1] * 0.587 + rgba[..., 2] * 0.114
+    alpha = rgba[..., 3] / 255.0
+    return luma * alpha + 255.0 * (1.0 - alpha)
+
+def _pack_bits(bits):
+    """(n, 64) booleans -> (n,) uint64"""
+    return np.packbits(bits, axis=1).view(">u8").ravel().astype(np.uint64)
+
+def hash_thumbnails(large, small):
+    """
+    dHash and pHash for stacks of thumbnails
+    Returns (phash, dhash, colours, flat): colours is the (n, 48) colour
+    layout and flat marks images with no detail (blank or single-colour),
+    whose hashes mean nothing.
+    """
+    small_luma = _luminance(small)
+    steps = small_luma[:, :, 1:] - small_luma[:, :, :-1]
+    dhash = _pack_bits((steps > DHASH_MIN_STEP).reshape(len(small), -1))
+
+    large_luma = _luminance(large)
+    dct = _dct_matrix(PHASH_SIZE)
+    # Skip row and column 0: the DC term only carries overall brightness
+    coeffs = (dct @ large_luma @ dct.T)[:, 1:PHASH_LOW + 1, 1:PHASH_LOW + 1].reshape(len(large), -1)
+    median = np.median(coeffs, axis=1, keepdims=True)
+    phash = _pack_bits(coeffs > median)
+
+    flat = np.ptp(large_luma.reshape(len(large), -1), axis=1) < 1.0
+    return phash, dhash, colour_layout(large), flat
+
+def colour_layout(rgba):
+    """Mean RGB (composited onto white) of a COLOUR_GRID square grid, as (n, grid * grid * 3)"""
+    pixels = rgba.astype(np.float32)
+    alpha = pixels[..., 3:] / 255.0
+    rgb = pixels[..., :3] * alpha + 255.0 * (1.0 - alpha)
+    n, height, width, _ = rgb.shape
+    cells = rgb.reshape(n, COLOUR_GRID, height // COLOUR_GRID, COLOUR_GRID, width // COLOUR_GRID, 3)
+    return cells.mean(axis=(2, 4)).reshape(n, -1)
+
+_POPCOUNT8 = None
+
+def popcount64(values):
+    """Set bits per element of a uint64 array"""
+    global _POPCOUNT8
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    if _POPCOUNT8 is None:
+        _POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    return _POPCOUNT8[values.view(np.uint8).reshape(-1, 8)].sum(axis=1)
+
+
+# ============================================
+# CLUSTERING
+# ============================================
+
+def _chunk_masks(radius):
+    """(shift, mask) for splitting 64 bits into radius + 1 chunks"""
+    count = radius + 1
+    widths = [64 // count + (1 if i < 64 % count else 0) for i in range(count)]
+    masks, shift = [], 0
+    for width in widths:
+        masks.append((np.uint64(shift), np.uint64((1 << width) - 1)))
+        shift += width
+    return masks
+
+def close_key_pairs(unique_p, unique_d, radius):
+    """
+    (a, b) index pairs of distinct hash keys within radius bits on both hashes
+    Uses multi-index tables keyed on one pHash chunk and one dHash chunk
+    (pigeonhole on radius + 1 chunks each), so only keys sharing both
+    chunk values are ever compared.
+    """
+    pairs = set()
+    chunks = _chunk_masks(radius)
+    tables = [(p_chunk, d_chunk) for p_chunk in chunks for d_chunk in chunks]
+    for (p_shift, p_mask), (d_shift, d_mask) in tables:
+        p_values = (unique_p >> p_shift) & p_mask
+        d_values = (unique_d >> d_shift) & d_mask
+        order = np.lexsort((d_values, p_values))
+        sorted_p, sorted_d = p_values[order], d_values[order]
+        # Compare every sorted position with the one `offset` places later;
+        # positions drop out once they reach the end of their bucket
+        positions = np.arange(len(order) - 1)
+        offset = 1
+        while True:
+            positions = positions[positions + offset < len(order)]
+            positions = positions[(sorted_p[positions] == sorted_p[positions + offset])
+                                  & (sorted_d[positions] == sorted_d[positions + offset])]
+            if not len(positions):
+                break
+            first, second = order[positions], order[positions + offset]
+            close = ((popcount64(unique_p[first] ^ unique_p[second]) <= radius)
+                     & (popcount64(unique_d[first] ^ unique_d[second]) <= radius))
+            pairs.update(zip(first[close].tolist(), second[close].tolist()))
+            offset += 1
+    return pairs
+
+def cluster_hashes(phash, dhash, colours, radius, priority):
+    """
+    Representative (image index) per image, itself if it is one
+    Images are taken in priority order (best first); each one not yet in a
+    cluster becomes a representative and takes every image still free that
+    is within radius bits of it on both hashes and within COLOUR_TOLERANCE
+    of its colour layout. Members are never compared with each other.
+    """
+    keys, inverse = np.unique(np.stack([phash, dhash], axis=1), axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    images_by_key = defaultdict(list)
+    for image, key in enumerate(inverse.tolist()):
+        images_by_key[key].append(image)
+    near_keys = [[key] for key in range(len(keys))]
+    for a, b in close_key_pairs(keys[:, 0].copy(), keys[:, 1].copy(), radius):
+        near_keys[a].append(b)
+        near_keys[b].append(a)
+
+    representative = np.full(len(phash), -1, dtype=np.int64)
+    for image in priority:
+        if representative[image] >= 0:
+            continue
+        representative[image] = image
+        matches = [other for key in near_keys[inverse[image]] for other in images_by_key[key]
+                   if representative[other] < 0]
+        if not matches:
+            continue
+        matches = np.array(matches)
+        distance = np.sqrt(np.mean((colours[matches] - colours[image]) ** 2, axis=1))
+        representative[matches[distance <= COLOUR_TOLERANCE]] = image
+    return representative
+
+
+# ============================================
+# INDEX
+# ============================================
+
+def list_candidates(extracted_dir):
+    """(relative path, size) of every image the organize scripts could pick"""
+    inventory = load_or_scan_inventory(extracted_dir)
+    duplicates = load_dedup_index(extracted_dir)
+    candidates = []
+    for name, entries in inventory.items():
+        for entry in entries:
+            if (entry[SUBDIR] in CANDIDATE_SUBDIRS and entry[EXT] in CANDIDATE_EXTENSIONS
+                    and entry[PATH].count("/") == 1):
+                rel_path = f"{name}/{entry[PATH]}"
+                # Byte-identical copies resolve to their canonical file anyway
+                if rel_path not in duplicates:
+                    candidates.append((rel_path, entry[SIZE]))
+    candidates.sort()
+    return candidates
+
+def build_phash_index(extracted_dir, index_path, radius=DEFAULT_RADIUS, workers=None):
+    """Hash and cluster all candidates, write the index; returns a stats dict"""
+    candidates = list_candidates(extracted_dir)
+    paths = [os.path.join(extracted_dir, rel_path) for rel_path, _ in candidates]
+    chunks = [paths[i:i + CHUNK_SIZE] for i in range(0, len(paths), CHUNK_SIZE)]
+
+    hashed, dims, phashes, dhashes, colours = [], [], [], [], []
+    stats = {"candidates": len(candidates), "unreadable": 0, "flat": 0}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_start, (ok, chunk_dims, large, small) in zip(
+                range(0, len(paths), CHUNK_SIZE), executor.map(make_thumbnails, chunks)):
+            stats["unreadable"] += len(chunks[chunk_start // CHUNK_SIZE]) - len(ok)
+            if not ok:
+                continue
+            phash, dhash, layout, flat = hash_thumbnails(large, small)
+            stats["flat"] += int(flat.sum())
+            for i, dim, p, d, c, is_flat in zip(ok, chunk_dims, phash, dhash, layout, flat):
+                if not is_flat:
+                    hashed.append(chunk_start + i)
+                    dims.append(dim)
+                    phashes.append(p)
+                    dhashes.append(d)
+                    colours.append(c)
+
+    clusters = defaultdict(list)
+    if hashed:
+        # Highest resolution first, then larger file, then path order
+        priority = sorted(range(len(hashed)),
+                          key=lambda m: (-dims[m][0] * dims[m][1], -candidates[hashed[m]][1], hashed[m]))
+        labels = cluster_hashes(np.array(phashes, dtype=np.uint64), np.array(dhashes, dtype=np.uint64),
+                                np.array(colours, dtype=np.float32), radius, priority)
+        for position, label in enumerate(labels.tolist()):
+            clusters[label].append(position)
+
+    representatives, images = {}, {}
+    stats["clusters"] = 0
+    for best, members in clusters.items():
+        if len(members) < 2:
+            continue
+        stats["clusters"] += 1
+        rep_path, rep_size = candidates[hashed[best]]
+        images[rep_path] = [dims[best][0], dims[best][1], rep_size]
+        for member in members:
+            if member != best:
+                representatives[candidates[hashed[member]][0]] = rep_path
+    stats["replaced"] = len(representatives)
+
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"version": PHASH_INDEX_VERSION, "radius": radius,
+                   "representatives": representatives, "images": images}, f, separators=(',', ':'))
+    os.replace(tmp_path, index_path)
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Cluster near-duplicate extracted images by perceptual hash')
+    parser.add_argument('--output', type=str, default=EXTRACTED_DIR, help='Extracted asset directory')
+    parser.add_argument('--radius', type=int, default=DEFAULT_RADIUS,
+                        help=f'Maximum Hamming distance in bits (default: {DEFAULT_RADIUS})')
+    parser.add_argument('--workers', type=int, default=None, help='Decoder processes (default: CPU count)')
+    args = parser.parse_args()
+
+    if np is None or Image is None:
+        print("Error: NumPy and Pillow are required (pip3 install numpy pillow)")
+        sys.exit(1)
+    if not os.path.isdir(args.output):
+        print(f"Error: Extracted directory not found: {args.output}")
+        sys.exit(1)
+    if not 0 <= args.radius <= 15:
+        print("Error: --radius must be between 0 and 15")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Clustering Near-Duplicate Images")
+    print("=" * 60)
+    start_time = time.time()
+    index_path = default_phash_index_path(args.output)
+    stats = build_phash_index(args.output, index_path, radius=args.radius, workers=args.workers)
+
+    print(f"\nCandidates:           {stats['candidates']:,}")
+    print(f"  unreadable:         {stats['unreadable']:,}")
+    print(f"  blank/flat:         {stats['flat']:,}")
+    print(f"Clusters (2+ images): {stats['clusters']:,}")
+    print(f"Images replaced:      {stats['replaced']:,}")
+    print(f"Time elapsed:         {time.time() - start_time:.1f}s")
+    print(f"\nIndex: {index_path}")
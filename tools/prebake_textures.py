@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Pre-bake Godot texture imports
+==============================
+A fresh clone (or CI runner) has no .godot/imported/ cache, so opening the
+project makes the editor re-import all ~25k lookup textures. This tool does
+that work offline: for every PNG/JPEG under the given directories it writes
+
+- .godot/imported/<file>-<md5 of res path>.ctex   the CompressedTexture2D
+- .godot/imported/<file>-<md5 of res path>.md5    source/dest md5s
+- <file>.import                                   the sidecar (kept if current)
+
+exactly as Godot's texture importer does for lossless textures
+(compress/mode=0), so the editor's reimport check finds them up to date.
+Existing .import params and uids are honoured; new sidecars get Godot's
+default params and a uid derived from the res:// path, so reruns and other
+machines produce the same one.
+
+Only lossless, non-mipmapped, unresized imports are baked; files whose
+params ask for anything else (VRAM compression, mipmaps, size limits,
+channel remaps) are left for the editor. Payloads are stored as PNG (the
+format Godot uses when rendering/textures/lossless_compression/force_png is
+set). Work runs in a process pool, and files whose .md5 record still matches
+the source and the .ctex are skipped.
+
+Requires Pillow and NumPy (pip3 install pillow numpy).
+
+USAGE:
+   python3 prebake_textures.py                            # Bake assets/sprites/lookup
+   python3 prebake_textures.py assets/sprites/thumbnails  # Bake other directories
+   python3 prebake_textures.py --force                    # Rebake everything
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import re
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+PROJECT_DIR = "/Users/pa/PetSocietyMobile"
+DEFAULT_DIRS = ["assets/sprites/lookup"]
+
+IMPORTED_DIR = ".godot/imported"
+TEXTURE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+# CompressedTexture2D (.ctex) layout, see scene/resources/compressed_texture.h
+CTEX_MAGIC = b"GST2"
+CTEX_FORMAT_VERSION = 1
+CTEX_DATA_FORMAT_PNG = 1
+FORMAT_BIT_STREAM = 1 << 22
+FORMAT_BIT_HAS_MIPMAPS = 1 << 23
+FORMAT_BIT_DETECT_3D = 1 << 24
+
+# Image::Format values for the formats PNG/JPEG decode to
+IMAGE_FORMAT = {"L": 0, "LA": 1, "RGB": 4, "RGBA": 5}
+
+# Image::fix_alpha_edges constants
+ALPHA_EDGE_RADIUS = 4
+ALPHA_EDGE_THRESHOLD = 20
+
+# Texture importer params as written by Godot 4.5 (order matters for the file)
+DEFAULT_PARAMS = [
+    ("compress/mode", "0"),
+    ("compress/high_quality", "false"),
+    ("compress/lossy_quality", "0.7"),
+    ("compress/uastc_level", "0"),
+    ("compress/rdo_quality_loss", "0.0"),
+    ("compress/hdr_compression", "1"),
+    ("compress/normal_map", "0"),
+    ("compress/channel_pack", "0"),
+    ("mipmaps/generate", "false"),
+    ("mipmaps/limit", "-1"),
+    ("roughness/mode", "0"),
+    ("roughness/src_normal", '""'),
+    ("process/channel_remap/red", "0"),
+    ("process/channel_remap/green", "1"),
+    ("process/channel_remap/blue", "2"),
+    ("process/channel_remap/alpha", "3"),
+    ("process/fix_alpha_border", "true"),
+    ("process/premult_alpha", "false"),
+    ("process/normal_map_invert_y", "false"),
+    ("process/hdr_as_srgb", "false"),
+    ("process/hdr_clamp_exposure", "false"),
+    ("process/size_limit", "0"),
+    ("detect_3d/compress_to", "1"),
+]
+
+# Params that must have these values for an offline bake
+BAKEABLE_PARAMS = {
+    "compress/mode": "0",
+    "mipmaps/generate": "false",
+    "process/size_limit": "0",
+    "process/channel_remap/red": "0",
+    "process/channel_remap/green": "1",
+    "process/channel_remap/blue": "2",
+    "process/channel_remap/alpha": "3",
+    "compress/normal_map": "0",
+    "roughness/mode": "0",
+}
+
+UID_BASE = 35  # ResourceUID::id_to_text digits: 0-9 then a-y
+
+
+# ============================================
+# PATHS AND IDS
+# ============================================
+
+def res_path(project_dir, path):
+    return "res://" + os.path.relpath(path, project_dir).replace(os.sep, "/")
+
+def import_base_path(source_res):
+    """ResourceFormatImporter::get_import_base_path"""
+    return (f"res://{IMPORTED_DIR}/{source_res.rsplit('/', 1)[-1]}-"
+            f"{hashlib.md5(source_res.encode('utf-8')).hexdigest()}")
+
+def to_filesystem(project_dir, path):
+    return os.path.join(project_dir, path[len("res://"):])
+
+def uid_to_text(uid):
+    digits = []
+    while True:
+        uid, c = divmod(uid, UID_BASE)
+        digits.append(chr(ord('0') + c) if c < 10 else chr(ord('a') + c - 10))
+        if not uid:
+            break
+    return "uid://" + "".join(reversed(digits))
+
+def stable_uid(source_res):
+    """A uid derived from the res:// path (same on every machine and rerun)"""
+    digest = hashlib.blake2b(source_res.encode('utf-8'), digest_size=8).digest()
+    return uid_to_text(int.from_bytes(digest, 'big') & 0x7FFFFFFFFFFFFFFF)
+
+def file_md5(path):
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ============================================
+# .IMPORT / .MD5 FILES
+# ============================================
+
+def read_import_file(path):
+    """(uid, params as ordered (key, value) list) of an existing .import file, or (None, None)"""
+    if not os.path.exists(path):
+        return None, None
+    uid, params, section = None, [], None
+    with open(path) as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("["):
+                section = line.strip("[]")
+            elif "=" in line and section == "remap" and line.startswith("uid="):
+                uid = line.split("=", 1)[1].strip('"')
+            elif "=" in line and section == "params":
+                key, value = line.split("=", 1)
+                params.append((key, value))
+    return uid, params or None
+
+def render_import_file(source_res, uid, dest_res, params):
+    lines = [
+        "[remap]",
+        "",
+        'importer="texture"',
+        'type="CompressedTexture2D"',
+        f'uid="{uid}"',
+        f'path="{dest_res}"',
+        "metadata={",
+        '"vram_texture": false',
+        "}",
+        "",
+        "[deps]",
+        "",
+        f'source_file="{source_res}"',
+        f'dest_files=["{dest_res}"]',
+        "",
+        "[params]",
+        "",
+    ]
+    lines.extend(f"{key}={value}" for key, value in params)
+    return "\n".join(lines) + "\n"
+
+def read_md5_file(path):
+    values = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for match in re.finditer(r'(\w+)="([0-9a-f]*)"', f.read()):
+                values[match.group(1)] = match.group(2)
+    return values
+
+
+# ============================================
+# IMAGE PROCESSING (as ResourceImporterTexture does)
+# ============================================
+
+def png_has_trns(data):
+    """Whether a PNG has a tRNS chunk before its image data"""
+    offset = 8
+    while offset + 8 <= len(data):
+        length, kind = struct.unpack(">I4s", data[offset:offset + 8])
+        if kind == b"tRNS":
+            return True
+        if kind == b"IDAT":
+            return False
+        offset += 12 + length
+    return False
+
+def load_like_godot(data):
+    """
+    Decode an image into the mode Godot's loaders produce (L, LA, RGB, RGBA)
+    PNG palettes and tRNS expand the way libpng's simplified API does.
+    """
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    if img.format == "JPEG":
+        return img.convert("L" if img.mode == "L" else "RGB")
+    if img.mode in ("I;16", "I;16B", "I", "F"):
+        raise ValueError("16-bit PNG")
+    has_alpha = img.mode in ("LA", "RGBA", "PA") or png_has_trns(data)
+    grey = img.mode in ("1", "L", "LA")
+    if grey:
+        return img.convert("LA" if has_alpha else "L")
+    return img.convert("RGBA" if has_alpha else "RGB")
+
+def fix_alpha_edges(rgba):
+    """
+    Image::fix_alpha_edges: pixels with alpha below the threshold take the
+    colour of the nearest opaque-enough pixel within a 4px radius (first in
+    scan order on ties)
+    """
+    height, width, _ = rgba.shape
+    source = rgba.copy()
+    result = rgba.copy()
+    solid = source[:, :, 3] >= ALPHA_EDGE_THRESHOLD
+    pending = ~solid
+
+    # Godot scans neighbours row by row (k = y - dy ascending, then l = x - dx
+    # ascending) and keeps the first strictly closer one
+    offsets = [(dy, dx) for dy in range(-ALPHA_EDGE_RADIUS, ALPHA_EDGE_RADIUS + 1)
+               for dx in range(-ALPHA_EDGE_RADIUS, ALPHA_EDGE_RADIUS + 1)]
+    offsets.sort(key=lambda o: (o[0] * o[0] + o[1] * o[1], -o[0], -o[1]))
+    for dy, dx in offsets:
+        if not pending.any():
+            break
+        # Target (y, x) reads neighbour (y - dy, x - dx)
+        ty0, ty1 = max(0, dy), min(height, height + dy)
+        tx0, tx1 = max(0, dx), min(width, width + dx)
+        if ty0 >= ty1 or tx0 >= tx1:
+            continue
+        target = pending[ty0:ty1, tx0:tx1]
+        neighbour_solid = solid[ty0 - dy:ty1 - dy, tx0 - dx:tx1 - dx]
+        hit = target & neighbour_solid
+        if hit.any():
+            result[ty0:ty1, tx0:tx1, :3][hit] = source[ty0 - dy:ty1 - dy, tx0 - dx:tx1 - dx, :3][hit]
+            target &= ~hit
+    return result
+
+def premultiply_alpha(rgba):
+    """Image::premultiply_alpha for RGBA8"""
+    pixels = rgba.astype(np.uint16)
+    pixels[:, :, :3] = (pixels[:, :, :3] * pixels[:, :, 3:] + 255) >> 8
+    return pixels.astype(np.uint8)
+
+def build_ctex(img, params):
+    """CompressedTexture2D bytes for a lossless, non-mipmapped import"""
+    if img.mode == "RGBA" and (params.get("process/fix_alpha_border") == "true"
+                               or params.get("process/premult_alpha") == "true"):
+        rgba = np.asarray(img)
+        if params.get("process/fix_alpha_border") == "true":
+            rgba = fix_alpha_edges(rgba)
+        if params.get("process/premult_alpha") == "true":
+            rgba = premultiply_alpha(rgba)
+        img = Image.fromarray(rgba, "RGBA")
+
+    flags = 0
+    if int(params.get("detect_3d/compress_to", "0")) > 0:
+        flags |= FORMAT_BIT_DETECT_3D
+    mipmap_limit = int(params.get("mipmaps/limit", "-1"))
+
+    png = io.BytesIO()
+    img.save(png, format="PNG")
+    payload = b"PNG " + png.getvalue()
+
+    width, height = img.size
+    return b"".join([
+        CTEX_MAGIC,
+        struct.pack("<IIIIiIII", CTEX_FORMAT_VERSION, width, height, flags, mipmap_limit, 0, 0, 0),
+        struct.pack("<IHHII", CTEX_DATA_FORMAT_PNG, width, height, 0, IMAGE_FORMAT[img.mode]),
+        struct.pack("<I", len(payload)),
+        payload,
+    ])
+
+
+# ============================================
+# WORKER
+# ============================================
+
+def bake_texture(job):
+    """
+    Bake one texture; returns (source path, status) with status one of
+    "baked", "current", "skipped: <reason>" or "failed: <reason>"
+    """
+    project_dir, source_path, force = job
+    source_res = res_path(project_dir, source_path)
+    base_res = import_base_path(source_res)
+    dest_res = base_res + ".ctex"
+    dest_path = to_filesystem(project_dir, dest_res)
+    md5_path = to_filesystem(project_dir, base_res + ".md5")
+    import_path = source_path + ".import"
+
+    uid, params = read_import_file(import_path)
+    params = params or list(DEFAULT_PARAMS)
+    param_map = dict(params)
+    for key, required in BAKEABLE_PARAMS.items():
+        if param_map.get(key, required) != required:
+            return source_path, f"skipped: {key}={param_map[key]}"
+    uid = uid or stable_uid(source_res)
+    import_text = render_import_file(source_res, uid, dest_res, params)
+
+    try:
+        with open(source_path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        return source_path, f"failed: {e}"
+    source_md5 = hashlib.md5(data).hexdigest()
+
+    current_import = None
+    if os.path.exists(import_path):
+        with open(import_path) as f:
+            current_import = f.read()
+
+    recorded = read_md5_file(md5_path)
+    if (not force and current_import == import_text and recorded.get("source_md5") == source_md5
+            and os.path.exists(dest_path) and recorded.get("dest_md5") == file_md5(dest_path)):
+        return source_path, "current"
+
+    try:
+        ctex = build_ctex(load_like_godot(data), param_map)
+    except (OSError, ValueError) as e:
+        return source_path, f"failed: {e}"
+
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    for path, content in ((dest_path, ctex),
+                          (md5_path, f'source_md5="{source_md5}"\n'
+                                     f'dest_md5="{hashlib.md5(ctex).hexdigest()}"\n\n'.encode())):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    if current_import != import_text:
+        with open(import_path, 'w') as f:
+            f.write(import_text)
+    return source_path, "baked"
+
+
+# ============================================
+# MAIN
+# ============================================
+
+def find_textures(project_dir, directories):
+    textures = []
+    for directory in directories:
+        root_dir = os.path.join(project_dir, directory)
+        for root, dirs, files in os.walk(root_dir):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            textures.extend(os.path.join(root, name) for name in sorted(files)
+                            if name.lower().endswith(TEXTURE_EXTENSIONS))
+    return textures
+
+def prebake(project_dir, directories, force=False, workers=None):
+    """Bake every texture under directories; returns a stats dict"""
+    textures = find_textures(project_dir, directories)
+    stats = {"textures": len(textures), "baked": 0, "current": 0, "skipped": 0, "failed": 0}
+    jobs = [(project_dir, path, force) for path in textures]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for idx, (path, status) in enumerate(executor.map(bake_texture, jobs, chunksize=32), 1):
+            kind = status.split(":", 1)[0]
+            stats[kind] += 1
+            if kind == "failed":
+                print(f"  {os.path.relpath(path, project_dir)}: {status}")
+            if idx % 2500 == 0:
+                print(f"  Processed {idx}/{len(jobs)} textures...")
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Pre-bake Godot texture imports (.ctex + .import)')
+    parser.add_argument('directories', nargs='*', default=DEFAULT_DIRS,
+                        help='Directories relative to the project (default: assets/sprites/lookup)')
+    parser.add_argument('--project', type=str, default=PROJECT_DIR, help='Godot project directory')
+    parser.add_argument('--force', action='store_true', help='Rebake even if the import is up to date')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    if Image is None or np is None:
+        print("Error: Pillow and NumPy are required (pip3 install pillow numpy)")
+        sys.exit(1)
+    if not os.path.exists(os.path.join(args.project, "project.godot")):
+        print(f"Error: No project.godot in {args.project}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Pre-baking Godot Texture Imports")
+    print("=" * 60)
+    start_time = time.time()
+    stats = prebake(os.path.abspath(args.project), args.directories, force=args.force, workers=args.workers)
+
+    print(f"\nTextures:             {stats['textures']:,}")
+    print(f"  baked:              {stats['baked']:,}")
+    print(f"  already current:    {stats['current']:,}")
+    print(f"  left for editor:    {stats['skipped']:,}")
+    print(f"  failed:             {stats['failed']:,}")
+    print(f"Time elapsed:         {time.time() - start_time:.1f}s")
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Shape rasterization cache
+=========================
+JPEXS exports vector shapes as SVG (shapes/ in each SWF's output, ~65k
+files). organize_assets_v2.py only picks PNG/JPEG files, so SWFs with
+nothing but shapes had no lookup entry, and organize_assets.py linked the
+raw SVG for Godot to rasterize at import time.
+
+This stage renders every shape SVG to PNG at one or more scales in a
+process pool:
+
+    rasterized_shapes/<content hash>@<scale>x.png   (next to the extracted dir)
+
+Renders are keyed by SVG content hash and scale, so identical shapes in
+different SWFs are rendered once and reruns only render new or changed
+SVGs. asset_raster_index.json records the hash, size, mtime and render
+sizes of each SVG; an SVG whose size or mtime changed is hashed again.
+Shapes whose document size (width/height or viewBox, times the scale)
+exceeds MAX_RENDER_EDGE are skipped before anything is rendered.
+The organize scripts add the renders to their candidate pool: the first
+scale is the one the lookup uses, after images/, sprites/, buttons/ and
+frames/.
+
+Requires resvg-py (pip3 install resvg-py).
+
+USAGE:
+   python3 rasterize_shapes.py                  # Render at 1x and 2x
+   python3 rasterize_shapes.py --scales 1,2,4   # Other scales (first one goes in the lookup)
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resvg_py
+except ImportError:
+    resvg_py = None
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from asset_inventory import PATH, SUBDIR, EXT, SIZE, load_or_scan_inventory
+from dedup_assets import load_dedup_index
+from image_metadata import read_header
+
+EXTRACTED_DIR = "/Users/pa/PetSocietyMobile/assets/sprites/extracted"
+
+RASTER_DIR = "rasterized_shapes"
+RASTER_INDEX_FILENAME = "asset_raster_index.json"
+RASTER_INDEX_VERSION = 1
+
+DEFAULT_SCALES = (1.0, 2.0)
+
+# Renders larger than this on either edge are skipped (broken viewBoxes)
+MAX_RENDER_EDGE = 4096
+
+# A length attribute in user units or px ("120", "120.5px")
+PIXEL_LENGTH = re.compile(r"^\s*([0-9]*\.?[0-9]+(?:e[-+]?[0-9]+)?)\s*(?:px)?\s*$", re.IGNORECASE)
+
+# SVGs per worker task
+CHUNK_SIZE = 128
+
+
+def default_raster_dir(extracted_dir):
+    """Renders live next to (not inside) the extracted dir"""
+    return os.path.join(os.path.dirname(os.path.abspath(extracted_dir)), RASTER_DIR)
+
+def default_raster_index_path(extracted_dir):
+    return os.path.join(os.path.dirname(os.path.abspath(extracted_dir)), RASTER_INDEX_FILENAME)
+
+def scale_label(scale):
+    return f"{scale:g}"
+
+def render_filename(content_hash, scale):
+    return f"{content_hash}@{scale_label(scale)}x.png"
+
+def load_raster_index(extracted_dir):
+    """
+    (scales, shapes) from the index, or ([], {}) if there is none
+    shapes maps an SVG's relative path to {"hash", "size", "mtime_ns", "renders"}, where
+    renders maps a scale label to [width, height, PNG size].
+    """
+    path = default_raster_index_path(extracted_dir)
+    if not os.path.exists(path):
+        return [], {}
+    with open(path) as f:
+        index = json.load(f)
+    return index["scales"], index["shapes"]
+
+def lookup_render(extracted_dir, scales, shape):
+    """(PNG path, width, height, PNG size) of a shape's lookup-scale render, or None"""
+    if not scales:
+        return None
+    render = shape["renders"].get(scale_label(scales[0]))
+    if render is None:
+        return None
+    return (os.path.join(default_raster_dir(extracted_dir), render_filename(shape["hash"], scales[0])),
+            *render)
+
+
+# ============================================
+# WORKER
+# ============================================
+
+def svg_size(svg):
+    """
+    (width, height) the SVG renders at scale 1, from the root's width/height
+    (px or unitless) or else its viewBox; None if neither can be read
+    """
+    try:
+        _, root = next(ET.iterparse(io.BytesIO(svg), events=("start",)))
+    except (ET.ParseError, StopIteration):
+        return None
+    view_box = root.get("viewBox", "").replace(",", " ").split()
+    size = []
+    for attribute, box_index in (("width", 2), ("height", 3)):
+        match = PIXEL_LENGTH.match(root.get(attribute, ""))
+        if match:
+            size.append(float(match.group(1)))
+        elif len(view_box) == 4:
+            try:
+                size.append(float(view_box[box_index]))
+            except ValueError:
+                return None
+        else:
+            return None
+    return tuple(size)
+
+def render_shapes(job):
+    """
+    Render a chunk of SVGs at every scale
+    Returns [(content hash, {scale label: [w, h, size]}, error)] per SVG;
+    renders that already exist on disk are not redone.
+    """
+    paths, scales, raster_dir = job
+    results = []
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                svg = f.read()
+        except OSError as e:
+            results.append((None, {}, str(e)))
+            continue
+        content_hash = hashlib.blake2b(svg, digest_size=16).hexdigest()
+        renders, error = {}, None
+        # Refuse oversized documents up front: resvg would allocate the whole pixmap
+        size = svg_size(svg)
+        if size is not None and max(size) * max(scales) > MAX_RENDER_EDGE:
+            results.append((content_hash, {}, f"too large ({size[0]:g}x{size[1]:g})"))
+            continue
+        for scale in scales:
+            target_path = os.path.join(raster_dir, render_filename(content_hash, scale))
+            try:
+                if not os.path.exists(target_path):
+                    png = resvg_py.svg_to_bytes(svg_string=svg.decode('utf-8', 'replace'), zoom=scale,
+                                                skip_system_fonts=True)
+                    tmp_path = f"{target_path}.{os.getpid()}.tmp"
+                    with open(tmp_path, 'wb') as f:
+                        f.write(png)
+                    os.replace(tmp_path, target_path)
+                width, height, _ = read_header(target_path)
+                renders[scale_label(scale)] = [width, height, os.path.getsize(target_path)]
+            except Exception as e:
+                # resvg raises on empty or malformed documents (e.g. zero-size shapes)
+                error = str(e) or type(e).__name__
+                break
+        results.append((content_hash, renders, error))
+    return results
+
+
+# ============================================
+# STAGE
+# ============================================
+
+def list_shapes(extracted_dir):
+    """(relative path, size) of every shape SVG, byte-identical duplicates excluded"""
+    inventory = load_or_scan_inventory(extracted_dir)
+    duplicates = load_dedup_index(extracted_dir)
+    shapes = []
+    for name, entries in inventory.items():
+        for entry in entries:
+            if entry[SUBDIR] == "shapes" and entry[EXT] == "svg" and entry[PATH].count("/") == 1:
+                rel_path = f"{name}/{entry[PATH]}"
+                if rel_path not in duplicates:
+                    shapes.append((rel_path, entry[SIZE]))
+    shapes.sort()
+    return shapes
+
+def rasterize_shapes(extracted_dir, scales=DEFAULT_SCALES, workers=None):
+    """Render every shape SVG and write the index; returns a stats dict"""
+    raster_dir = default_raster_dir(extracted_dir)
+    os.makedirs(raster_dir, exist_ok=True)
+    index_path = default_raster_index_path(extracted_dir)
+    labels = [scale_label(scale) for scale in scales]
+    _, previous = load_raster_index(extracted_dir)
+
+    shapes, todo = {}, []
+    for rel_path, size in list_shapes(extracted_dir):
+        shape = previous.get(rel_path)
+        try:
+            mtime_ns = os.stat(os.path.join(extracted_dir, rel_path)).st_mtime_ns
+        except OSError:
+            continue
+        if (shape and shape["size"] == size and shape.get("mtime_ns") == mtime_ns and all(label in shape["renders"] for label in labels)
+                and all(os.path.exists(os.path.join(raster_dir, render_filename(shape["hash"], scale)))
+                        for scale in scales)):
+            shapes[rel_path] = {"hash": shape["hash"], "size": size, "mtime_ns": mtime_ns,
+                                "renders": {label: shape["renders"][label] for label in labels}}
+        else:
+            todo.append((rel_path, size, mtime_ns))
+
+    stats = {"shapes": len(shapes) + len(todo), "cached": len(shapes), "rendered": 0, "failed": 0}
+    jobs = [([os.path.join(extracted_dir, rel_path) for rel_path, _, _ in todo[i:i + CHUNK_SIZE]], scales, raster_dir)
+            for i in range(0, len(todo), CHUNK_SIZE)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_start, results in zip(range(0, len(todo), CHUNK_SIZE), executor.map(render_shapes, jobs)):
+            for (rel_path, size, mtime_ns), (content_hash, renders, error) in zip(
+                    todo[chunk_start:chunk_start + CHUNK_SIZE], results):
+                if error is None and all(max(r[0], r[1]) <= MAX_RENDER_EDGE for r in renders.values()):
+                    shapes[rel_path] = {"hash": content_hash, "size": size, "mtime_ns": mtime_ns,
+                                        "renders": renders}
+                    stats["rendered"] += 1
+                else:
+                    stats["failed"] += 1
+            if (chunk_start // CHUNK_SIZE + 1) % 50 == 0:
+                print(f"  Processed {chunk_start + CHUNK_SIZE}/{len(todo)} shapes...")
+
+    # Drop renders no shape refers to any more
+    keep = {render_filename(shape["hash"], scale) for shape in shapes.values() for scale in scales}
+    for filename in os.listdir(raster_dir):
+        if filename not in keep:
+            os.remove(os.path.join(raster_dir, filename))
+    stats["files"] = len(keep)
+
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"version": RASTER_INDEX_VERSION, "scales": list(scales), "shapes": dict(sorted(shapes.items()))},
+                  f, separators=(',', ':'))
+    os.replace(tmp_path, index_path)
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Render extracted shape SVGs to PNG')
+    parser.add_argument('--output', type=str, default=EXTRACTED_DIR, help='Extracted asset directory')
+    parser.add_argument('--scales', type=str, default=",".join(scale_label(s) for s in DEFAULT_SCALES),
+                        help='Comma-separated render scales; the first is used by the lookup (default: 1,2)')
+    parser.add_argument('--workers', type=int, default=None, help='Renderer processes (default: CPU count)')
+    args = parser.parse_args()
+
+    if resvg_py is None:
+        print("Error: resvg-py is required (pip3 install resvg-py)")
+        sys.exit(1)
+    if not os.path.isdir(args.output):
+        print(f"Error: Extracted directory not found: {args.output}")
+        sys.exit(1)
+    scales = []
+    for value in args.scales.split(","):
+        if value.strip() and float(value) not in scales:
+            scales.append(float(value))
+    if not scales or min(scales) <= 0:
+        print("Error: --scales needs at least one positive scale")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Rasterizing Shapes")
+    print("=" * 60)
+    start_time = time.time()
+    stats = rasterize_shapes(args.output, scales=tuple(scales), workers=args.workers)
+
+    print(f"\nShape SVGs:           {stats['shapes']:,}")
+    print(f"  rendered:           {stats['rendered']:,}")
+    print(f"  unchanged:          {stats['cached']:,}")
+    print(f"  failed/empty:       {stats['failed']:,}")
+    print(f"PNG files:            {stats['files']:,} ({', '.join(scale_label(s) + 'x' for s in scales)})")
+    print(f"Time elapsed:         {time.time() - start_time:.1f}s")
+    print(f"\nRenders: {default_raster_dir(args.output)}")
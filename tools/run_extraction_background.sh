@@ -24,8 +24,11 @@ echo ""
 echo "Monitor progress with:"
 echo "  ./monitor_extraction.sh"
 echo ""
-echo "View live log with:"
-echo "  tail -f extraction_log.txt"
+echo "Live status (throughput, ETA, latency):"
+echo "  cat ../assets/sprites/extraction_status.json"
+echo ""
+echo "Per-file events / full report:"
+echo "  python3 extraction_telemetry.py"
 echo ""
 echo "Check if still running:"
 echo "  pgrep -f extract_assets.py"
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+SWF tag pre-scan
+================
+extract_assets.py used to ask JPEXS for every asset type
+(image,shape,sprite,button,frame) on every SWF, and frame rendering is the
+most expensive of them even when the timeline only repeats one shape.
+
+This scan walks each SWF's top-level tag list with swf_reader.SwfStream
+(tag bodies are skipped, and reading stops as soon as nothing further can
+change the decision) and picks the export types worth requesting:
+
+- image    any DefineBits* bitmap tag
+- shape    DefineShape 1-4
+- sprite   DefineSprite
+- button   DefineButton 1-2
+- frame    the main timeline places something, and either has several
+           frames or placements, or shows content no other type exports
+           (text, morphs, video). A single frame placing one character is
+           already covered by that character's own export.
+
+Files with none of these have nothing to extract and are skipped without
+starting a JVM. Files the scan cannot read (LZMA containers, truncated
+files) get every type, as before.
+
+Scans are cached in swf_tag_scan.json next to the extraction output dir,
+keyed by file name, size and mtime, so reruns only scan new or changed files.
+
+USAGE:
+   python3 swf_prescan.py                   # Scan the source dir and show what would be requested
+   python3 swf_prescan.py --source DIR      # Another source directory
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from swf_reader import (BITMAP_TAGS, BUTTON_TAGS, MORPH_TAGS, SHAPE_TAGS, SPRITE_TAGS,
+                        TAG_SHOW_FRAME, TEXT_TAGS, SwfStream, UnsupportedSwf)
+
+SOURCE_DIR = "/Users/pa/petsociety/static/assets"
+OUTPUT_DIR = "/Users/pa/PetSocietyMobile/assets/sprites/extracted"
+
+SCAN_CACHE_FILENAME = "swf_tag_scan.json"
+SCAN_CACHE_VERSION = 1
+
+PLACE_TAGS = {4, 26, 70, 94}          # PlaceObject 1-4
+VIDEO_TAGS = {60}                     # DefineVideoStream
+
+# Visual content that only a frame render shows
+FRAME_ONLY_TAGS = MORPH_TAGS | TEXT_TAGS | VIDEO_TAGS
+
+# Export types derived from definition tags, in ASSET_TYPES order
+DEFINITION_TYPES = [
+    ("image", BITMAP_TAGS),
+    ("shape", SHAPE_TAGS),
+    ("sprite", SPRITE_TAGS),
+    ("button", BUTTON_TAGS),
+]
+
+# Files per worker task
+CHUNK_SIZE = 64
+
+
+def default_scan_cache_path(output_dir):
+    """The cache lives next to (not inside) the extraction output dir"""
+    return os.path.join(os.path.dirname(os.path.abspath(output_dir)), SCAN_CACHE_FILENAME)
+
+
+# ============================================
+# SCAN
+# ============================================
+
+def wants_frames(tags, frames, placements):
+    if not placements:
+        return False
+    return frames > 1 or placements > 1 or bool(tags & FRAME_ONLY_TAGS)
+
+def scan_tags(swf_path):
+    """
+    Summarize the main timeline: {"tags": distinct tag codes, "frames":
+    ShowFrame count, "placements": PlaceObject count}
+    The walk stops early once every export type is known to be wanted, so
+    the summary of such files is partial (but decides the same).
+    """
+    tags = set()
+    frames = placements = 0
+    with SwfStream(swf_path) as stream:
+        stream.read_header_fields()
+        for code, _, _ in stream.iter_tags():
+            tags.add(code)
+            if code == TAG_SHOW_FRAME:
+                frames += 1
+            elif code in PLACE_TAGS:
+                placements += 1
+            if (frames > 1 and placements and
+                    all(tags & definition_tags for _, definition_tags in DEFINITION_TYPES)):
+                break
+    return {"tags": sorted(tags), "frames": frames, "placements": placements}
+
+def export_types(scan):
+    """Comma-separated JPEXS export types worth requesting ("" if the SWF has nothing visual)"""
+    tags = set(scan["tags"])
+    types = [name for name, definition_tags in DEFINITION_TYPES if tags & definition_tags]
+    if wants_frames(tags, scan["frames"], scan["placements"]):
+        types.append("frame")
+    return ",".join(types)
+
+def scan_files(paths):
+    """Worker: [(size, mtime_ns, scan or None)] for a chunk of SWF paths"""
+    results = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            results.append((None, None, None))
+            continue
+        try:
+            scan = scan_tags(path)
+        except (UnsupportedSwf, struct.error, zlib.error, OSError):
+            scan = None
+        results.append((stat.st_size, stat.st_mtime_ns, scan))
+    return results
+
+
+# ============================================
+# CACHE
+# ============================================
+
+def load_scan_cache(cache_path):
+    """name -> [size, mtime_ns, scan or None] ({} if missing or from another version)"""
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if cache.get("version") != SCAN_CACHE_VERSION:
+        return {}
+    return cache["files"]
+
+def scan_swfs(source_dir, filenames, cache_path, workers=None):
+    """
+    Export types for each file (None when the scan could not read it),
+    scanning only files not in the cache; returns (types by name, stats)
+    """
+    cache = load_scan_cache(cache_path)
+    types, todo = {}, []
+    for name in filenames:
+        entry = cache.get(name)
+        if entry:
+            try:
+                stat = os.stat(os.path.join(source_dir, name))
+            except OSError:
+                stat = None
+            if stat and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+                types[name] = export_types(entry[2]) if entry[2] else None
+                continue
+        todo.append(name)
+
+    stats = {"files": len(filenames), "cached": len(types), "scanned": len(todo)}
+    if todo:
+        chunks = [[os.path.join(source_dir, name) for name in todo[i:i + CHUNK_SIZE]]
+                  for i in range(0, len(todo), CHUNK_SIZE)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk_start, results in zip(range(0, len(todo), CHUNK_SIZE), executor.map(scan_files, chunks)):
+                for name, (size, mtime_ns, scan) in zip(todo[chunk_start:chunk_start + CHUNK_SIZE], results):
+                    types[name] = export_types(scan) if scan else None
+                    if size is not None:
+                        cache[name] = [size, mtime_ns, scan]
+
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"version": SCAN_CACHE_VERSION, "files": cache}, f, separators=(',', ':'))
+        os.replace(tmp_path, cache_path)
+    return types, stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Scan SWF tag lists and report the export types to request')
+    parser.add_argument('--source', type=str, default=SOURCE_DIR, help='Source directory with SWF files')
+    parser.add_argument('--output', type=str, default=OUTPUT_DIR,
+                        help='Extraction output directory (the cache lives next to it)')
+    parser.add_argument('--workers', type=int, default=None, help='Scanner processes (default: CPU count)')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.source):
+        print(f"Error: Source directory not found: {args.source}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Pre-scanning SWF Tags")
+    print("=" * 60)
+    start_time = time.time()
+    filenames = sorted(f for f in os.listdir(args.source) if os.path.isfile(os.path.join(args.source, f)))
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    types, stats = scan_swfs(args.source, filenames, default_scan_cache_path(args.output), args.workers)
+
+    combinations = Counter(types.values())
+    print(f"\nFiles:                {stats['files']:,} ({stats['scanned']:,} scanned, {stats['cached']:,} cached)")
+    print(f"  nothing visual:     {combinations.pop('', 0):,} (skipped)")
+    print(f"  unreadable:         {combinations.pop(None, 0):,} (every type requested)")
+    print(f"  with frames:        {sum(n for t, n in combinations.items() if 'frame' in t):,}")
+    print("\nRequested types:")
+    for combination, n in combinations.most_common(15):
+        print(f"  {n:>7,}  {combination}")
+    print(f"\nTime elapsed:         {time.time() - start_time:.1f}s")
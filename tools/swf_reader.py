@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Pure-Python SWF reader
+======================
+Streams the tag list of FWS (uncompressed) and CWS (zlib) SWF files and
+decodes the bitmap tags (DefineBits, DefineBitsJPEG2/3/4,
+DefineBitsLossless/Lossless2) without starting a JVM.
+
+Files that only contain bitmaps are exported straight to the same
+images/<character id>.<ext> layout JPEXS produces. Anything that needs
+rendering (shapes, sprites, buttons, text, morphs) raises UnsupportedSwf so
+the caller can fall back to ffdec.
+
+USAGE:
+   python3 swf_reader.py FILE.swf OUTPUT_DIR    # Export bitmaps from one SWF
+"""
+
+import io
+import os
+import struct
+import sys
+import zlib
+
+# Pillow is only needed to merge DefineBitsJPEG3/4 alpha planes into PNGs
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Bytes pulled from the file per read while streaming a compressed body
+READ_CHUNK = 64 * 1024
+
+# Tag codes
+TAG_END = 0
+TAG_SHOW_FRAME = 1
+TAG_DEFINE_BITS = 6
+TAG_JPEG_TABLES = 8
+TAG_DEFINE_BITS_LOSSLESS = 20
+TAG_DEFINE_BITS_JPEG2 = 21
+TAG_DEFINE_BITS_JPEG3 = 35
+TAG_DEFINE_BITS_LOSSLESS2 = 36
+TAG_DEFINE_BITS_JPEG4 = 90
+
+BITMAP_TAGS = {
+    TAG_DEFINE_BITS,
+    TAG_DEFINE_BITS_LOSSLESS,
+    TAG_DEFINE_BITS_JPEG2,
+    TAG_DEFINE_BITS_JPEG3,
+    TAG_DEFINE_BITS_LOSSLESS2,
+    TAG_DEFINE_BITS_JPEG4,
+}
+
+# Tags whose output only JPEXS can render (shapes, sprites, buttons, frames)
+SHAPE_TAGS = {2, 22, 32, 83}          # DefineShape 1-4
+MORPH_TAGS = {46, 84}                 # DefineMorphShape 1-2
+SPRITE_TAGS = {39}                    # DefineSprite
+BUTTON_TAGS = {7, 34}                 # DefineButton 1-2
+TEXT_TAGS = {11, 33, 37}              # DefineText 1-2, DefineEditText
+RENDER_TAGS = SHAPE_TAGS | MORPH_TAGS | SPRITE_TAGS | BUTTON_TAGS | TEXT_TAGS
+
+# Lossless bitmap formats
+BITMAP_FORMAT_COLORMAPPED = 3
+BITMAP_FORMAT_RGB15 = 4
+BITMAP_FORMAT_RGB24 = 5
+
+JPEG_SOI = b'\xff\xd8'
+JPEG_EOI = b'\xff\xd9'
+PNG_MAGIC = b'\x89PNG\r\n\x1a\n'
+GIF_MAGIC = b'GIF89a'
+
+_UNPREMULTIPLY = {}
+
+
+class UnsupportedSwf(Exception):
+    """The SWF needs JPEXS (vector content, unsupported container or codec)"""
+
+
+class SwfStream:
+    """
+    Sequential reader over a SWF body (everything after the 8-byte header)
+    CWS bodies are inflated incrementally, so a caller that stops iterating
+    early never decompresses the rest of the file.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        header = self.file.read(8)
+        if len(header) < 8:
+            self.file.close()
+            raise UnsupportedSwf("Truncated header")
+        self.signature = header[:3]
+        self.version = header[3]
+        self.file_length = struct.unpack('<I', header[4:8])[0]
+        if self.signature == b'FWS':
+            self.inflater = None
+        elif self.signature == b'CWS':
+            self.inflater = zlib.decompressobj()
+        else:
+            self.file.close()
+            raise UnsupportedSwf(f"Unsupported container {self.signature!r}")
+        self.buffer = bytearray()
+        self.pos = 0
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _fill(self, size):
+        """Make sure at least size unread bytes are buffered (or hit EOF)"""
+        while len(self.buffer) - self.pos < size:
+            chunk = self.file.read(READ_CHUNK)
+            if not chunk:
+                if self.inflater is not None:
+                    self.buffer += self.inflater.flush()
+                    self.inflater = None
+                    continue
+                break
+            if self.inflater is not None:
+                chunk = self.inflater.decompress(chunk)
+            # Drop consumed bytes so the buffer stays small while streaming
+            if self.pos > READ_CHUNK:
+                del self.buffer[:self.pos]
+                self.pos = 0
+            self.buffer += chunk
+
+    def read(self, size):
+        self._fill(size)
+        data = bytes(self.buffer[self.pos:self.pos + size])
+        if len(data) < size:
+            raise UnsupportedSwf("Unexpected end of file")
+        self.pos += size
+        return data
+
+    def skip(self, size):
+        while size > 0:
+            self._fill(min(size, READ_CHUNK))
+            available = min(size, len(self.buffer) - self.pos)
+            if available <= 0:
+                raise UnsupportedSwf("Unexpected end of file")
+            self.pos += available
+            size -= available
+
+    def read_header_fields(self):
+        """Skip the frame RECT and return (frame_rate, frame_count)"""
+        nbits = self.read(1)[0] >> 3
+        rect_bytes = (5 + nbits * 4 + 7) // 8
+        self.skip(rect_bytes - 1)
+        frame_rate, frame_count = struct.unpack('<HH', self.read(4))
+        return frame_rate / 256.0, frame_count
+
+    def iter_tags(self, want=()):
+        """
+        Yield (code, length, body) for every top-level tag
+        body is only read for codes in want, otherwise it is None and the
+        bytes are skipped.
+        """
+        while True:
+            self._fill(2)
+            if len(self.buffer) - self.pos < 2:
+                return
+            code_and_length = struct.unpack('<H', self.read(2))[0]
+            code = code_and_length >> 6
+            length = code_and_length & 0x3f
+            if length == 0x3f:
+                length = struct.unpack('<I', self.read(4))[0]
+            if code in want:
+                body = self.read(length)
+            else:
+                self.skip(length)
+                body = None
+            yield code, length, body
+            if code == TAG_END:
+                return
+
+
+# ============================================
+# PNG / JPEG HELPERS
+# ============================================
+
+def png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+def encode_png(width, height, pixels, color_type, palette=None, transparency=None):
+    """
+    Encode 8-bit pixel data as a PNG
+    color_type: 2 = RGB, 3 = indexed, 6 = RGBA (pixels are unpadded rows)
+    """
+    channels = {2: 3, 3: 1, 6: 4}[color_type]
+    stride = width * channels
+    view = memoryview(pixels)
+    raw = b''.join(b'\x00' + view[y * stride:(y + 1) * stride] for y in range(height))
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)
+    chunks = [PNG_MAGIC, png_chunk(b'IHDR', ihdr)]
+    if palette is not None:
+        chunks.append(png_chunk(b'PLTE', palette))
+    if transparency:
+        chunks.append(png_chunk(b'tRNS', transparency))
+    chunks.append(png_chunk(b'IDAT', zlib.compress(raw, 6)))
+    chunks.append(png_chunk(b'IEND', b''))
+    return b''.join(chunks)
+
+def _unpremultiply_table(alpha):
+    """Translation table mapping premultiplied channel values back to straight alpha"""
+    table = _UNPREMULTIPLY.get(alpha)
+    if table is None:
+        table = bytes(min(255, (c * 255 + alpha // 2) // alpha) for c in range(256))
+        _UNPREMULTIPLY[alpha] = table
+    return table
+
+def _unpremultiply_rgba(rgba):
+    """Convert premultiplied RGBA pixels to straight alpha in place"""
+    alphas = rgba[3::4]
+    if alphas.count(255) + alphas.count(0) == len(alphas):
+        return
+    for i, alpha in enumerate(alphas):
+        if 0 < alpha < 255:
+            table = _unpremultiply_table(alpha)
+            offset = i * 4
+            rgba[offset] = table[rgba[offset]]
+            rgba[offset + 1] = table[rgba[offset + 1]]
+            rgba[offset + 2] = table[rgba[offset + 2]]
+
+def clean_jpeg(data):
+    """Strip the bogus EOI+SOI marker pair some SWF encoders put before JPEG data"""
+    if data.startswith(JPEG_EOI + JPEG_SOI):
+        return data[4:]
+    return data
+
+def merge_jpeg_tables(tables, image):
+    """Combine a DefineBits body with the shared JPEGTables tag"""
+    tables = clean_jpeg(tables or b'')
+    image = clean_jpeg(image)
+    if not tables:
+        return image
+    if tables.endswith(JPEG_EOI):
+        tables = tables[:-2]
+    if image.startswith(JPEG_SOI):
+        image = image[2:]
+    return tables + image
+
+def image_extension(data):
+    """File extension JPEXS would use for embedded image data"""
+    if data.startswith(PNG_MAGIC):
+        return "png"
+    if data.startswith(GIF_MAGIC):
+        return "gif"
+    return "jpg"
+
+
+# ============================================
+# BITMAP TAG DECODERS
+# ============================================
+
+def decode_lossless(body, with_alpha):
+    """Decode DefineBitsLossless/Lossless2 to (character_id, png_bytes)"""
+    character_id, bitmap_format, width, height = struct.unpack('<HBHH', body[:7])
+    if bitmap_format == BITMAP_FORMAT_COLORMAPPED:
+        color_count = body[7] + 1
+        data = zlib.decompress(body[8:])
+        entry_size = 4 if with_alpha else 3
+        table = data[:color_count * entry_size]
+        indices = data[color_count * entry_size:]
+        row_stride = (width + 3) & ~3
+        pixels = b''.join(indices[y * row_stride:y * row_stride + width] for y in range(height))
+        if with_alpha:
+            rgba = bytearray(table)
+            _unpremultiply_rgba(rgba)
+            palette = bytearray(color_count * 3)
+            palette[0::3] = rgba[0::4]
+            palette[1::3] = rgba[1::4]
+            palette[2::3] = rgba[2::4]
+            transparency = bytes(rgba[3::4]).rstrip(b'\xff')
+            return character_id, encode_png(width, height, pixels, 3, bytes(palette), transparency)
+        return character_id, encode_png(width, height, pixels, 3, bytes(table))
+
+    data = zlib.decompress(body[7:])
+
+    if bitmap_format == BITMAP_FORMAT_RGB15 and not with_alpha:
+        row_stride = (width * 2 + 3) & ~3
+        rgb = bytearray(width * height * 3)
+        out = 0
+        for y in range(height):
+            row = y * row_stride
+            for x in range(width):
+                value = (data[row + x * 2] << 8) | data[row + x * 2 + 1]
+                for shift in (10, 5, 0):
+                    channel = (value >> shift) & 0x1f
+                    rgb[out] = (channel << 3) | (channel >> 2)
+                    out += 1
+        return character_id, encode_png(width, height, rgb, 2)
+
+    if bitmap_format == BITMAP_FORMAT_RGB24:
+        pixel_count = width * height
+        data = data[:pixel_count * 4]
+        if with_alpha:
+            # ARGB (premultiplied) -> straight RGBA
+            rgba = bytearray(pixel_count * 4)
+            rgba[0::4] = data[1::4]
+            rgba[1::4] = data[2::4]
+            rgba[2::4] = data[3::4]
+            rgba[3::4] = data[0::4]
+            _unpremultiply_rgba(rgba)
+            return character_id, encode_png(width, height, rgba, 6)
+        # XRGB -> RGB
+        rgb = bytearray(pixel_count * 3)
+        rgb[0::3] = data[1::4]
+        rgb[1::3] = data[2::4]
+        rgb[2::3] = data[3::4]
+        return character_id, encode_png(width, height, rgb, 2)
+
+    raise UnsupportedSwf(f"Unsupported lossless bitmap format {bitmap_format}")
+
+def decode_jpeg_with_alpha(body, has_deblock):
+    """Decode DefineBitsJPEG3/4 to (character_id, extension, bytes)"""
+    character_id, alpha_offset = struct.unpack('<HI', body[:6])
+    start = 8 if has_deblock else 6
+    image = clean_jpeg(body[start:start + alpha_offset])
+    extension = image_extension(image)
+    # Alpha planes only apply to JPEG data
+    if extension != "jpg":
+        return character_id, extension, image
+
+    alpha_data = body[start + alpha_offset:]
+    alpha = zlib.decompress(alpha_data) if alpha_data else b''
+    if not alpha or alpha.count(255) == len(alpha):
+        return character_id, "jpg", image
+
+    if Image is None:
+        raise UnsupportedSwf("JPEG alpha merge needs Pillow")
+    picture = Image.open(io.BytesIO(image)).convert("RGBA")
+    picture.putalpha(Image.frombytes("L", picture.size, alpha[:picture.width * picture.height]))
+    output = io.BytesIO()
+    picture.save(output, "PNG")
+    return character_id, "png", output.getvalue()
+
+def decode_bitmap_tag(code, body, jpeg_tables):
+    """Decode one bitmap tag to (character_id, extension, bytes)"""
+    if code == TAG_DEFINE_BITS_LOSSLESS:
+        character_id, png = decode_lossless(body, with_alpha=False)
+        return character_id, "png", png
+    if code == TAG_DEFINE_BITS_LOSSLESS2:
+        character_id, png = decode_lossless(body, with_alpha=True)
+        return character_id, "png", png
+    if code == TAG_DEFINE_BITS:
+        character_id = struct.unpack('<H', body[:2])[0]
+        return character_id, "jpg", merge_jpeg_tables(jpeg_tables, body[2:])
+    if code == TAG_DEFINE_BITS_JPEG2:
+        character_id = struct.unpack('<H', body[:2])[0]
+        image = clean_jpeg(body[2:])
+        return character_id, image_extension(image), image
+    if code == TAG_DEFINE_BITS_JPEG3:
+        return decode_jpeg_with_alpha(body, has_deblock=False)
+    if code == TAG_DEFINE_BITS_JPEG4:
+        return decode_jpeg_with_alpha(body, has_deblock=True)
+    raise UnsupportedSwf(f"Not a bitmap tag: {code}")
+
+
+# ============================================
+# EXPORT
+# ============================================
+
+def read_bitmap_tags(swf_path):
+    """
+    Collect the bitmap tag bodies of a bitmap-only SWF
+    Raises UnsupportedSwf as soon as a tag that needs rendering is seen, so
+    mixed files stop decompressing early.
+    """
+    bitmaps = []
+    jpeg_tables = None
+    with SwfStream(swf_path) as stream:
+        stream.read_header_fields()
+        for code, _, body in stream.iter_tags(want=BITMAP_TAGS | {TAG_JPEG_TABLES}):
+            if code in RENDER_TAGS:
+                raise UnsupportedSwf(f"Tag {code} needs rendering")
+            if code == TAG_JPEG_TABLES:
+                jpeg_tables = body
+            elif code in BITMAP_TAGS:
+                bitmaps.append((code, body))
+    return bitmaps, jpeg_tables
+
+def extract_bitmaps(swf_path, output_subdir):
+    """
+    Export every bitmap of a bitmap-only SWF to output_subdir/images/
+    Everything is decoded before anything is written, so an UnsupportedSwf
+    never leaves partial output behind. Each file is written to a temp name
+    and swapped in with os.replace, so an existing file that is hardlinked
+    elsewhere (dedup, fanned-out duplicates) keeps its content. Returns the
+    number of files written.
+    """
+    try:
+        bitmaps, jpeg_tables = read_bitmap_tags(swf_path)
+        decoded = [decode_bitmap_tag(code, body, jpeg_tables) for code, body in bitmaps]
+    except (struct.error, zlib.error, ValueError, OSError) as e:
+        raise UnsupportedSwf(str(e)[:100])
+
+    if decoded:
+        images_dir = os.path.join(output_subdir, "images")
+        os.makedirs(images_dir, exist_ok=True)
+        for character_id, extension, data in decoded:
+            path = os.path.join(images_dir, f"{character_id}.{extension}")
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+    return len(decoded)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python3 swf_reader.py FILE.swf OUTPUT_DIR")
+        sys.exit(1)
+    try:
+        count = extract_bitmaps(sys.argv[1], sys.argv[2])
+        print(f"✓ Exported {count} bitmap(s) to {sys.argv[2]}")
+    except UnsupportedSwf as e:
+        print(f"✗ Needs JPEXS: {e}")
+        sys.exit(2)
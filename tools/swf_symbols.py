@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+SWF symbol index
+================
+The SWF files (and so the extracted asset directories) are named by random
+hashes like 00AOM3dlhY, which say nothing about what they contain. The
+names the game's code uses for them do: ActionScript class names bound in
+SymbolClass, linkage names in ExportAssets, and frame labels.
+
+This pass streams every SWF's tag list once with swf_reader.SwfStream and
+reads only those tags (plus the FrameLabel tags inside DefineSprite
+timelines); every other tag body is skipped. The result goes to
+swf_symbol_index.json next to the extracted dir, keyed by SWF name with its
+size and mtime, so reruns only read new or changed files.
+organize_assets.py categorizes from these names.
+
+USAGE:
+   python3 swf_symbols.py                   # Index the source dir
+   python3 swf_symbols.py --source DIR      # Another source directory
+   python3 swf_symbols.py --show NAME       # Print one file's symbols
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from swf_reader import SPRITE_TAGS, TAG_END, SwfStream, UnsupportedSwf
+
+SOURCE_DIR = "/Users/pa/petsociety/static/assets"
+EXTRACTED_DIR = "/Users/pa/PetSocietyMobile/assets/sprites/extracted"
+
+SYMBOL_INDEX_FILENAME = "swf_symbol_index.json"
+SYMBOL_INDEX_VERSION = 1
+
+TAG_FRAME_LABEL = 43
+TAG_EXPORT_ASSETS = 56
+TAG_SYMBOL_CLASS = 76
+
+# Symbol kinds, in the order names are listed by symbol_names
+KINDS = ["classes", "exports", "labels"]
+
+# Files per worker task
+CHUNK_SIZE = 64
+
+
+def default_symbol_index_path(extracted_dir):
+    """The index lives next to (not inside) the extracted dir"""
+    return os.path.join(os.path.dirname(os.path.abspath(extracted_dir)), SYMBOL_INDEX_FILENAME)
+
+
+# ============================================
+# TAG PARSING
+# ============================================
+
+def read_string(body, pos):
+    """Null-terminated string at pos; returns (text, position after it)"""
+    end = body.find(b'\0', pos)
+    if end < 0:
+        end = len(body)
+    return body[pos:end].decode('utf-8', 'replace'), end + 1
+
+def symbol_tag_names(body):
+    """Names of a SymbolClass or ExportAssets tag ([UI16 id, string] records)"""
+    count = struct.unpack_from('<H', body)[0]
+    names, pos = [], 2
+    for _ in range(count):
+        name, pos = read_string(body, pos + 2)
+        names.append(name)
+    return names
+
+def sprite_labels(body):
+    """FrameLabel names on a DefineSprite timeline"""
+    labels, pos = [], 4  # Sprite id, frame count
+    while pos + 2 <= len(body):
+        code_and_length = struct.unpack_from('<H', body, pos)[0]
+        code, length = code_and_length >> 6, code_and_length & 0x3f
+        pos += 2
+        if length == 0x3f:
+            length = struct.unpack_from('<I', body, pos)[0]
+            pos += 4
+        if code == TAG_FRAME_LABEL:
+            labels.append(read_string(body, pos)[0])
+        elif code == TAG_END:
+            break
+        pos += length
+    return labels
+
+def scan_symbols(swf_path):
+    """{"classes": [...], "exports": [...], "labels": [...]} in file order, without repeats"""
+    found = {kind: {} for kind in KINDS}
+    want = {TAG_SYMBOL_CLASS, TAG_EXPORT_ASSETS, TAG_FRAME_LABEL} | SPRITE_TAGS
+    with SwfStream(swf_path) as stream:
+        stream.read_header_fields()
+        for code, _, body in stream.iter_tags(want):
+            if code == TAG_SYMBOL_CLASS:
+                found["classes"].update(dict.fromkeys(symbol_tag_names(body)))
+            elif code == TAG_EXPORT_ASSETS:
+                found["exports"].update(dict.fromkeys(symbol_tag_names(body)))
+            elif code == TAG_FRAME_LABEL:
+                found["labels"][read_string(body, 0)[0]] = None
+            elif code in SPRITE_TAGS:
+                found["labels"].update(dict.fromkeys(sprite_labels(body)))
+    return {kind: [name for name in names if name] for kind, names in found.items()}
+
+def scan_files(paths):
+    """Worker: [(size, mtime_ns, symbols or None)] for a chunk of SWF paths"""
+    results = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            results.append((None, None, None))
+            continue
+        try:
+            symbols = scan_symbols(path)
+        except (UnsupportedSwf, struct.error, zlib.error, OSError):
+            symbols = None
+        results.append((stat.st_size, stat.st_mtime_ns, symbols))
+    return results
+
+
+# ============================================
+# INDEX
+# ============================================
+
+def load_index_files(index_path):
+    """name -> [size, mtime_ns, symbols or None] ({} if missing or from another version)"""
+    if not os.path.exists(index_path):
+        return {}
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if index.get("version") != SYMBOL_INDEX_VERSION:
+        return {}
+    return index["files"]
+
+def symbol_names(symbols):
+    return [name for kind in KINDS for name in symbols.get(kind, [])]
+
+def load_symbol_index(extracted_dir):
+    """Asset name -> every symbol name of its SWF ({} if the index was never built)"""
+    files = load_index_files(default_symbol_index_path(extracted_dir))
+    return {name: symbol_names(entry[2]) for name, entry in files.items() if entry[2]}
+
+def build_symbol_index(source_dir, filenames, index_path, workers=None):
+    """
+    Read the symbols of every file not already indexed (or changed since),
+    drop files that are gone, and write the index; returns (files, stats)
+    """
+    cached = load_index_files(index_path)
+    files, todo = {}, []
+    for name in filenames:
+        entry = cached.get(name)
+        if entry:
+            try:
+                stat = os.stat(os.path.join(source_dir, name))
+            except OSError:
+                stat = None
+            if stat and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+                files[name] = entry
+                continue
+        todo.append(name)
+
+    stats = {"files": len(filenames), "cached": len(files), "scanned": len(todo)}
+    chunks = [[os.path.join(source_dir, name) for name in todo[i:i + CHUNK_SIZE]]
+              for i in range(0, len(todo), CHUNK_SIZE)]
+    if chunks:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk_start, results in zip(range(0, len(todo), CHUNK_SIZE), executor.map(scan_files, chunks)):
+                for name, (size, mtime_ns, symbols) in zip(todo[chunk_start:chunk_start + CHUNK_SIZE], results):
+                    if size is not None:
+                        files[name] = [size, mtime_ns, symbols]
+
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"version": SYMBOL_INDEX_VERSION, "files": dict(sorted(files.items()))}, f, separators=(',', ':'))
+    os.replace(tmp_path, index_path)
+    return files, stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Index SymbolClass/ExportAssets names and frame labels of every SWF')
+    parser.add_argument('--source', type=str, default=SOURCE_DIR, help='Source directory with SWF files')
+    parser.add_argument('--extracted', type=str, default=EXTRACTED_DIR,
+                        help='Extracted assets directory (the index lives next to it)')
+    parser.add_argument('--workers', type=int, default=None, help='Scanner processes (default: CPU count)')
+    parser.add_argument('--show', type=str, default=None, metavar='NAME', help="Print one indexed file's symbols")
+    args = parser.parse_args()
+
+    index_path = default_symbol_index_path(args.extracted)
+    if args.show is not None:
+        entry = load_index_files(index_path).get(args.show)
+        if entry is None:
+            print(f"Error: {args.show} is not in {index_path}")
+            sys.exit(1)
+        print(json.dumps(entry[2], indent=2))
+        sys.exit(0)
+
+    if not os.path.isdir(args.source):
+        print(f"Error: Source directory not found: {args.source}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Indexing SWF Symbols")
+    print("=" * 60)
+    start_time = time.time()
+    filenames = sorted(f for f in os.listdir(args.source) if os.path.isfile(os.path.join(args.source, f)))
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    files, stats = build_symbol_index(args.source, filenames, index_path, args.workers)
+
+    readable = [entry[2] for entry in files.values() if entry[2] is not None]
+    kind_counts = Counter(kind for symbols in readable for kind in KINDS if symbols[kind])
+    print(f"\nFiles:                {stats['files']:,} ({stats['scanned']:,} scanned, {stats['cached']:,} cached)")
+    print(f"  unreadable:         {len(files) - len(readable):,}")
+    print(f"  with any name:      {sum(1 for symbols in readable if symbol_names(symbols)):,}")
+    for kind in KINDS:
+        print(f"  with {kind + ':':<15}{kind_counts[kind]:,}")
+    print(f"\nIndex saved to: {index_path}")
+    print(f"Time elapsed:         {time.time() - start_time:.1f}s")